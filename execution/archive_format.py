@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Modulo: Archive Format (formato colonnare compatto)
+Scopo: Serializzare l'archivio video come colonne (struct-of-arrays) senza campi derivabili,
+       e ricostruire i record nel formato di data/videos_cache.json
+Usato da: execution/generate_static_json.py
+Direttiva di riferimento: directives/cache_strategy.md
+
+Campi eliminati perché derivabili:
+- watch_url          ← id
+- year, month        ← published_at
+- duration_formatted ← duration_seconds (eccezioni salvate in "overrides")
+- thumbnail_url      ← costante (colonna presente solo se qualche valore è diverso)
+"""
+
+import json
+from datetime import datetime, timezone
+
+# Configurazione
+FORMAT_NAME = 'aba-columnar'
+FORMAT_VERSION = 1
+DEFAULT_THUMBNAIL_URL = '/thumbnail-default.png'
+WATCH_URL_PREFIX = 'https://www.youtube.com/watch?v='
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+def format_duration(total_seconds):
+    """Stesso formato di parse_duration negli script di sync (es. "1h 23m", "45m", "30s")"""
+    hours = total_seconds // 3600
+    minutes = (total_seconds % 3600) // 60
+
+    if hours > 0:
+        return f"{hours}h {minutes}m"
+    elif minutes > 0:
+        return f"{minutes}m"
+    return f"{total_seconds}s"
+
+def to_epoch(published_at):
+    """'2026-02-13T19:32:35Z' → 1771011155"""
+    return int(datetime.strptime(published_at, TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc).timestamp())
+
+def from_epoch(epoch):
+    """1771011155 → datetime UTC"""
+    return datetime.fromtimestamp(epoch, tz=timezone.utc)
+
+def encode_columnar(cache):
+    """
+    Converte la cache (formato videos_cache.json) nel formato colonnare
+
+    Returns:
+        dict: archivio colonnare (da salvare minificato)
+    """
+    videos = cache['videos']
+
+    columns = {
+        'id': [v['id'] for v in videos],
+        'title': [v['title'] for v in videos],
+        'published_at': [to_epoch(v['published_at']) for v in videos],
+        'duration_seconds': [v['duration_seconds'] for v in videos]
+    }
+
+    # Thumbnail: colonna solo se non è sempre la costante
+    if any(v['thumbnail_url'] != DEFAULT_THUMBNAIL_URL for v in videos):
+        columns['thumbnail_url'] = [v['thumbnail_url'] for v in videos]
+
+    # Durate non derivabili (es. "Durata non disponibile"): indice → valore
+    overrides = {
+        str(i): v['duration_formatted']
+        for i, v in enumerate(videos)
+        if v['duration_formatted'] != format_duration(v['duration_seconds'])
+    }
+
+    archive = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'last_updated': cache['last_updated'],
+        'content_hash': cache.get('content_hash'),
+        'total_videos': len(videos),
+        'total_hours': cache.get('total_hours', int(sum(columns['duration_seconds']) / 3600)),
+        'columns': columns
+    }
+    if overrides:
+        archive['overrides'] = {'duration_formatted': overrides}
+
+    return archive
+
+def decode_columnar(archive):
+    """
+    Ricostruisce la cache nel formato di videos_cache.json dal formato colonnare
+
+    Returns:
+        dict: {last_updated, total_videos, total_hours, content_hash, videos: [...]}
+    """
+    if archive.get('format') != FORMAT_NAME or archive.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Formato archivio non supportato: {archive.get('format')} v{archive.get('version')}")
+
+    columns = archive['columns']
+    thumbnails = columns.get('thumbnail_url')
+    duration_overrides = archive.get('overrides', {}).get('duration_formatted', {})
+
+    videos = []
+    for i, (video_id, title, epoch, duration_seconds) in enumerate(zip(
+        columns['id'], columns['title'], columns['published_at'], columns['duration_seconds']
+    )):
+        published = from_epoch(epoch)
+        videos.append({
+            'id': video_id,
+            'title': title,
+            'published_at': published.strftime(TIMESTAMP_FORMAT),
+            'year': published.year,
+            'month': published.month,
+            'duration_seconds': duration_seconds,
+            'duration_formatted': duration_overrides.get(str(i), format_duration(duration_seconds)),
+            'thumbnail_url': thumbnails[i] if thumbnails else DEFAULT_THUMBNAIL_URL,
+            'watch_url': f"{WATCH_URL_PREFIX}{video_id}"
+        })
+
+    return {
+        'last_updated': archive['last_updated'],
+        'total_videos': archive['total_videos'],
+        'total_hours': archive['total_hours'],
+        'content_hash': archive.get('content_hash'),
+        'videos': videos
+    }
+
+def dumps_columnar(archive):
+    """Serializzazione minificata"""
+    return json.dumps(archive, separators=(',', ':'), ensure_ascii=False)
+
+def read_columnar(path):
+    """Legge un archivio colonnare da disco e ritorna la cache nel formato classico"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return decode_columnar(json.load(f))
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Modulo: Archive Store (SQLite)
+Scopo: Fonte di verità locale dell'archivio: video, metadati dei fetch (videos.list),
+       ETag delle richieste condizionali e storico dei sync
+       data/videos_cache.json è un export dello store (scritto con video_cache.write_cache)
+Usato da: execution/fetch_all_videos.py, execution/refresh_cache.py, execution/youtube_api.py, execution/sync_daemon.py,
+          execution/live_schedule.py, execution/lesson_schedule.py
+Direttiva di riferimento: directives/cache_strategy.md
+
+I sync scrivono solo le righe cambiate (upsert): il costo del merge dipende dai video
+nuovi o modificati, non dalla dimensione dell'archivio.
+"""
+
+import os
+import json
+import sqlite3
+import logging
+from datetime import datetime
+from video_cache import CACHE_FILE, read_cache, write_cache, write_cache_data
+
+# Configurazione
+STORE_FILE = os.getenv('ARCHIVE_STORE_FILE', 'data/archive.db')
+SCHEMA_VERSION = 1
+SQL_BATCH_SIZE = 400  # ID per query IN (...): resta sotto il limite di 999 parametri anche raddoppiato
+
+# Colonne del record video (stesso formato di videos_cache.json)
+VIDEO_COLUMNS = (
+    'id', 'title', 'published_at', 'year', 'month',
+    'duration_seconds', 'duration_formatted', 'thumbnail_url', 'watch_url'
+)
+DATA_COLUMNS = VIDEO_COLUMNS[1:]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id TEXT PRIMARY KEY,
+    channel_id TEXT,
+    title TEXT NOT NULL,
+    published_at TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    duration_seconds INTEGER NOT NULL,
+    duration_formatted TEXT NOT NULL,
+    thumbnail_url TEXT NOT NULL,
+    watch_url TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+-- L'indice su id è quello implicito della PRIMARY KEY
+CREATE INDEX IF NOT EXISTS idx_videos_published_at ON videos (published_at, id);
+CREATE INDEX IF NOT EXISTS idx_videos_year_month ON videos (year, month);
+
+CREATE TABLE IF NOT EXISTS video_details (
+    id TEXT PRIMARY KEY,
+    parts TEXT NOT NULL,
+    is_live INTEGER NOT NULL,
+    fetched_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS etags (
+    uri TEXT PRIMARY KEY,
+    etag TEXT NOT NULL,
+    body TEXT NOT NULL,
+    last_used TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_etags_last_used ON etags (last_used);
+
+CREATE TABLE IF NOT EXISTS sync_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    mode TEXT NOT NULL,
+    channel_id TEXT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    status TEXT NOT NULL,
+    inserted INTEGER NOT NULL DEFAULT 0,
+    updated INTEGER NOT NULL DEFAULT 0,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    total_videos INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+logger = logging.getLogger(__name__)
+
+def _now():
+    return datetime.utcnow().isoformat() + 'Z'
+
+def _chunks(items, size=SQL_BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _placeholders(n):
+    return ','.join('?' * n)
+
+class ArchiveStore:
+    """
+    Store SQLite dell'archivio
+
+    Le modifiche restano nella transazione corrente finché non si chiama commit():
+    un sync interrotto non lascia lo store a metà.
+    """
+
+    def __init__(self, path=STORE_FILE):
+        self.path = path
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self.conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)",
+            (str(SCHEMA_VERSION),)
+        )
+        self.conn.commit()
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # --- Video ---
+
+    def count_videos(self, channel_id=None):
+        if channel_id is None:
+            return self.conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM videos WHERE channel_id = ?", (channel_id,)
+        ).fetchone()[0]
+
+    def iter_videos(self):
+        """Video in ordine canonico (data decrescente, poi ID), letti dall'indice su published_at"""
+        cursor = self.conn.execute(
+            f"SELECT {', '.join(VIDEO_COLUMNS)} FROM videos ORDER BY published_at DESC, id DESC"
+        )
+        for row in cursor:
+            yield dict(zip(VIDEO_COLUMNS, row))
+
+    def latest_published_at(self):
+        """published_at del video più recente (None con archivio vuoto)"""
+        return self.conn.execute("SELECT MAX(published_at) FROM videos").fetchone()[0]
+
+    def iter_airtimes(self, since):
+        """(published_at, duration_seconds) dei video pubblicati da since (ISO UTC) in poi"""
+        return self.conn.execute(
+            "SELECT published_at, duration_seconds FROM videos WHERE published_at >= ? ORDER BY published_at",
+            (since,)
+        )
+
+    def get_videos(self, video_ids):
+        """Record in archivio per questi ID (dict ID → video, solo ID presenti)"""
+        video_ids = list(video_ids)
+        videos = {}
+        for chunk in _chunks(video_ids):
+            rows = self.conn.execute(
+                f"SELECT {', '.join(VIDEO_COLUMNS)} FROM videos WHERE id IN ({_placeholders(len(chunk))})",
+                chunk
+            )
+            for row in rows:
+                videos[row[0]] = dict(zip(VIDEO_COLUMNS, row))
+        return videos
+
+    def known_ids(self, video_ids):
+        """
+        Sottoinsieme di video_ids già noto: video in archivio
+        + upload non-live già classificati nei dettagli (lookup per chiave, niente scansioni)
+        """
+        video_ids = list(video_ids)
+        known = set()
+        for chunk in _chunks(video_ids):
+            marks = _placeholders(len(chunk))
+            rows = self.conn.execute(
+                f"SELECT id FROM videos WHERE id IN ({marks}) "
+                f"UNION SELECT id FROM video_details WHERE is_live = 0 AND id IN ({marks})",
+                chunk + chunk
+            )
+            known.update(row[0] for row in rows)
+        return known
+
+    def sync_videos(self, videos, channel_id=None, full=False):
+        """
+        Upsert dei video: inserisce i nuovi, aggiorna solo le righe con campi diversi
+
+        Args:
+            full: se True i video del canale assenti da videos vengono eliminati
+                  (sync completo: videos è l'elenco intero)
+
+        Returns:
+            dict: {inserted, updated, deleted}
+        """
+        now = _now()
+        values = [tuple(v[c] for c in DATA_COLUMNS) for v in videos]
+        ids = [v['id'] for v in videos]
+
+        cursor = self.conn.executemany(
+            f"INSERT OR IGNORE INTO videos (id, channel_id, {', '.join(DATA_COLUMNS)}, updated_at) "
+            f"VALUES ({_placeholders(len(DATA_COLUMNS) + 3)})",
+            [(video_id, channel_id, *row, now) for video_id, row in zip(ids, values)]
+        )
+        inserted = max(cursor.rowcount, 0)
+
+        # Le righe appena inserite non hanno differenze: contano solo gli aggiornamenti reali
+        cursor = self.conn.executemany(
+            f"UPDATE videos SET {', '.join(f'{c} = ?' for c in DATA_COLUMNS)}, updated_at = ? "
+            f"WHERE id = ? AND ({' OR '.join(f'{c} IS NOT ?' for c in DATA_COLUMNS)})",
+            [(*row, now, video_id, *row) for video_id, row in zip(ids, values)]
+        )
+        updated = max(cursor.rowcount, 0)
+
+        deleted = 0
+        if full:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen_ids (id TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM seen_ids")
+            self.conn.executemany("INSERT OR IGNORE INTO seen_ids (id) VALUES (?)", ((i,) for i in ids))
+            cursor = self.conn.execute(
+                "DELETE FROM videos WHERE channel_id IS ? AND id NOT IN (SELECT id FROM seen_ids)",
+                (channel_id,)
+            )
+            deleted = cursor.rowcount
+
+        logger.info(f"Store: +{inserted} inseriti, ~{updated} aggiornati, -{deleted} eliminati")
+        return {'inserted': inserted, 'updated': updated, 'deleted': deleted}
+
+    def apply_events(self, events, channel_id=None):
+        """
+        Applica eventi per ID (stesso formato di video_cache.merge_changes):
+        {'op': 'upsert', 'video': {...}} oppure {'op': 'delete', 'id': ...}
+
+        Returns:
+            dict: {inserted, updated, deleted}
+        """
+        pending = {}
+        for event in events:
+            if event['op'] == 'delete':
+                pending[event['id']] = None
+            else:
+                pending[event['video']['id']] = event['video']
+
+        counts = self.sync_videos([v for v in pending.values() if v is not None], channel_id)
+
+        deleted_ids = [video_id for video_id, v in pending.items() if v is None]
+        for chunk in _chunks(deleted_ids):
+            cursor = self.conn.execute(
+                f"DELETE FROM videos WHERE id IN ({_placeholders(len(chunk))})", chunk
+            )
+            counts['deleted'] += cursor.rowcount
+
+        if deleted_ids:
+            logger.info(f"Store: -{counts['deleted']} eliminati da eventi delete")
+        return counts
+
+    # --- Dettagli videos.list ---
+
+    def get_details(self, video_ids):
+        """
+        Dettagli salvati per questi ID
+
+        Returns:
+            dict: ID → {parts, is_live, fetched_at} (solo ID presenti)
+        """
+        video_ids = list(video_ids)
+        entries = {}
+        for chunk in _chunks(video_ids):
+            rows = self.conn.execute(
+                f"SELECT id, parts, is_live, fetched_at FROM video_details "
+                f"WHERE id IN ({_placeholders(len(chunk))})",
+                chunk
+            )
+            for video_id, parts, is_live, fetched_at in rows:
+                entries[video_id] = {
+                    'parts': json.loads(parts),
+                    'is_live': bool(is_live),
+                    'fetched_at': fetched_at
+                }
+        return entries
+
+    def put_details(self, video_id, parts, is_live):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO video_details (id, parts, is_live, fetched_at) VALUES (?, ?, ?, ?)",
+            (video_id, json.dumps(parts, ensure_ascii=False), int(is_live), _now())
+        )
+
+    def iter_pending_broadcasts(self):
+        """
+        Live in archivio non ancora conclusi (programmati o in corso: manca actualEndTime)
+
+        Yields:
+            dict: {id, title, scheduled_start, actual_start} (orari ISO UTC o None)
+        """
+        rows = self.conn.execute(
+            "SELECT d.id, v.title, "
+            "json_extract(d.parts, '$.liveStreamingDetails.scheduledStartTime'), "
+            "json_extract(d.parts, '$.liveStreamingDetails.actualStartTime') "
+            "FROM video_details d JOIN videos v ON v.id = d.id "
+            "WHERE d.is_live = 1 AND json_extract(d.parts, '$.liveStreamingDetails.actualEndTime') IS NULL"
+        )
+        for video_id, title, scheduled_start, actual_start in rows:
+            yield {
+                'id': video_id,
+                'title': title,
+                'scheduled_start': scheduled_start,
+                'actual_start': actual_start
+            }
+
+    def count_details(self):
+        return self.conn.execute("SELECT COUNT(*) FROM video_details").fetchone()[0]
+
+    # --- ETag ---
+
+    def get_etag(self, uri):
+        """ETag e body salvati per una richiesta (None se sconosciuta)"""
+        row = self.conn.execute("SELECT etag, body FROM etags WHERE uri = ?", (uri,)).fetchone()
+        if row is None:
+            return None
+        return {'etag': row[0], 'body': json.loads(row[1])}
+
+    def put_etag(self, uri, etag, body):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO etags (uri, etag, body, last_used) VALUES (?, ?, ?, ?)",
+            (uri, etag, json.dumps(body, ensure_ascii=False), _now())
+        )
+
+    def touch_etag(self, uri):
+        self.conn.execute("UPDATE etags SET last_used = ? WHERE uri = ?", (_now(), uri))
+
+    def prune_etags(self, cutoff):
+        """Elimina le entry non usate dopo cutoff (timestamp ISO); ritorna quante"""
+        return self.conn.execute("DELETE FROM etags WHERE last_used < ?", (cutoff,)).rowcount
+
+    # --- Metadati ---
+
+    def get_meta(self, key):
+        """Valore salvato in meta (None se assente)"""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    # --- Storico sync ---
+
+    def begin_sync(self, mode, channel_id=None):
+        """Registra l'inizio di un sync (status 'running' finché non si chiama finish_sync)"""
+        cursor = self.conn.execute(
+            "INSERT INTO sync_runs (mode, channel_id, started_at, status) VALUES (?, ?, ?, 'running')",
+            (mode, channel_id, _now())
+        )
+        self.conn.commit()
+        return cursor.lastrowid
+
+    def finish_sync(self, run_id, status, counts=None):
+        """Chiude il sync e conferma tutte le modifiche della transazione"""
+        counts = counts or {}
+        self.conn.execute(
+            "UPDATE sync_runs SET finished_at = ?, status = ?, inserted = ?, updated = ?, "
+            "deleted = ?, total_videos = ? WHERE id = ?",
+            (_now(), status, counts.get('inserted', 0), counts.get('updated', 0),
+             counts.get('deleted', 0), self.count_videos(), run_id)
+        )
+        self.conn.commit()
+
+    def last_sync(self, status='ok', modes=None):
+        """
+        Ultimo sync concluso con questo status (dict, None se nessuno)
+
+        Args:
+            modes: solo sync di questi tipi (es. ('refresh', 'full')); None = tutti
+        """
+        query = "SELECT * FROM sync_runs WHERE status = ?"
+        params = [status]
+        if modes:
+            query += f" AND mode IN ({_placeholders(len(modes))})"
+            params.extend(modes)
+        cursor = self.conn.execute(f"{query} ORDER BY id DESC LIMIT 1", params)
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([c[0] for c in cursor.description], row))
+
+def open_store(path=STORE_FILE, cache_file=CACHE_FILE, channel_id=None):
+    """
+    Apre lo store; se non contiene video lo inizializza dall'export JSON esistente
+    (una tantum: primo avvio o store perso, es. cache CI scaduta)
+    """
+    store = ArchiveStore(path)
+
+    if store.count_videos() == 0:
+        cache = read_cache(cache_file)
+        if cache and cache.get('videos'):
+            logger.info(f"Store vuoto: importo {len(cache['videos'])} video da {cache_file}")
+            store.sync_videos(cache['videos'], channel_id)
+            store.commit()
+
+    return store
+
+def export_cache(store, output_file=CACHE_FILE, frontend_file=None, backup=False):
+    """
+    Esporta lo store in formato videos_cache.json (no-op se il contenuto non cambia)
+
+    Returns:
+        tuple: (written: bool, videos_sorted: list) come write_cache
+    """
+    return write_cache(list(store.iter_videos()), output_file, frontend_file=frontend_file, backup=backup)
+
+def export_cache_data(store, output_file=CACHE_FILE):
+    """
+    Come export_cache, ma restituisce la cache completa già in memoria (senza rileggerla)
+
+    Returns:
+        tuple: (written: bool, cache: dict) come write_cache_data
+    """
+    return write_cache_data(list(store.iter_videos()), output_file)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Script: Benchmark Merge
+Scopo: Microbenchmark del merge ordinato (video_cache.merge_changes) contro il vecchio
+       merge_with_cache di refresh_cache.py (concatena, deduplica, riordina tutto)
+Input: nessuno (archivio sintetico generato in memoria)
+Output: tempi nel log
+Direttiva di riferimento: directives/cache_strategy.md
+
+Uso:
+    python execution/benchmark_merge.py [dimensione ...]    (default: 10000 1000000)
+"""
+
+import os
+import sys
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+from video_cache import merge_changes
+
+# Configurazione
+DEFAULT_SIZES = [10_000, 1_000_000]
+NEW_RECORDS = 5  # Tipico refresh giornaliero: pochi video nuovi…
+UPDATED_RECORDS = 3  # …e qualche correzione (solo merge_changes: il vecchio merge le ignorava)
+REPEATS = 3
+LOG_FILE = '.tmp/fetch_errors.log'
+
+logger = logging.getLogger(__name__)
+
+def legacy_merge_with_cache(new_videos_data, existing_cache):
+    """Implementazione precedente di refresh_cache.merge_with_cache (riferimento)"""
+    all_videos = existing_cache['videos'] + new_videos_data
+
+    seen_ids = set()
+    unique_videos = []
+    for v in all_videos:
+        if v['id'] not in seen_ids:
+            seen_ids.add(v['id'])
+            unique_videos.append(v)
+
+    return sorted(unique_videos, key=lambda x: x['published_at'], reverse=True)
+
+def synthetic_video(i, published):
+    """Record sintetico nel formato della cache"""
+    return {
+        'id': f"vid{i:08d}",
+        'title': f"Lezione {i}",
+        'published_at': published.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'year': published.year,
+        'month': published.month,
+        'duration_seconds': 3600,
+        'duration_formatted': '1h 0m',
+        'thumbnail_url': '/thumbnail-default.png',
+        'watch_url': f"https://www.youtube.com/watch?v=vid{i:08d}"
+    }
+
+def synthetic_archive(size):
+    """Archivio già in ordine canonico (un video ogni ora, dal più recente)"""
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [synthetic_video(i, start - timedelta(hours=i)) for i in range(size)]
+
+def best_time(fn, repeats=REPEATS):
+    """Miglior tempo su più ripetizioni (secondi) e ultimo risultato"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def run_benchmark(size):
+    """
+    Confronta i due merge su un archivio di size record
+
+    Returns:
+        dict: size, legacy_seconds, merge_seconds, scan_seconds, speedup
+    """
+    videos = synthetic_archive(size)
+    cache = {'videos': videos}
+
+    # Video nuovi sparsi nel tempo (non solo in cima): il caso peggiore per il merge
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    new_videos = [
+        synthetic_video(size + j, start - timedelta(hours=j * (size // NEW_RECORDS), minutes=30))
+        for j in range(NEW_RECORDS)
+    ]
+    updates = [dict(videos[j * (size // UPDATED_RECORDS)], title='Titolo corretto') for j in range(UPDATED_RECORDS)]
+    events = (
+        [{'op': 'insert', 'video': v} for v in new_videos]
+        + [{'op': 'upsert', 'video': v} for v in updates]
+    )
+
+    legacy_seconds, legacy_result = best_time(lambda: legacy_merge_with_cache(new_videos, cache))
+    merge_seconds, (merged, changes) = best_time(lambda: merge_changes(videos, events))
+
+    # Caso peggiore: solo upsert, gli ID nuovi richiedono la passata su tutti gli ID
+    upsert_events = [{'op': 'upsert', 'video': e['video']} for e in events]
+    scan_seconds, (scan_merged, _) = best_time(lambda: merge_changes(videos, upsert_events))
+    if scan_merged != merged:
+        raise AssertionError("insert e upsert danno risultati diversi")
+
+    # Stesso risultato per gli inserimenti; in più merge_changes applica gli aggiornamenti
+    inserted_only, _ = merge_changes(videos, events[:NEW_RECORDS])
+    if inserted_only != legacy_result:
+        raise AssertionError("merge_changes e merge_with_cache danno risultati diversi")
+    if len(changes['added']) != NEW_RECORDS or len(changes['updated']) != UPDATED_RECORDS:
+        raise AssertionError(f"Cambiamenti inattesi: {changes}")
+
+    return {
+        'size': size,
+        'legacy_seconds': legacy_seconds,
+        'merge_seconds': merge_seconds,
+        'scan_seconds': scan_seconds,
+        'speedup': legacy_seconds / merge_seconds
+    }
+
+def main():
+    """Funzione principale"""
+    os.makedirs('.tmp', exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname)s: %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE, mode='a'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+    logger.info("=" * 60)
+    logger.info("Benchmark Merge - merge_changes vs merge_with_cache")
+    logger.info("=" * 60)
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+
+    for size in sizes:
+        r = run_benchmark(size)
+        logger.info(
+            f"{r['size']:>9,} video: merge_with_cache {r['legacy_seconds'] * 1000:8.1f} ms, "
+            f"merge_changes {r['merge_seconds'] * 1000:8.1f} ms ({r['speedup']:.1f}×), "
+            f"solo upsert {r['scan_seconds'] * 1000:8.1f} ms"
+        )
+
+if __name__ == '__main__':
+    main()
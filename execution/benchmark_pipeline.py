@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Script: Benchmark Pipeline
+Scopo: Misura tempo e picco di memoria degli stage della pipeline (caricamento cache,
+       merge/filtro del sync completo, merge nella cache, raggruppamento, struttura frontend,
+       validazione, serializzazione, generazione per mese completa e incrementale) su archivi sintetici da 10k, 100k e 1M video
+       I risultati vanno in un JSON per confrontare le regressioni tra commit
+Input: archivi generati con generate_mock_data.py (seed fisso, in .tmp/benchmarks/)
+Output: .tmp/benchmarks/results-{commit}.json
+Direttiva di riferimento: directives/cache_strategy.md
+
+Uso:
+    python execution/benchmark_pipeline.py [dimensione ...] [--output file.json] [--compare base.json]
+    (default: 10000 100000 1000000)
+
+Con --compare, gli stage più lenti del riferimento oltre REGRESSION_THRESHOLD
+(e più lenti di almeno REGRESSION_MIN_SECONDS) vengono segnalati e lo script esce con codice 1.
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import logging
+import shutil
+import platform
+import subprocess
+import tracemalloc
+from datetime import datetime
+from generate_mock_data import DEFAULT_SEED, iter_mock_videos, write_mock_cache
+from video_cache import read_cache, merge_changes, write_cache
+from fetch_all_videos import merge_and_filter_videos
+from generate_static_json import group_by_year_month, build_frontend_structure, validate_output, save_json, save_grouped
+from benchmark_merge import legacy_merge_with_cache
+
+# Configurazione
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+BENCHMARK_DIR = '.tmp/benchmarks'
+RESULTS_FORMAT = 'aba-benchmark'
+RESULTS_VERSION = 1
+REPEATS = 3  # Miglior tempo su REPEATS esecuzioni…
+LARGE_ARCHIVE_REPEATS = 1  # …tranne dal milione in su (memoria e durata)
+LARGE_ARCHIVE_SIZE = 1_000_000
+NEW_RECORDS = 5  # Come benchmark_merge.py: refresh giornaliero tipico
+UPDATED_RECORDS = 3
+NON_LIVE_SHARE = 20  # 1 upload ogni 20 non è una live (filtrato da merge_and_filter_videos)
+REGRESSION_THRESHOLD = 1.2  # +20% rispetto al riferimento…
+REGRESSION_MIN_SECONDS = 0.005  # …e almeno 5 ms in più (sotto è rumore di misura)
+LOG_FILE = '.tmp/fetch_errors.log'
+
+logger = logging.getLogger(__name__)
+
+def archive_path(size, seed=DEFAULT_SEED):
+    """Archivio sintetico (generato una volta e riusato tra i run: stesso seed → stesso file)"""
+    return os.path.join(BENCHMARK_DIR, f"archive-{size}-seed{seed}.json")
+
+def ensure_archive(size, seed=DEFAULT_SEED):
+    """Genera l'archivio sintetico se manca; ritorna il path"""
+    path = archive_path(size, seed)
+    if not os.path.exists(path):
+        logger.info(f"Generazione archivio sintetico: {size:,} video (seed {seed})")
+        start = time.perf_counter()
+        write_mock_cache(iter_mock_videos(size, seed), path)
+        logger.info(f"  {path} in {time.perf_counter() - start:.1f}s")
+    return path
+
+def to_api_items(videos):
+    """
+    Ricostruisce le risposte API di playlistItems e videos.list per merge_and_filter_videos
+    (con una quota di upload non-live, che il filtro deve scartare)
+
+    Returns:
+        tuple: (playlist_videos, video_details)
+    """
+    playlist_videos = []
+    video_details = []
+    for i, video in enumerate(videos):
+        playlist_videos.append({'id': video['id'], 'title': video['title'], 'published_at': video['published_at']})
+        seconds = video['duration_seconds']
+        details = {
+            'id': video['id'],
+            'contentDetails': {'duration': f"PT{seconds // 3600}H{seconds % 3600 // 60}M{seconds % 60}S"}
+        }
+        if i % NON_LIVE_SHARE:
+            details['liveStreamingDetails'] = {'actualStartTime': video['published_at']}
+        video_details.append(details)
+    return playlist_videos, video_details
+
+def change_events(videos):
+    """Eventi di un refresh tipico: pochi video nuovi (sparsi) + qualche titolo corretto"""
+    step = len(videos) // NEW_RECORDS
+    new_videos = [
+        dict(videos[j * step], id=f"new{j:08d}", watch_url=f"https://www.youtube.com/watch?v=new{j:08d}")
+        for j in range(NEW_RECORDS)
+    ]
+    step = len(videos) // UPDATED_RECORDS
+    updates = [dict(videos[j * step + 1], title='Titolo corretto') for j in range(UPDATED_RECORDS)]
+    return new_videos, (
+        [{'op': 'insert', 'video': v} for v in new_videos]
+        + [{'op': 'upsert', 'video': v} for v in updates]
+    )
+
+def measure(fn, repeats, setup=None):
+    """
+    Miglior tempo su repeats esecuzioni, poi un'esecuzione sotto tracemalloc per il picco
+    (separata: tracemalloc rallenta molto le allocazioni)
+
+    Returns:
+        tuple: (stats: dict con seconds e peak_mb, risultato dell'ultima esecuzione)
+    """
+    best = None
+    result = None
+    for _ in range(repeats):
+        if setup:
+            setup()
+        result = None
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    if setup:
+        setup()
+    result = None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': round(best, 6), 'peak_mb': round(peak / 1024 / 1024, 2)}, result
+
+def run_size(size, seed=DEFAULT_SEED):
+    """
+    Misura tutti gli stage su un archivio di size video
+
+    Returns:
+        dict: size, file_bytes, stages {nome: {seconds, peak_mb}}
+    """
+    path = ensure_archive(size, seed)
+    repeats = LARGE_ARCHIVE_REPEATS if size >= LARGE_ARCHIVE_SIZE else REPEATS
+    output_dir = os.path.join(BENCHMARK_DIR, f"output-{size}")
+    os.makedirs(output_dir, exist_ok=True)
+    stages = {}
+
+    def record(name, stats):
+        stages[name] = stats
+        logger.info(f"  {name:<26} {stats['seconds'] * 1000:10.1f} ms  {stats['peak_mb']:9.1f} MB")
+
+    logger.info(f"Archivio da {size:,} video ({os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+
+    stats, cache = measure(lambda: read_cache(path), repeats)
+    record('load', stats)
+    videos = cache['videos']
+
+    playlist_videos, video_details = to_api_items(videos)
+    stats, _ = measure(lambda: merge_and_filter_videos(playlist_videos, video_details), repeats)
+    record('merge_and_filter_videos', stats)
+    playlist_videos = video_details = _ = None  # Libera memoria prima degli stage successivi
+
+    new_videos, events = change_events(videos)
+    stats, _ = measure(lambda: legacy_merge_with_cache(new_videos, cache), repeats)
+    record('merge_with_cache', stats)
+    stats, _ = measure(lambda: merge_changes(videos, events), repeats)
+    record('merge_changes', stats)
+    _ = None
+
+    stats, grouped = measure(lambda: group_by_year_month(videos), repeats)
+    record('group_by_year_month', stats)
+
+    stats, frontend_data = measure(lambda: build_frontend_structure(grouped, cache), repeats)
+    record('build_frontend_structure', stats)
+    grouped = None
+
+    stats, _ = measure(lambda: validate_output(frontend_data), repeats)
+    record('validate_output', stats)
+
+    frontend_file = os.path.join(output_dir, 'videos.json')
+    stats, _ = measure(lambda: save_json(frontend_data, frontend_file, compact=True), repeats)
+    record('serialize_frontend', stats)
+    frontend_data = None
+
+    # Generazione per mese: completa, poi con un solo titolo cambiato (riparte ogni volta dai frammenti completi)
+    grouped_file = os.path.join(output_dir, 'grouped', 'videos.json')
+    archive_dir = os.path.join(output_dir, 'grouped', 'archive')
+    state_dir = os.path.join(output_dir, 'static_json_groups')
+    base_state = f"{state_dir}.base"
+    full_cache = dict(cache, archive_version=1)
+    stats, _ = measure(lambda: save_grouped(full_cache, [], grouped_file, archive_dir,
+                                            state_dir=state_dir, full=True), repeats)
+    record('save_grouped_full', stats)
+    shutil.rmtree(base_state, ignore_errors=True)
+    shutil.copytree(state_dir, base_state)
+
+    def reset_state():
+        shutil.rmtree(state_dir)
+        shutil.copytree(base_state, state_dir)
+
+
+    changed_videos = list(videos)
+    changed_videos[len(videos) // 2] = dict(changed_videos[len(videos) // 2], title='Titolo modificato')
+    changed_cache = dict(cache, archive_version=2, videos=changed_videos)
+    changelog = [{'version': 2, 'added': [], 'updated': [changed_videos[len(videos) // 2]['id']], 'removed': []}]
+    stats, _ = measure(lambda: save_grouped(changed_cache, changelog, grouped_file, archive_dir, state_dir=state_dir),
+                       repeats, setup=reset_state)
+    record('save_grouped_one_change', stats)
+    changed_videos = changed_cache = full_cache = None
+
+    # Scrittura completa della cache (hash + JSON indentato + changelog): parte ogni volta da zero
+    cache_file = os.path.join(output_dir, 'videos_cache.json')
+
+    def reset_cache_file():
+        for leftover in (cache_file, os.path.join(output_dir, 'archive_changelog.json')):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    stats, _ = measure(lambda: write_cache(videos, cache_file), repeats, setup=reset_cache_file)
+    record('write_cache', stats)
+
+    return {'size': size, 'file_bytes': os.path.getsize(path), 'repeats': repeats, 'stages': stages}
+
+def git_commit():
+    """Commit corrente (None fuori da un repository git)"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare_results(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Confronta stage per stage con un file di risultati precedente (stesse dimensioni)
+
+    Returns:
+        list: regressioni (size, stage, seconds, baseline_seconds, ratio)
+    """
+    baseline_by_size = {r['size']: r['stages'] for r in baseline['results']}
+    regressions = []
+
+    for result in results['results']:
+        base_stages = baseline_by_size.get(result['size'])
+        if not base_stages:
+            logger.warning(f"Riferimento senza archivio da {result['size']:,} video: confronto saltato")
+            continue
+        for name, stats in result['stages'].items():
+            base = base_stages.get(name)
+            if not base or not base['seconds']:
+                continue
+            ratio = stats['seconds'] / base['seconds']
+            regressed = ratio > threshold and stats['seconds'] - base['seconds'] >= REGRESSION_MIN_SECONDS
+            marker = '⚠️ ' if regressed else '  '
+            logger.info(
+                f"{marker}{result['size']:>9,} {name:<26} {base['seconds'] * 1000:10.1f} → "
+                f"{stats['seconds'] * 1000:10.1f} ms ({ratio:.2f}×)"
+            )
+            if regressed:
+                regressions.append({
+                    'size': result['size'],
+                    'stage': name,
+                    'seconds': stats['seconds'],
+                    'baseline_seconds': base['seconds'],
+                    'ratio': round(ratio, 3)
+                })
+
+    return regressions
+
+def parse_args(argv):
+    """Dimensioni posizionali + --output/--compare"""
+    sizes = []
+    options = {'output': None, 'compare': None}
+    args = iter(argv)
+    for arg in args:
+        if arg in ('--output', '--compare'):
+            options[arg[2:]] = next(args, None)
+        else:
+            sizes.append(int(arg))
+    return sizes or DEFAULT_SIZES, options
+
+def main():
+    """Funzione principale"""
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname)s: %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE, mode='a'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+    # Gli stage misurati loggano a ogni chiamata: solo avvisi ed errori
+    for name in ('fetch_all_videos', 'generate_static_json', 'video_cache'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    logger.info("=" * 60)
+    logger.info("Benchmark Pipeline")
+    logger.info("=" * 60)
+
+    sizes, options = parse_args(sys.argv[1:])
+    commit = git_commit()
+
+    results = {
+        'format': RESULTS_FORMAT,
+        'version': RESULTS_VERSION,
+        'created_at': datetime.utcnow().isoformat() + 'Z',
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': DEFAULT_SEED,
+        'results': [run_size(size) for size in sizes]
+    }
+
+    output_file = options['output'] or os.path.join(BENCHMARK_DIR, f"results-{commit or 'local'}.json")
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    logger.info(f"Risultati salvati in: {output_file}")
+
+    if options['compare']:
+        with open(options['compare'], 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        logger.info(f"Confronto con {options['compare']} (commit {baseline.get('git_commit')})")
+        regressions = compare_results(results, baseline)
+        if regressions:
+            logger.warning(f"{len(regressions)} stage oltre +{(REGRESSION_THRESHOLD - 1) * 100:.0f}% rispetto al riferimento")
+            sys.exit(1)
+        logger.info("✅ Nessuna regressione")
+
+if __name__ == '__main__':
+    main()
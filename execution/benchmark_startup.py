@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Script: Benchmark Startup
+Scopo: Misura il tempo di avvio degli entry point (import a freddo in un processo nuovo)
+       e di un refresh "a vuoto" (sync appena concluso: esce al pre-check, senza rete),
+       confrontandolo con un budget per ciascuno: i cron che non trovano nulla da fare
+       devono restare sotto il secondo
+Input: archivio sintetico (generate_mock_data.py) in una directory temporanea
+Output: log; codice di uscita 1 se un entry point supera il suo budget
+Direttiva di riferimento: directives/fetch_youtube_videos.md
+
+Uso:
+    python execution/benchmark_startup.py [--repeats N]
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+import tempfile
+import statistics
+import subprocess
+from generate_mock_data import iter_mock_videos
+from archive_store import ArchiveStore
+
+# Configurazione
+EXECUTION_DIR = os.path.dirname(os.path.abspath(__file__))
+REPEATS = 5  # Mediana su REPEATS processi
+IDLE_ARCHIVE_SIZE = 1_500  # Come il canale reale
+# Budget in secondi (processo intero, interprete incluso)
+STARTUP_BUDGETS = {
+    'import fetch_all_videos': 0.2,
+    'import refresh_cache': 0.2,
+    'import generate_static_json': 0.15,
+    'import generate_search_index': 0.15,
+    'refresh_cache a vuoto': 0.25,
+}
+LOG_FILE = '.tmp/fetch_errors.log'
+
+logger = logging.getLogger(__name__)
+
+def time_process(args, cwd, repeats=REPEATS):
+    """Mediana del tempo totale di un processo Python (avvio interprete incluso)"""
+    env = dict(os.environ, PYTHONPATH=EXECUTION_DIR)
+    env.pop('YOUTUBE_API_BASE_URL', None)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=cwd, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+def prepare_idle_workdir(workdir):
+    """Store con un sync appena concluso: refresh_cache.py deve uscire al pre-check"""
+    store = ArchiveStore(os.path.join(workdir, 'data', 'archive.db'))
+    store.sync_videos(list(iter_mock_videos(IDLE_ARCHIVE_SIZE)))
+    store.finish_sync(store.begin_sync('refresh'), 'ok')
+    store.close()
+
+def main():
+    """Funzione principale"""
+    os.makedirs('.tmp', exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname)s: %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE, mode='a'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+    args = sys.argv[1:]
+    repeats = int(args[args.index('--repeats') + 1]) if '--repeats' in args else REPEATS
+
+    logger.info("=" * 60)
+    logger.info(f"Benchmark Startup (mediana su {repeats} processi)")
+    logger.info("=" * 60)
+
+    workdir = tempfile.mkdtemp(prefix='aba-startup-')
+    try:
+        prepare_idle_workdir(workdir)
+        baseline = time_process(['-c', 'pass'], workdir, repeats)
+        logger.info(f"  {'interprete (python -c pass)':<30} {baseline * 1000:8.1f} ms")
+
+        over_budget = []
+        for name, budget in STARTUP_BUDGETS.items():
+            if name.startswith('import '):
+                args = ['-c', f"import {name.split()[1]}"]
+            else:
+                args = [os.path.join(EXECUTION_DIR, 'refresh_cache.py')]
+            elapsed = time_process(args, workdir, repeats)
+
+            marker = '⚠️ ' if elapsed > budget else '  '
+            logger.info(f"{marker}{name:<30} {elapsed * 1000:8.1f} ms "
+                        f"(budget {budget * 1000:.0f} ms, +{(elapsed - baseline) * 1000:.1f} ms sull'interprete)")
+            if elapsed > budget:
+                over_budget.append(name)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if over_budget:
+        logger.warning(f"{len(over_budget)} entry point oltre il budget: {', '.join(over_budget)}")
+        sys.exit(1)
+    logger.info("✅ Tutti gli entry point nel budget")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Script: Build Artifacts (grafo di build in un solo passaggio)
+Scopo: Un solo punto di ingresso che produce tutti gli artefatti da un archivio caricato in memoria
+       una volta sola: cache (export dallo store), copia frontend, videos.json, delta, archivio a shard,
+       formato colonnare, indice di ricerca, live schedule, pre-compressione
+       Ogni target dichiara da cosa dipende; viene saltato se gli hash dei suoi input e dei suoi output
+       coincidono con quelli dell'ultima build (data/build_state.json); i target indipendenti
+       vengono costruiti in parallelo
+Input: data/archive.db (oppure data/videos_cache.json + journal se lo store manca)
+Output: data/videos_cache.json, frontend/public/data/** (+ .gz/.br), data/build_state.json
+Direttiva di riferimento: directives/cache_strategy.md
+
+Grafo:
+    cache ─┬─ frontend_cache ──┐
+           ├─ deltas ─ grouped ┤   (videos.json + archivio a shard)
+           ├─ columnar ────────┼─ compress
+           └─ search_index ────┤
+    live_schedule ─────────────┘
+
+Uso:
+    python execution/build_artifacts.py            # solo i target con input cambiati
+    python execution/build_artifacts.py --force    # ricostruisce tutto
+    BUILD_COMPRESS=0 python execution/build_artifacts.py   # senza .gz/.br (CI)
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from archive_store import STORE_FILE, ArchiveStore, export_cache_data
+from video_cache import CACHE_FILE, read_cache, read_changelog
+from generate_static_json import (
+    ARCHIVE_DIR_NAME, COLUMNAR_FILE_NAME, DELTAS_DIR_NAME, save_columnar, save_deltas, save_grouped
+)
+from generate_search_index import INDEX_VERSION, build_search_index, save_index
+from compress_artifacts import ARTIFACT_EXTENSIONS, brotli, compress_artifacts, find_artifacts
+from live_schedule import write_live_schedule
+
+# Configurazione
+ARTIFACT_DIR = os.getenv('BUILD_ARTIFACT_DIR', 'frontend/public/data')
+STATE_FILE = os.getenv('BUILD_STATE_FILE', 'data/build_state.json')
+STATE_VERSION = 1  # Da incrementare quando cambia il formato di un artefatto: invalida tutta la build
+MAX_WORKERS = int(os.getenv('BUILD_MAX_WORKERS', str(os.cpu_count() or 1)))
+COMPRESSED_SUFFIXES = ('.gz', '.br')
+# I .gz/.br servono solo dove vengono serviti (es. nginx gzip_static): non in CI, dove non si committano
+COMPRESS = os.getenv('BUILD_COMPRESS', '1') != '0'
+LOG_FILE = '.tmp/fetch_errors.log'
+
+logger = logging.getLogger(__name__)
+
+def file_digest(path):
+    """SHA-256 del file (None se non esiste)"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+def value_digest(value):
+    """SHA-256 della serializzazione canonica di un valore JSON"""
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def list_files(directory, extensions=ARTIFACT_EXTENSIONS):
+    """File con queste estensioni in directory (non ricorsivo, ordinati)"""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(extensions)
+    )
+
+class Target:
+    """
+    Nodo del grafo di build
+
+    Args:
+        build: funzione (ctx, changed) → risultato serializzabile in JSON (o None); solleva in caso di errore
+               changed: chiavi di input cambiate dall'ultima build (None = tutte / prima build)
+        deps: nomi dei target da costruire prima
+        inputs: funzione ctx → dict {chiave: hash}; None = target eseguito sempre
+        outputs: funzione ctx → file prodotti (verificati per hash prima di saltare il target)
+    """
+
+    def __init__(self, name, build, deps=(), inputs=None, outputs=None):
+        self.name = name
+        self.build = build
+        self.deps = tuple(deps)
+        self.inputs = inputs
+        self.outputs = outputs or (lambda ctx: [])
+
+class BuildState:
+    """Hash di input e output (e risultato) dell'ultima build riuscita di ogni target"""
+
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.targets = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') == STATE_VERSION:
+                self.targets = state.get('targets', {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def get(self, name):
+        with self.lock:
+            return self.targets.get(name)
+
+    def put(self, name, record):
+        with self.lock:
+            self.targets[name] = record
+
+    def save(self):
+        output_dir = os.path.dirname(self.path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        temp_file = f"{self.path}.tmp"
+        with self.lock:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': STATE_VERSION, 'targets': self.targets}, f, indent=2, sort_keys=True)
+        os.replace(temp_file, self.path)
+
+class BuildContext:
+    """Archivio in memoria + risultati dei target, condivisi tra i thread della build"""
+
+    def __init__(self, artifact_dir=ARTIFACT_DIR, cache_file=CACHE_FILE, store_file=STORE_FILE):
+        self.artifact_dir = artifact_dir
+        self.cache_file = cache_file
+        self.store_file = store_file
+        self.cache = None
+        self.results = {}
+
+    def path(self, *parts):
+        return os.path.join(self.artifact_dir, *parts)
+
+    def cache_key(self):
+        """Identità della cache: versione, hash del contenuto, last_updated (finisce negli artefatti)"""
+        return value_digest([
+            self.cache.get('archive_version', 0), self.cache.get('content_hash'), self.cache['last_updated']
+        ])
+
+# --- Target ---
+
+def build_cache(ctx, changed):
+    """Archivio in memoria: export dallo store (no-op se invariato) o lettura di cache + journal"""
+    written = False
+    if os.path.exists(ctx.store_file):
+        store = ArchiveStore(ctx.store_file)
+        try:
+            # Uno store vuoto non deve svuotare la cache esistente
+            if store.count_videos():
+                written, ctx.cache = export_cache_data(store, ctx.cache_file)
+        finally:
+            store.close()
+
+    if ctx.cache is None:
+        logger.info(f"Store assente o vuoto ({ctx.store_file}): uso {ctx.cache_file}")
+        ctx.cache = read_cache(ctx.cache_file)
+    if ctx.cache is None:
+        raise RuntimeError("Né store né cache disponibili (esegui prima: python execution/fetch_all_videos.py)")
+    logger.info(f"Archivio in memoria: {ctx.cache['total_videos']} video, versione {ctx.cache.get('archive_version', 0)}")
+    return {'written': written}
+
+def build_frontend_cache(ctx, changed):
+    """Copia servita dal frontend: dalla cache in memoria (journal incluso), scrittura atomica"""
+    output_file = ctx.path('videos_cache.json')
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    temp_file = f"{output_file}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(ctx.cache, f, indent=2, ensure_ascii=False)
+    os.replace(temp_file, output_file)
+    logger.info(f"Cache copiata in: {output_file}")
+
+def build_deltas(ctx, changed):
+    """Delta tra versioni; il risultato ({versione: url}) serve al manifest"""
+    deltas = save_deltas(ctx.cache, read_changelog(ctx.cache_file), ctx.path(DELTAS_DIR_NAME))
+    if deltas is None:
+        raise RuntimeError("Salvataggio delta fallito")
+    return deltas
+
+def build_grouped(ctx, changed):
+    """
+    videos.json + manifest e shard per anno: riserializza solo i mesi cambiati dall'ultima build;
+    se mancano output o record (changed None) rigenera tutto
+    """
+    save_grouped(ctx.cache, read_changelog(ctx.cache_file), ctx.path('videos.json'),
+                 ctx.path(ARCHIVE_DIR_NAME), deltas=ctx.results['deltas'], full=changed is None)
+
+def build_columnar(ctx, changed):
+    if not save_columnar(ctx.cache, ctx.path(COLUMNAR_FILE_NAME)):
+        raise RuntimeError("Salvataggio archivio colonnare fallito")
+
+def build_search(ctx, changed):
+    index = build_search_index(ctx.cache['videos'], ctx.cache.get('content_hash'))
+    logger.info(f"Indicizzati {len(index['docs'])} video, {len(index['terms'])} termini")
+    save_index(index, ctx.path('search_index.json'))
+
+def build_live_schedule(ctx, changed):
+    """Legge lo store, non la cache: sempre eseguito, scrive solo se il contenuto cambia"""
+    if not os.path.exists(ctx.store_file):
+        logger.info("Store non trovato: live schedule non aggiornato")
+        return
+    store = ArchiveStore(ctx.store_file)
+    try:
+        write_live_schedule(store, ctx.path('live_schedule.json'))
+    finally:
+        store.close()
+
+def compress_inputs(ctx):
+    """
+    Hash di ogni artefatto JSON, marcato se manca un suo .gz/.br: così un artefatto nuovo,
+    modificato o senza versione compressa viene ricompresso da solo, senza ricomprimere gli altri
+    """
+    suffixes = COMPRESSED_SUFFIXES if brotli is not None else ('.gz',)
+    inputs = {}
+    for path in find_artifacts([ctx.artifact_dir]):
+        complete = all(os.path.exists(f"{path}{suffix}") for suffix in suffixes)
+        inputs[path] = file_digest(path) + ('' if complete else ':incompleto')
+    return inputs
+
+def build_compress(ctx, changed):
+    """Comprime solo gli artefatti cambiati e rimuove i .gz/.br di artefatti eliminati (es. delta ruotati)"""
+    for root, _, files in os.walk(ctx.artifact_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.endswith(COMPRESSED_SUFFIXES) and not os.path.exists(os.path.splitext(path)[0]):
+                os.remove(path)
+                logger.info(f"Artefatto compresso obsoleto rimosso: {path}")
+
+    paths = sorted(changed) if changed is not None else [ctx.artifact_dir]
+    if paths:
+        compress_artifacts(paths)
+
+def artifact_targets():
+    """Il grafo di build (ordine indifferente: lo schedula run_build dalle dipendenze)"""
+    cache_inputs = lambda ctx: {'cache': ctx.cache_key()}
+    targets = [
+        Target('cache', build_cache),
+        Target('frontend_cache', build_frontend_cache, deps=['cache'], inputs=cache_inputs,
+               outputs=lambda ctx: [ctx.path('videos_cache.json')]),
+        Target('deltas', build_deltas, deps=['cache'],
+               inputs=lambda ctx: {'cache': ctx.cache_key(),
+                                   'changelog': value_digest(read_changelog(ctx.cache_file))},
+               outputs=lambda ctx: list_files(ctx.path(DELTAS_DIR_NAME))),
+        Target('grouped', build_grouped, deps=['cache', 'deltas'],
+               inputs=lambda ctx: {'cache': ctx.cache_key(), 'deltas': value_digest(ctx.results['deltas'])},
+               outputs=lambda ctx: [ctx.path('videos.json')] + list_files(ctx.path(ARCHIVE_DIR_NAME))),
+        Target('columnar', build_columnar, deps=['cache'], inputs=cache_inputs,
+               outputs=lambda ctx: [ctx.path(COLUMNAR_FILE_NAME)]),
+        Target('search_index', build_search, deps=['cache'],
+               inputs=lambda ctx: {'content_hash': ctx.cache.get('content_hash'), 'format': INDEX_VERSION},
+               outputs=lambda ctx: [ctx.path('search_index.json')]),
+        Target('live_schedule', build_live_schedule),
+    ]
+    if COMPRESS:
+        targets.append(Target('compress', build_compress,
+                              deps=['frontend_cache', 'grouped', 'columnar', 'search_index', 'live_schedule'],
+                              inputs=compress_inputs))
+    return targets
+
+# --- Esecuzione ---
+
+def run_target(target, ctx, state, force=False):
+    """
+    Costruisce un target, oppure lo salta se input e output coincidono con l'ultima build
+
+    Returns:
+        str: 'saltato' | 'costruito'
+    """
+    inputs = target.inputs(ctx) if target.inputs else None
+    record = state.get(target.name)
+
+    changed = None
+    if inputs is not None and record and not force:
+        outputs_intact = (
+            sorted(record['outputs']) == sorted(target.outputs(ctx))
+            and all(file_digest(path) == digest for path, digest in record['outputs'].items())
+        )
+        if outputs_intact:
+            changed = {key for key, digest in inputs.items() if record['inputs'].get(key) != digest}
+            if not changed and set(record['inputs']) == set(inputs):
+                ctx.results[target.name] = record.get('result')
+                return 'saltato'
+
+    result = target.build(ctx, changed)
+    ctx.results[target.name] = result
+    if inputs is not None:
+        state.put(target.name, {
+            'inputs': target.inputs(ctx),  # Ricalcolati: possono dipendere da ciò che il target ha appena scritto
+            'outputs': {path: file_digest(path) for path in target.outputs(ctx)},
+            'result': result
+        })
+    return 'costruito'
+
+def run_build(targets, ctx, state, force=False, max_workers=MAX_WORKERS):
+    """
+    Esegue il grafo: ogni target parte appena le sue dipendenze sono pronte, quelli indipendenti
+    in parallelo; se un target fallisce i suoi dipendenti non vengono eseguiti
+
+    Returns:
+        dict: nome → (stato, secondi) con stato 'costruito' | 'saltato' | 'fallito' | 'non eseguito'
+    """
+    by_name = {t.name: t for t in targets}
+    for target in targets:
+        missing = [d for d in target.deps if d not in by_name]
+        if missing:
+            raise ValueError(f"Target {target.name}: dipendenze sconosciute {missing}")
+
+    pending = dict(by_name)
+    report = {}
+    running = {}
+
+    def timed(target):
+        start = time.perf_counter()
+        status = run_target(target, ctx, state, force)
+        return status, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        while pending or running:
+            for name, target in list(pending.items()):
+                statuses = [report.get(d, (None,))[0] for d in target.deps]
+                if any(s in ('fallito', 'non eseguito') for s in statuses):
+                    report[name] = ('non eseguito', 0.0)
+                    del pending[name]
+                elif all(s in ('costruito', 'saltato') for s in statuses):
+                    running[executor.submit(timed, target)] = name
+                    del pending[name]
+
+            if not running:
+                break  # Solo dipendenze cicliche possono arrivare qui
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    report[name] = future.result()
+                except Exception as e:
+                    logger.error(f"Target {name} fallito: {e}", exc_info=True)
+                    report[name] = ('fallito', 0.0)
+
+    for name in pending:
+        report[name] = ('non eseguito', 0.0)
+    return {t.name: report[t.name] for t in targets}
+
+def main():
+    """Funzione principale"""
+    os.makedirs('.tmp', exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname)s: %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE, mode='a'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+    logger.info("=" * 60)
+    logger.info("Build Artifacts - grafo di build")
+    logger.info("=" * 60)
+
+    force = '--force' in sys.argv[1:]
+    start = time.perf_counter()
+    state = BuildState()
+    report = run_build(artifact_targets(), BuildContext(), state, force=force)
+    state.save()
+
+    logger.info("=" * 60)
+    for name, (status, seconds) in report.items():
+        logger.info(f"  {name:<15} {status:<13} {seconds * 1000:7.0f} ms")
+    built = sum(1 for status, _ in report.values() if status == 'costruito')
+    skipped = sum(1 for status, _ in report.values() if status == 'saltato')
+    logger.info(f"Build in {time.perf_counter() - start:.2f}s: {built} target costruiti, {skipped} aggiornati (saltati)")
+
+    failed = [name for name, (status, _) in report.items() if status in ('fallito', 'non eseguito')]
+    if failed:
+        logger.error(f"❌ Build incompleta: {', '.join(failed)}")
+        sys.exit(1)
+    logger.info("✅ Artefatti aggiornati")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Script: Compress Artifacts
+Scopo: Pre-comprimere gli artefatti statici (gzip + brotli, compressione massima)
+       così che la CDN serva direttamente i byte compressi
+Input: file JSON generati da generate_static_json.py (default: frontend/public/data/**/*.json)
+Output: {file}.gz e {file}.br accanto a ogni artefatto
+Direttiva di riferimento: directives/cache_strategy.md
+
+Uso:
+    python execution/compress_artifacts.py [file_o_cartella ...]
+"""
+
+import os
+import sys
+import gzip
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:  # Dipendenza opzionale: senza brotli si generano solo i .gz
+    brotli = None
+
+# Configurazione
+DEFAULT_ARTIFACT_DIR = 'frontend/public/data'
+ARTIFACT_EXTENSIONS = ('.json',)
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+MAX_WORKERS = os.cpu_count() or 1
+LOG_FILE = '.tmp/fetch_errors.log'
+
+logger = logging.getLogger(__name__)
+
+def _write_if_changed(path, data):
+    """Scrive solo se il contenuto è diverso (output deterministico → nessun diff git)"""
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'wb') as f:
+        f.write(data)
+    os.replace(temp_file, path)
+    return True
+
+def compress_file(path):
+    """
+    Crea {path}.gz e {path}.br (se brotli è installato)
+
+    Returns:
+        dict: path, raw, gz, br (byte, br=None se non disponibile), seconds
+    """
+    start = time.perf_counter()
+
+    with open(path, 'rb') as f:
+        raw = f.read()
+
+    # mtime=0 → stesso input, stessi byte in output
+    gz_data = gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+    _write_if_changed(f"{path}.gz", gz_data)
+
+    br_size = None
+    if brotli is not None:
+        br_data = brotli.compress(raw, quality=BROTLI_QUALITY)
+        _write_if_changed(f"{path}.br", br_data)
+        br_size = len(br_data)
+
+    return {
+        'path': path,
+        'raw': len(raw),
+        'gz': len(gz_data),
+        'br': br_size,
+        'seconds': time.perf_counter() - start
+    }
+
+def find_artifacts(paths):
+    """Espande cartelle in elenco di file artefatto (ordinato)"""
+    artifacts = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                artifacts.extend(
+                    os.path.join(root, name) for name in files
+                    if name.endswith(ARTIFACT_EXTENSIONS)
+                )
+        elif os.path.exists(path):
+            artifacts.append(path)
+    return sorted(artifacts)
+
+def compress_artifacts(paths, max_workers=MAX_WORKERS):
+    """
+    Comprime tutti gli artefatti in parallelo (zlib e brotli rilasciano il GIL)
+    e logga dimensioni e tempi per ognuno
+
+    Returns:
+        list: report per artefatto (vedi compress_file), nello stesso ordine di input
+    """
+    artifacts = find_artifacts(paths)
+    if not artifacts:
+        logger.warning("Nessun artefatto da comprimere")
+        return []
+
+    if brotli is None:
+        logger.warning("Modulo 'brotli' non installato: genero solo i .gz (pip install brotli)")
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(artifacts)))) as executor:
+        reports = list(executor.map(compress_file, artifacts))
+
+    for r in reports:
+        br_info = f"br {r['br'] / 1024:.1f} KB ({r['br'] / r['raw']:.0%})" if r['br'] is not None else "br n/d"
+        logger.info(
+            f"{r['path']}: raw {r['raw'] / 1024:.1f} KB → gz {r['gz'] / 1024:.1f} KB "
+            f"({r['gz'] / r['raw']:.0%}), {br_info} in {r['seconds'] * 1000:.0f} ms"
+        )
+
+    total_raw = sum(r['raw'] for r in reports)
+    total_gz = sum(r['gz'] for r in reports)
+    logger.info(f"Totale {len(reports)} artefatti: raw {total_raw / 1024:.1f} KB → gz {total_gz / 1024:.1f} KB")
+    if brotli is not None:
+        total_br = sum(r['br'] for r in reports)
+        logger.info(f"Totale brotli: {total_br / 1024:.1f} KB")
+
+    return reports
+
+def main():
+    """Funzione principale"""
+    os.makedirs('.tmp', exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname)s: %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE, mode='a'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+    logger.info("=" * 60)
+    logger.info("Compress Artifacts - gzip + brotli")
+    logger.info("=" * 60)
+
+    paths = sys.argv[1:] or [DEFAULT_ARTIFACT_DIR]
+    reports = compress_artifacts(paths)
+
+    if not reports:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Script: Fake WebSub Hub
+Scopo: Hub PubSubHubbub locale che imita pubsubhubbub.appspot.com per provare push_receiver.py
+       offline: accetta le sottoscrizioni, le verifica con una challenge al callback e consegna
+       notifiche Atom firmate (X-Hub-Signature) nel formato del feed YouTube, sintetiche oppure
+       riprodotte da una registrazione (PUSH_RECORD_FILE del receiver)
+Input: richieste di sottoscrizione; file JSON Lines registrati da push_receiver.py
+Output: HTTP su http://127.0.0.1:{porta}/subscribe e consegne POST ai callback
+Direttiva di riferimento: directives/cache_strategy.md
+
+Endpoint di controllo (non esistono nell'hub reale):
+- GET  /__admin/stats                              sottoscrizioni attive e consegne
+- POST /__admin/notify?video_id=ID1,ID2[&deleted=1] una notifica per ID (in raffica), con titolo e
+                                                   data presi dal server fake_youtube_api.py se --api-url
+- POST /__admin/replay?file=PATH                   riconsegna i payload registrati, nell'ordine
+
+Uso:
+    python execution/fake_websub_hub.py --port 8781 --api-url http://127.0.0.1:8765
+    PUSH_HUB_URL=http://127.0.0.1:8781/subscribe PUSH_CALLBACK_URL=http://127.0.0.1:8780/websub \\
+        python execution/push_receiver.py
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import logging
+import secrets
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import escape
+
+# Configurazione
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8781
+CHANNEL_ID = os.getenv('YOUTUBE_CHANNEL_ID', 'UC18Pm8LKXwtK2uUSoif5RVw')
+TOPIC_PREFIX = 'https://www.youtube.com/xml/feeds/videos.xml?channel_id='
+LOG_FILE = '.tmp/fetch_errors.log'
+
+logger = logging.getLogger(__name__)
+
+def atom_entry(video_id, channel_id, title, published_at):
+    """Notifica di upload/modifica nel formato inviato dall'hub YouTube"""
+    published = published_at.replace('Z', '+00:00')
+    updated = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    return f"""<?xml version='1.0' encoding='UTF-8'?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns="http://www.w3.org/2005/Atom">
+ <link rel="hub" href="https://pubsubhubbub.appspot.com"/>
+ <link rel="self" href="{TOPIC_PREFIX}{channel_id}"/>
+ <title>YouTube video feed</title>
+ <updated>{updated}</updated>
+ <entry>
+  <id>yt:video:{video_id}</id>
+  <yt:videoId>{video_id}</yt:videoId>
+  <yt:channelId>{channel_id}</yt:channelId>
+  <title>{escape(title)}</title>
+  <link rel="alternate" href="https://www.youtube.com/watch?v={video_id}"/>
+  <author>
+   <name>Autoscuola ABA</name>
+   <uri>https://www.youtube.com/channel/{channel_id}</uri>
+  </author>
+  <published>{published}</published>
+  <updated>{updated}</updated>
+ </entry>
+</feed>
+"""
+
+def atom_deleted_entry(video_id, channel_id):
+    """Notifica di eliminazione (tombstone)"""
+    when = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    return f"""<?xml version='1.0' encoding='UTF-8'?>
+<feed xmlns:at="http://purl.org/atompub/tombstones/1.0" xmlns="http://www.w3.org/2005/Atom">
+ <at:deleted-entry ref="yt:video:{video_id}" when="{when}">
+  <link href="https://www.youtube.com/watch?v={video_id}"/>
+  <at:by>
+   <name>Autoscuola ABA</name>
+   <uri>https://www.youtube.com/channel/{channel_id}</uri>
+  </at:by>
+ </at:deleted-entry>
+</feed>
+"""
+
+class FakeHub:
+    """Sottoscrizioni verificate (callback → topic, secret) e consegne"""
+
+    def __init__(self, api_url=None, channel_id=CHANNEL_ID):
+        self.api_url = api_url
+        self.channel_id = channel_id
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+        self.deliveries = Counter()
+
+    def subscribe(self, form):
+        """
+        Richiesta di (dis)iscrizione: risponde 202 e verifica il callback in un thread,
+        come l'hub reale con hub.verify=async
+        """
+        callback = form.get('hub.callback')
+        topic = form.get('hub.topic', '')
+        mode = form.get('hub.mode')
+        if not callback or not topic.startswith(TOPIC_PREFIX) or mode not in ('subscribe', 'unsubscribe'):
+            return 400, 'Richiesta non valida'
+        threading.Thread(target=self._verify, args=(callback, topic, mode, form), daemon=True).start()
+        return 202, ''
+
+    def _verify(self, callback, topic, mode, form):
+        import requests
+
+        challenge = secrets.token_urlsafe(16)
+        params = {'hub.mode': mode, 'hub.topic': topic, 'hub.challenge': challenge}
+        if mode == 'subscribe':
+            params['hub.lease_seconds'] = form.get('hub.lease_seconds', '432000')
+        try:
+            response = requests.get(callback, params=params, timeout=10)
+        except requests.RequestException as e:
+            logger.warning(f"Verifica di {callback} fallita: {e}")
+            return
+        if response.status_code // 100 != 2 or response.text != challenge:
+            logger.warning(f"Verifica di {callback} rifiutata ({response.status_code})")
+            return
+
+        with self.lock:
+            if mode == 'subscribe':
+                self.subscriptions[callback] = {'topic': topic, 'secret': form.get('hub.secret', '')}
+            else:
+                self.subscriptions.pop(callback, None)
+        logger.info(f"{mode} verificato: {callback} → {topic}")
+
+    def deliver(self, payload, channel_id=None):
+        """POST firmato del payload a ogni callback iscritto al topic del canale"""
+        import requests
+
+        topic = TOPIC_PREFIX + (channel_id or self.channel_id)
+        body = payload.encode('utf-8')
+        with self.lock:
+            targets = [(cb, sub['secret']) for cb, sub in self.subscriptions.items() if sub['topic'] == topic]
+
+        results = {}
+        for callback, secret in targets:
+            headers = {'Content-Type': 'application/atom+xml'}
+            if secret:
+                signature = hmac.new(secret.encode('utf-8'), body, 'sha1').hexdigest()
+                headers['X-Hub-Signature'] = f"sha1={signature}"
+            try:
+                status = requests.post(callback, data=body, headers=headers, timeout=10).status_code
+            except requests.RequestException as e:
+                status = str(e)
+            results[callback] = status
+            with self.lock:
+                self.deliveries[callback] += 1
+        return results
+
+    def video_metadata(self, video_id):
+        """Titolo e data dal server fake_youtube_api.py (se configurato), altrimenti segnaposto"""
+        if self.api_url:
+            import requests
+
+            response = requests.get(f"{self.api_url}/__admin/video", params={'id': video_id}, timeout=10)
+            if response.status_code == 200:
+                upload = response.json()
+                return upload['title'], upload['published_at']
+        return f"Video {video_id}", datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def notify(self, video_ids, deleted=False):
+        """Una notifica per ID, consegnate in raffica"""
+        results = {}
+        for video_id in video_ids:
+            if deleted:
+                payload = atom_deleted_entry(video_id, self.channel_id)
+            else:
+                payload = atom_entry(video_id, self.channel_id, *self.video_metadata(video_id))
+            results[video_id] = self.deliver(payload)
+        return results
+
+    def replay(self, path):
+        """Riconsegna i payload registrati da push_receiver.py (PUSH_RECORD_FILE)"""
+        # Letto tutto prima di consegnare: il receiver può registrare nello stesso file
+        with open(path, 'r', encoding='utf-8') as f:
+            recorded = [json.loads(line)['body'] for line in f if line.strip()]
+        for payload in recorded:
+            self.deliver(payload)
+        return len(recorded)
+
+    def stats(self):
+        with self.lock:
+            return {'subscriptions': dict(self.subscriptions), 'deliveries': dict(self.deliveries)}
+
+def make_handler(hub):
+    """Classe handler legata a un'istanza di FakeHub"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body=''):
+            payload = (body if isinstance(body, str) else json.dumps(body, ensure_ascii=False)).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if urlparse(self.path).path == '/__admin/stats':
+                return self._send(200, hub.stats())
+            self._send(404)
+
+        def do_POST(self):
+            parsed = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode('utf-8')
+
+            if parsed.path == '/subscribe':
+                form = {key: values[0] for key, values in parse_qs(body).items()}
+                return self._send(*hub.subscribe(form))
+            if parsed.path == '/__admin/notify':
+                video_ids = [i for i in params.get('video_id', '').split(',') if i]
+                return self._send(200, hub.notify(video_ids, deleted=params.get('deleted') == '1'))
+            if parsed.path == '/__admin/replay':
+                return self._send(200, {'delivered': hub.replay(params['file'])})
+            self._send(404)
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+    return Handler
+
+def start_hub(host=DEFAULT_HOST, port=0, api_url=None, channel_id=CHANNEL_ID):
+    """
+    Avvia l'hub in un thread (port=0 → porta libera), per test
+
+    Returns:
+        tuple: (server, hub, subscribe_url) — fermare con server.shutdown()
+    """
+    hub = FakeHub(api_url, channel_id)
+    server = ThreadingHTTPServer((host, port), make_handler(hub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, hub, f"http://{host}:{server.server_address[1]}/subscribe"
+
+def main():
+    """Funzione principale"""
+    os.makedirs('.tmp', exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname)s: %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE, mode='a'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+    parser = argparse.ArgumentParser(description='Hub WebSub locale che imita pubsubhubbub.appspot.com')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--api-url', help='fake_youtube_api.py da cui prendere titolo e data dei video notificati')
+    parser.add_argument('--channel-id', default=CHANNEL_ID)
+    args = parser.parse_args()
+
+    server, hub, subscribe_url = start_hub(args.host, args.port, args.api_url, args.channel_id)
+    logger.info("=" * 60)
+    logger.info("Fake WebSub Hub")
+    logger.info("=" * 60)
+    logger.info(f"In ascolto su {subscribe_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        logger.info(f"Statistiche finali: {hub.stats()}")
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+Script: Fake YouTube API
+Scopo: Server locale che imita channels.list, playlistItems.list e videos.list della
+       YouTube Data API v3, per eseguire fetch_all_videos.py e refresh_cache.py end-to-end
+       offline e misurarne throughput, concorrenza e gestione errori in modo deterministico
+Input: archivio sintetico (generate_mock_data.py, seed fisso) oppure un videos_cache.json
+Output: HTTP su http://127.0.0.1:{porta}/youtube/v3/…
+Direttiva di riferimento: directives/fetch_youtube_videos.md
+
+Comportamento:
+- Paginazione con nextPageToken opachi (max 50 risultati per pagina, come l'API reale)
+- ETag per risposta: con If-None-Match uguale risponde 304 senza body
+- Latenza iniettabile (fissa + jitter), errori 5xx con probabilità data, 403 quotaExceeded
+  oltre il budget di unità (1 unità per chiamata, come i tre endpoint reali)
+- Una quota degli upload non è live (niente liveStreamingDetails) e una quota è eliminata
+  (presente nella playlist, assente da videos.list)
+- Gli errori dipendono solo da seed, URI e numero di ripetizioni della richiesta:
+  stessi parametri → stessi errori, anche con richieste in parallelo
+
+Endpoint di controllo (non esistono nell'API reale):
+- GET  /__admin/stats                 contatori (richieste per endpoint, unità, 304, errori)
+- GET  /__admin/video?id=VIDEO_ID     metadati di un upload, senza consumare quota (fake_websub_hub.py)
+- POST /__admin/publish?count=N       pubblica N nuovi live in cima alla playlist
+- POST /__admin/delete?id=VIDEO_ID    elimina un video (resta nella playlist, sparisce da videos.list)
+- POST /__admin/reset                 azzera contatori e quota usata
+
+Uso:
+    python execution/fake_youtube_api.py --videos 10000 --latency-ms 80 --error-rate 0.02
+    YOUTUBE_API_BASE_URL=http://127.0.0.1:8765 python execution/fetch_all_videos.py
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import random
+import hashlib
+import logging
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from generate_mock_data import DEFAULT_SEED, iter_mock_videos, mock_video_id
+
+# Configurazione
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_VIDEOS = 1_568  # Come l'archivio reale
+CHANNEL_ID = os.getenv('YOUTUBE_CHANNEL_ID', 'UC18Pm8LKXwtK2uUSoif5RVw')
+API_PREFIX = '/youtube/v3/'
+MAX_RESULTS = 50
+NON_LIVE_RATE = 0.05  # Upload non live (filtrati dagli script)
+DELETED_RATE = 0.005  # Upload eliminati (senza dettagli)
+UNITS_PER_CALL = 1  # channels.list, playlistItems.list, videos.list
+LOG_FILE = '.tmp/fetch_errors.log'
+
+logger = logging.getLogger(__name__)
+
+def iso_duration(seconds):
+    """Secondi → durata ISO 8601 (PT1H23M45S), come contentDetails.duration"""
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    duration = 'PT'
+    if hours:
+        duration += f"{hours}H"
+    if minutes:
+        duration += f"{minutes}M"
+    if seconds or duration == 'PT':
+        duration += f"{seconds}S"
+    return duration
+
+def compute_etag(body):
+    """ETag deterministico del contenuto della risposta"""
+    payload = json.dumps(body, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(hashlib.sha1(payload.encode('utf-8')).digest()).decode('ascii').rstrip('=')
+
+def encode_page_token(offset):
+    """Token di pagina opaco (l'offset non è leggibile a colpo d'occhio, come nell'API reale)"""
+    return base64.urlsafe_b64encode(f"PT:{offset}".encode('ascii')).decode('ascii').rstrip('=')
+
+def decode_page_token(token):
+    """Offset dal token; None se il token non è valido"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        prefix, offset = base64.urlsafe_b64decode(padded).decode('ascii').split(':')
+        return int(offset) if prefix == 'PT' and int(offset) >= 0 else None
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def google_error(status, reason, message, domain='global'):
+    """Body di errore nel formato dell'API (letto da HttpError di googleapiclient)"""
+    return {
+        'error': {
+            'code': status,
+            'message': message,
+            'errors': [{'message': message, 'domain': domain, 'reason': reason}]
+        }
+    }
+
+class FakeChannel:
+    """
+    Stato del canale servito: upload in ordine di pubblicazione decrescente
+
+    Ogni upload ha kind 'live', 'upload' (non live) o 'deleted'.
+    Le mutazioni (publish/delete) sono protette da lock: il server è multi-thread.
+    """
+
+    def __init__(self, videos, channel_id=CHANNEL_ID, seed=DEFAULT_SEED,
+                 non_live_rate=NON_LIVE_RATE, deleted_rate=DELETED_RATE):
+        self.channel_id = channel_id
+        self.uploads_playlist_id = 'UU' + channel_id[2:]
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.uploads = []
+        for video in videos:
+            roll = self.rng.random()
+            kind = 'deleted' if roll < deleted_rate else 'upload' if roll < deleted_rate + non_live_rate else 'live'
+            self.uploads.append({
+                'id': video['id'],
+                'title': video['title'],
+                'published_at': video['published_at'],
+                'duration_seconds': video['duration_seconds'],
+                'kind': kind
+            })
+        self.by_id = {upload['id']: upload for upload in self.uploads}
+
+    def page(self, offset, max_results):
+        """Upload [offset, offset + max_results) e offset della pagina successiva (o None)"""
+        with self.lock:
+            items = self.uploads[offset:offset + max_results]
+            next_offset = offset + max_results if offset + max_results < len(self.uploads) else None
+            return items, next_offset, len(self.uploads)
+
+    def get(self, video_ids):
+        """Upload ancora esistenti per questi ID (gli eliminati non vengono restituiti)"""
+        with self.lock:
+            return [
+                self.by_id[video_id] for video_id in video_ids
+                if video_id in self.by_id and self.by_id[video_id]['kind'] != 'deleted'
+            ]
+
+    def publish(self, count=1):
+        """Pubblica count nuovi live in cima alla playlist; ritorna gli ID"""
+        with self.lock:
+            latest = datetime.strptime(self.uploads[0]['published_at'], '%Y-%m-%dT%H:%M:%SZ') if self.uploads else datetime(2026, 2, 14)
+            new_uploads = []
+            for i in range(count):
+                published = latest + timedelta(hours=i + 1)
+                new_uploads.append({
+                    'id': mock_video_id(self.rng),
+                    'title': f"Lezione del {published.strftime('%d/%m/%Y')}",
+                    'published_at': published.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    'duration_seconds': self.rng.randint(2400, 4200),
+                    'kind': 'live'
+                })
+            new_uploads.reverse()
+            self.uploads[:0] = new_uploads
+            self.by_id.update((upload['id'], upload) for upload in new_uploads)
+            return [upload['id'] for upload in new_uploads]
+
+    def delete(self, video_id):
+        """Marca un upload come eliminato; False se l'ID non esiste"""
+        with self.lock:
+            upload = self.by_id.get(video_id)
+            if not upload:
+                return False
+            upload['kind'] = 'deleted'
+            return True
+
+class FakeYouTubeAPI:
+    """Risposte dei tre endpoint + iniezione di latenza, errori e quota"""
+
+    def __init__(self, channel, seed=DEFAULT_SEED, latency_ms=0, jitter_ms=0,
+                 error_rate=0.0, quota=None):
+        self.channel = channel
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.quota = quota
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Azzera contatori e quota usata"""
+        with self.lock:
+            self.units_used = 0
+            self.requests = Counter()
+            self.not_modified = 0
+            self.errors = Counter()
+            self.seen_uris = Counter()
+
+    def stats(self):
+        """Contatori correnti (endpoint /__admin/stats)"""
+        with self.lock:
+            return {
+                'units_used': self.units_used,
+                'quota': self.quota,
+                'requests': dict(self.requests),
+                'not_modified': self.not_modified,
+                'errors': dict(self.errors),
+                'uploads': len(self.channel.uploads)
+            }
+
+    def handle(self, method, uri, if_none_match=None):
+        """
+        Risposta a una GET dell'API
+
+        Returns:
+            tuple: (status: int, body: dict oppure None, etag: str oppure None)
+        """
+        parsed = urlparse(uri)
+        endpoint = parsed.path[len(API_PREFIX):] if parsed.path.startswith(API_PREFIX) else None
+        handlers = {
+            'channels': self.channels_list,
+            'playlistItems': self.playlist_items_list,
+            'videos': self.videos_list,
+        }
+        if method != 'GET' or endpoint not in handlers:
+            return 404, google_error(404, 'notFound', f"Endpoint non supportato: {parsed.path}"), None
+
+        with self.lock:
+            self.requests[endpoint] += 1
+            self.seen_uris[uri] += 1
+            attempt = self.seen_uris[uri]
+
+        # Stesso seed + stesso URI + stessa ripetizione → stessa latenza e stesso esito
+        rng = random.Random(f"{self.seed}:{uri}:{attempt}")
+        delay_ms = self.latency_ms + rng.uniform(0, self.jitter_ms)
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+
+        with self.lock:
+            if self.quota is not None and self.units_used + UNITS_PER_CALL > self.quota:
+                self.errors[403] += 1
+                return 403, google_error(
+                    403, 'quotaExceeded',
+                    "The request cannot be completed because you have exceeded your quota.",
+                    domain='youtube.quota'
+                ), None
+            self.units_used += UNITS_PER_CALL
+
+        if rng.random() < self.error_rate:
+            status = rng.choice([500, 503])
+            with self.lock:
+                self.errors[status] += 1
+            reason = 'backendError' if status == 500 else 'serviceUnavailable'
+            return status, google_error(status, reason, 'Errore simulato dal server locale'), None
+
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        status, body = handlers[endpoint](params)
+        if status != 200:
+            return status, body, None
+
+        etag = compute_etag(body)
+        body['etag'] = etag
+        if if_none_match and if_none_match.strip('"') == etag:
+            with self.lock:
+                self.not_modified += 1
+            return 304, None, etag
+        return 200, body, etag
+
+    def channels_list(self, params):
+        """channels.list?part=contentDetails&id=…"""
+        items = []
+        if self.channel.channel_id in params.get('id', '').split(','):
+            items.append({
+                'kind': 'youtube#channel',
+                'id': self.channel.channel_id,
+                'contentDetails': {'relatedPlaylists': {'likes': '', 'uploads': self.channel.uploads_playlist_id}}
+            })
+        return 200, {
+            'kind': 'youtube#channelListResponse',
+            'pageInfo': {'totalResults': len(items), 'resultsPerPage': 5},
+            'items': items
+        }
+
+    def playlist_items_list(self, params):
+        """playlistItems.list?part=snippet&playlistId=…&maxResults=…&pageToken=…"""
+        if params.get('playlistId') != self.channel.uploads_playlist_id:
+            return 404, google_error(404, 'playlistNotFound', 'Playlist non trovata')
+
+        max_results = int(params.get('maxResults', 5))
+        if not 0 <= max_results <= MAX_RESULTS:
+            return 400, google_error(400, 'invalidParameter', f"maxResults fuori range: {max_results}")
+
+        offset = 0
+        if params.get('pageToken'):
+            offset = decode_page_token(params['pageToken'])
+            if offset is None:
+                return 400, google_error(400, 'invalidPageToken', 'pageToken non valido')
+
+        uploads, next_offset, total = self.channel.page(offset, max_results)
+        body = {
+            'kind': 'youtube#playlistItemListResponse',
+            'pageInfo': {'totalResults': total, 'resultsPerPage': max_results},
+            'items': [
+                {
+                    'kind': 'youtube#playlistItem',
+                    'id': base64.urlsafe_b64encode(f"{self.channel.uploads_playlist_id}.{u['id']}".encode('ascii')).decode('ascii'),
+                    'snippet': {
+                        'publishedAt': u['published_at'],
+                        'channelId': self.channel.channel_id,
+                        'title': u['title'] if u['kind'] != 'deleted' else 'Deleted video',
+                        'playlistId': self.channel.uploads_playlist_id,
+                        'position': offset + position,
+                        'resourceId': {'kind': 'youtube#video', 'videoId': u['id']}
+                    }
+                }
+                for position, u in enumerate(uploads)
+            ]
+        }
+        if next_offset is not None:
+            body['nextPageToken'] = encode_page_token(next_offset)
+        if offset:
+            body['prevPageToken'] = encode_page_token(max(0, offset - max_results))
+        return 200, body
+
+    def videos_list(self, params):
+        """videos.list?part=contentDetails,liveStreamingDetails&id=… (max 50 ID)"""
+        video_ids = [i for i in params.get('id', '').split(',') if i]
+        if len(video_ids) > MAX_RESULTS:
+            return 400, google_error(400, 'invalidParameter', f"Troppi ID: {len(video_ids)} (max {MAX_RESULTS})")
+
+        parts = set(params.get('part', '').split(','))
+        items = []
+        for upload in self.channel.get(video_ids):
+            item = {'kind': 'youtube#video', 'id': upload['id']}
+            if 'snippet' in parts:
+                item['snippet'] = {
+                    'publishedAt': upload['published_at'],
+                    'channelId': self.channel.channel_id,
+                    'title': upload['title'],
+                    'liveBroadcastContent': 'none'
+                }
+            if 'contentDetails' in parts:
+                item['contentDetails'] = {'duration': iso_duration(upload['duration_seconds'])}
+            if 'liveStreamingDetails' in parts and upload['kind'] == 'live':
+                start = datetime.strptime(upload['published_at'], '%Y-%m-%dT%H:%M:%SZ')
+                end = start + timedelta(seconds=upload['duration_seconds'])
+                item['liveStreamingDetails'] = {
+                    'actualStartTime': upload['published_at'],
+                    'actualEndTime': end.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    'scheduledStartTime': upload['published_at']
+                }
+            items.append(item)
+
+        return 200, {
+            'kind': 'youtube#videoListResponse',
+            'pageInfo': {'totalResults': len(items), 'resultsPerPage': len(items)},
+            'items': items
+        }
+
+    def admin(self, method, uri):
+        """Endpoint di controllo /__admin/…"""
+        parsed = urlparse(uri)
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        action = parsed.path[len('/__admin/'):]
+
+        if method == 'GET' and action == 'stats':
+            return 200, self.stats()
+        if method == 'GET' and action == 'video':
+            upload = self.channel.by_id.get(params.get('id', ''))
+            return (200, upload) if upload else (404, google_error(404, 'videoNotFound', 'Video non trovato'))
+        if method == 'POST' and action == 'publish':
+            return 200, {'published': self.channel.publish(int(params.get('count', 1)))}
+        if method == 'POST' and action == 'delete':
+            deleted = self.channel.delete(params.get('id', ''))
+            return (200 if deleted else 404), {'deleted': deleted}
+        if method == 'POST' and action == 'reset':
+            self.reset()
+            return 200, self.stats()
+        return 404, google_error(404, 'notFound', f"Azione non supportata: {action}")
+
+def make_handler(api):
+    """Classe handler legata a un'istanza di FakeYouTubeAPI"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep-alive: httplib2 riusa la connessione
+        disable_nagle_algorithm = True  # Header e body partono subito (niente attese da ~40 ms per risposta)
+
+        def _send(self, status, body=None, etag=None):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8') if body is not None else b''
+            self.send_response(status)
+            if body is not None:
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+            if etag:
+                self.send_header('ETag', f'"{etag}"')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            if payload:
+                self.wfile.write(payload)
+
+        def _dispatch(self, method):
+            if self.path.startswith('/__admin/'):
+                self._send(*api.admin(method, self.path))
+            else:
+                self._send(*api.handle(method, self.path, self.headers.get('If-None-Match')))
+
+        def do_GET(self):
+            self._dispatch('GET')
+
+        def do_POST(self):
+            self._dispatch('POST')
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+    return Handler
+
+def load_videos(archive=None, count=DEFAULT_VIDEOS, seed=DEFAULT_SEED):
+    """Video da servire: da un videos_cache.json oppure sintetici (in ordine canonico)"""
+    if archive:
+        with open(archive, 'r', encoding='utf-8') as f:
+            videos = json.load(f)['videos']
+        return sorted(videos, key=lambda v: (v['published_at'], v['id']), reverse=True)
+    return list(iter_mock_videos(count, seed))
+
+def start_server(videos, host=DEFAULT_HOST, port=0, channel_id=CHANNEL_ID, seed=DEFAULT_SEED,
+                 non_live_rate=NON_LIVE_RATE, deleted_rate=DELETED_RATE, **api_options):
+    """
+    Avvia il server in un thread (port=0 → porta libera), per test e benchmark
+
+    Args:
+        api_options: latency_ms, jitter_ms, error_rate, quota (vedi FakeYouTubeAPI)
+
+    Returns:
+        tuple: (server, api, base_url) — fermare con server.shutdown()
+    """
+    channel = FakeChannel(videos, channel_id, seed, non_live_rate, deleted_rate)
+    api = FakeYouTubeAPI(channel, seed, **api_options)
+    server = ThreadingHTTPServer((host, port), make_handler(api))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, api, f"http://{host}:{server.server_address[1]}"
+
+def main():
+    """Funzione principale"""
+    os.makedirs('.tmp', exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname)s: %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE, mode='a'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+    parser = argparse.ArgumentParser(description='Server locale che imita la YouTube Data API v3')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--archive', help='videos_cache.json da servire (default: archivio sintetico)')
+    parser.add_argument('--videos', type=int, default=DEFAULT_VIDEOS, help='dimensione archivio sintetico')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--channel-id', default=CHANNEL_ID)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='probabilità di 500/503 per richiesta')
+    parser.add_argument('--quota', type=int, default=None, help='unità disponibili prima del 403 quotaExceeded')
+    parser.add_argument('--non-live-rate', type=float, default=NON_LIVE_RATE)
+    parser.add_argument('--deleted-rate', type=float, default=DELETED_RATE)
+    args = parser.parse_args()
+
+    videos = load_videos(args.archive, args.videos, args.seed)
+    server, api, base_url = start_server(
+        videos, args.host, args.port, args.channel_id, args.seed,
+        args.non_live_rate, args.deleted_rate,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, quota=args.quota
+    )
+
+    kinds = Counter(upload['kind'] for upload in api.channel.uploads)
+    logger.info("=" * 60)
+    logger.info("Fake YouTube API")
+    logger.info("=" * 60)
+    logger.info(f"Upload: {len(api.channel.uploads):,} ({kinds['live']:,} live, "
+                f"{kinds['upload']:,} non live, {kinds['deleted']:,} eliminati)")
+    logger.info(f"Latenza: {args.latency_ms:.0f} ms (+{args.jitter_ms:.0f} jitter), "
+                f"errori 5xx: {args.error_rate:.1%}, quota: {args.quota or 'illimitata'}")
+    logger.info(f"In ascolto su {base_url}")
+    logger.info(f"Uso: YOUTUBE_API_BASE_URL={base_url} python execution/fetch_all_videos.py")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        logger.info(f"Statistiche finali: {api.stats()}")
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -1,28 +1,35 @@
 #!/usr/bin/env python3
 """
 Script: Fetch All Videos (Sync Completo)
-Scopo: Recuperare tutti i video live dal canale YouTube ABA e salvarli in data/videos_cache.json
+Scopo: Recuperare tutti i video live dal canale YouTube ABA, sincronizzarli nello store
+       SQLite (data/archive.db) ed esportarli in data/videos_cache.json
+       (+ dirette programmate/in corso in frontend/public/data/live_schedule.json)
 Direttiva di riferimento: directives/fetch_youtube_videos.md
-Costo API: ~63 unità (1 + 31 + 31)
+Costo API: ~63 unità a freddo (1 + 31 + 31), misurate e limitate da execution/youtube_quota.py
 """
 
 import os
 import sys
-import json
 import logging
+from collections import deque
 from datetime import datetime
 from pathlib import Path
-import isodate
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from archive_store import STORE_FILE, open_store, export_cache
+from video_cache import compute_stats
+from youtube_api import (
+    API_BASE_URL, EtagCache, DetailsCache, DETAILS_MAX_WORKERS, build_local_service, build_service,
+    estimate_full_sync_units, execute_request, fetch_video_details, log_failed_batches, stream_video_details
+)
+from youtube_quota import QuotaExceeded, QuotaGovernor
+from sync_checkpoint import SyncCheckpoint
+from live_schedule import write_live_schedule
 
 # Configurazione
 CHANNEL_ID = os.getenv('YOUTUBE_CHANNEL_ID', 'UC18Pm8LKXwtK2uUSoif5RVw')
 TOKEN_FILE = os.getenv('GOOGLE_TOKEN_FILE', 'token.json')
 SCOPES = ['https://www.googleapis.com/auth/youtube.readonly']
 OUTPUT_FILE = 'data/videos_cache.json'
-FRONTEND_CACHE_FILE = 'frontend/public/data/videos_cache.json'
 LOG_FILE = '.tmp/fetch_errors.log'
 
 # Setup logging
@@ -40,34 +47,50 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-def get_authenticated_service():
-    """Carica credenziali e crea servizio YouTube API"""
+def get_authenticated_service(governor=None):
+    """
+    Carica credenziali e crea servizio YouTube API (o verso YOUTUBE_API_BASE_URL, senza OAuth)
+    Con governor ogni richiesta viene addebitata al budget quota prima di partire
+    """
+    if API_BASE_URL:
+        logger.info(f"API YouTube locale: {API_BASE_URL} (nessuna autenticazione)")
+        return build_local_service(API_BASE_URL, governor)
+
     if not os.path.exists(TOKEN_FILE):
         logger.error(f"Token file '{TOKEN_FILE}' non trovato!")
         logger.error("Esegui prima: python execution/youtube_oauth_setup.py")
         sys.exit(1)
 
     try:
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-        return build('youtube', 'v3', credentials=creds)
+        from token_broker import get_credentials
+
+        # Access token condiviso (token.json): rinnovato solo se in scadenza, una volta per tutti i worker
+        creds = get_credentials(TOKEN_FILE, SCOPES)
+        return build_service(credentials=creds, governor=governor)
     except Exception as e:
         logger.error(f"Errore durante autenticazione: {e}")
         logger.error("Prova a rieseguire: python execution/youtube_oauth_setup.py")
         sys.exit(1)
 
-def get_uploads_playlist_id(youtube, channel_id):
+def get_uploads_playlist_id(youtube, channel_id, store=None):
     """
     Step 1: Ottieni l'ID della playlist uploads del canale
-    Costo: 1 unità
+    Costo: 1 unità (0 con store: l'ID non cambia mai e viene salvato in meta)
     """
     logger.info(f"Step 1: Ottengo uploads playlist ID per canale {channel_id}")
 
+    meta_key = f"uploads_playlist_id:{channel_id}"
+    cached = store.get_meta(meta_key) if store else None
+    if cached:
+        logger.info(f"Uploads playlist ID (dallo store): {cached}")
+        return cached
+
     try:
         request = youtube.channels().list(
             part='contentDetails',
             id=channel_id
         )
-        response = request.execute()
+        response = execute_request(request)
 
         if not response.get('items'):
             logger.error(f"Canale {channel_id} non trovato!")
@@ -75,6 +98,9 @@ def get_uploads_playlist_id(youtube, channel_id):
 
         uploads_playlist_id = response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
         logger.info(f"Uploads playlist ID: {uploads_playlist_id}")
+        if store:
+            store.set_meta(meta_key, uploads_playlist_id)
+            store.commit()
         return uploads_playlist_id
 
     except HttpError as e:
@@ -88,17 +114,38 @@ def get_uploads_playlist_id(youtube, channel_id):
             logger.error(f"Errore HTTP {e.resp.status}: {e}")
         sys.exit(1)
 
-def get_all_playlist_items(youtube, playlist_id):
+def iter_playlist_pages(youtube, playlist_id, etag_cache=None, checkpoint=None):
     """
-    Step 2: Recupera TUTTI i video dalla playlist uploads
+    Step 2: Scorre TUTTE le pagine della playlist uploads, una alla volta
     Usa paginazione con nextPageToken
+    Con etag_cache le pagine invariate rispondono 304 e vengono riusate dallo store
+    Con checkpoint le pagine già scaricate da un run interrotto vengono rilette da .tmp/
+    e la paginazione riprende dal loro nextPageToken; ogni pagina nuova viene salvata
     Costo: ~1 unità per pagina (50 items/pagina) → ~31 unità per 1.530 video
+
+    Gli errori temporanei vengono ritentati; se la richiesta fallisce comunque
+    l'HttpError risale al chiamante (le pagine già scaricate restano nel checkpoint)
+
+    Yields:
+        list: video della pagina (max 50)
     """
     logger.info(f"Step 2: Recupero tutti i video dalla playlist {playlist_id}")
 
-    all_videos = []
     next_page_token = None
     page_num = 1
+    total_videos = 0
+
+    if checkpoint:
+        for page_videos in checkpoint.pages:
+            total_videos += len(page_videos)
+            yield page_videos
+        if checkpoint.pages:
+            logger.info(f"Pagine 1-{len(checkpoint.pages)} dal checkpoint: {total_videos} video")
+        if checkpoint.playlist_complete:
+            logger.info(f"Totale video recuperati dalla playlist: {total_videos}")
+            return
+        next_page_token = checkpoint.next_page_token
+        page_num = len(checkpoint.pages) + 1
 
     while True:
         try:
@@ -108,65 +155,65 @@ def get_all_playlist_items(youtube, playlist_id):
                 maxResults=50,
                 pageToken=next_page_token
             )
-            response = request.execute()
-
-            items = response.get('items', [])
-            logger.info(f"Pagina {page_num}: {len(items)} video")
-
-            for item in items:
-                video_id = item['snippet']['resourceId']['videoId']
-                video_data = {
-                    'id': video_id,
-                    'title': item['snippet']['title'],
-                    'published_at': item['snippet']['publishedAt'],
-                    'thumbnail_url': '/thumbnail-default.png'
-                }
-                all_videos.append(video_data)
-
-            next_page_token = response.get('nextPageToken')
-            if not next_page_token:
-                break
-
-            page_num += 1
-
+            if etag_cache:
+                response = etag_cache.execute(request)
+            else:
+                response = execute_request(request)
         except HttpError as e:
-            logger.error(f"Errore durante recupero playlist items: {e}")
-            sys.exit(1)
-
-    logger.info(f"Totale video recuperati dalla playlist: {len(all_videos)}")
-    return all_videos
+            logger.error(f"Errore durante recupero playlist items (pagina {page_num}): {e}")
+            raise
+
+        items = response.get('items', [])
+        logger.info(f"Pagina {page_num}: {len(items)} video")
+
+        page_videos = []
+        for item in items:
+            video_id = item['snippet']['resourceId']['videoId']
+            video_data = {
+                'id': video_id,
+                'title': item['snippet']['title'],
+                'published_at': item['snippet']['publishedAt'],
+                'thumbnail_url': '/thumbnail-default.png'
+            }
+            page_videos.append(video_data)
+
+        next_page_token = response.get('nextPageToken')
+        if checkpoint:
+            checkpoint.add_page(page_videos, next_page_token)
+
+        total_videos += len(page_videos)
+        yield page_videos
+
+        if not next_page_token:
+            break
+
+        page_num += 1
+
+    logger.info(f"Totale video recuperati dalla playlist: {total_videos}")
+
+def get_all_playlist_items(youtube, playlist_id, etag_cache=None):
+    """Recupera TUTTI i video dalla playlist uploads in un'unica lista"""
+    return [
+        video
+        for page in iter_playlist_pages(youtube, playlist_id, etag_cache)
+        for video in page
+    ]
 
-def get_video_details(youtube, video_ids):
+def get_video_details(youtube, video_ids, details_cache=None):
     """
     Step 3: Recupera dettagli dei video (durata, liveStreamingDetails)
-    Usa batching (50 ID per chiamata)
-    Costo: 1 unità per chiamata → ~31 unità per 1.530 video
+    Usa batching (50 ID per chiamata) con più batch in parallelo
+    Con details_cache solo gli ID sconosciuti o stale vengono richiesti all'API
+    Costo: 1 unità per chiamata → ~31 unità per 1.530 video (0-1 con cache)
     """
-    logger.info(f"Step 3: Recupero dettagli per {len(video_ids)} video")
-
-    all_details = []
-    batch_size = 50
-    num_batches = (len(video_ids) + batch_size - 1) // batch_size
-
-    for i in range(0, len(video_ids), batch_size):
-        batch = video_ids[i:i + batch_size]
-        batch_num = (i // batch_size) + 1
-
-        logger.info(f"Batch {batch_num}/{num_batches}: Fetching {len(batch)} video")
+    logger.info(f"Step 3: Recupero dettagli per {len(video_ids)} video "
+                f"({DETAILS_MAX_WORKERS} richieste in parallelo)")
 
-        try:
-            request = youtube.videos().list(
-                part='contentDetails,liveStreamingDetails',
-                id=','.join(batch)
-            )
-            response = request.execute()
-
-            all_details.extend(response.get('items', []))
-
-        except HttpError as e:
-            logger.error(f"Errore durante recupero video details (batch {batch_num}): {e}")
-            # Continua con i batch successivi invece di fermarsi
-            continue
+    if details_cache:
+        all_details, failed_batches = details_cache.fetch(youtube, video_ids)
+    else:
+        all_details, failed_batches = fetch_video_details(youtube, video_ids)
+    log_failed_batches(failed_batches)
 
     logger.info(f"Dettagli recuperati per {len(all_details)} video")
     return all_details
@@ -178,6 +225,8 @@ def parse_duration(duration_iso):
     Returns:
         tuple: (duration_seconds: int, duration_formatted: str)
     """
+    import isodate
+
     try:
         duration = isodate.parse_duration(duration_iso)
         total_seconds = int(duration.total_seconds())
@@ -197,6 +246,72 @@ def parse_duration(duration_iso):
         logger.warning(f"Errore parsing durata '{duration_iso}': {e}")
         return 0, "Durata non disponibile"
 
+def iter_merged_videos(batches, stats):
+    """
+    Merge in streaming di dati playlist e dettagli video
+    Filtra solo video live (hanno liveStreamingDetails)
+
+    Args:
+        batches: iterabile di coppie (playlist_videos, video_details)
+        stats: dict aggiornato con i contatori live/non_live/missing_details
+
+    Yields:
+        dict: video live nel formato finale della cache
+    """
+    for playlist_videos, video_details in batches:
+        # Crea dict per lookup veloce
+        details_dict = {item['id']: item for item in video_details}
+
+        for video in playlist_videos:
+            video_id = video['id']
+
+            # Cerca dettagli
+            details = details_dict.get(video_id)
+            if not details:
+                logger.warning(f"Video {video_id} non trovato in details (probabilmente eliminato)")
+                stats['missing_details'] += 1
+                continue
+
+            # Filtra solo video live
+            if 'liveStreamingDetails' not in details:
+                stats['non_live'] += 1
+                continue
+
+            # Parse durata
+            duration_iso = details.get('contentDetails', {}).get('duration', 'P0D')
+            duration_seconds, duration_formatted = parse_duration(duration_iso)
+
+            # Parse data pubblicazione
+            published_at = video['published_at']
+            published_datetime = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
+
+            # Costruisci oggetto finale
+            video_obj = {
+                'id': video_id,
+                'title': video['title'],
+                'published_at': published_at,
+                'year': published_datetime.year,
+                'month': published_datetime.month,
+                'duration_seconds': duration_seconds,
+                'duration_formatted': duration_formatted,
+                'thumbnail_url': '/thumbnail-default.png',
+                'watch_url': f"https://www.youtube.com/watch?v={video_id}"
+            }
+
+            stats['live'] += 1
+            yield video_obj
+
+def new_merge_stats():
+    """Contatori per il merge/filtro dei video"""
+    return {'live': 0, 'non_live': 0, 'missing_details': 0}
+
+def log_merge_stats(stats):
+    """Logga il riepilogo del merge/filtro"""
+    logger.info(f"Video live filtrati: {stats['live']}")
+    logger.info(f"Video non-live skippati: {stats['non_live']}")
+    if stats['missing_details'] > 0:
+        logger.warning(f"Video senza dettagli (eliminati): {stats['missing_details']}")
+
 def merge_and_filter_videos(playlist_videos, video_details):
     """
     Merge dati da playlist e dettagli video
@@ -204,97 +319,92 @@ def merge_and_filter_videos(playlist_videos, video_details):
     """
     logger.info("Step 4: Merge e filtro video live")
 
-    # Crea dict per lookup veloce
-    details_dict = {item['id']: item for item in video_details}
-
-    filtered_videos = []
-    non_live_count = 0
-    missing_details_count = 0
-
-    for video in playlist_videos:
-        video_id = video['id']
-
-        # Cerca dettagli
-        details = details_dict.get(video_id)
-        if not details:
-            logger.warning(f"Video {video_id} non trovato in details (probabilmente eliminato)")
-            missing_details_count += 1
-            continue
-
-        # Filtra solo video live
-        if 'liveStreamingDetails' not in details:
-            non_live_count += 1
-            continue
-
-        # Parse durata
-        duration_iso = details.get('contentDetails', {}).get('duration', 'P0D')
-        duration_seconds, duration_formatted = parse_duration(duration_iso)
-
-        # Parse data pubblicazione
-        published_at = video['published_at']
-        published_datetime = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
-
-        # Costruisci oggetto finale
-        video_obj = {
-            'id': video_id,
-            'title': video['title'],
-            'published_at': published_at,
-            'year': published_datetime.year,
-            'month': published_datetime.month,
-            'duration_seconds': duration_seconds,
-            'duration_formatted': duration_formatted,
-            'thumbnail_url': '/thumbnail-default.png',
-            'watch_url': f"https://www.youtube.com/watch?v={video_id}"
-        }
-
-        filtered_videos.append(video_obj)
-
-    logger.info(f"Video live filtrati: {len(filtered_videos)}")
-    logger.info(f"Video non-live skippati: {non_live_count}")
-    if missing_details_count > 0:
-        logger.warning(f"Video senza dettagli (eliminati): {missing_details_count}")
+    stats = new_merge_stats()
+    filtered_videos = list(iter_merged_videos([(playlist_videos, video_details)], stats))
+    log_merge_stats(stats)
 
     return filtered_videos
 
-def save_cache(videos):
-    """Salva i video in data/videos_cache.json"""
-    logger.info("Step 5: Salvataggio cache")
-
-    # Ordina per data decrescente (più recenti prima)
-    videos_sorted = sorted(videos, key=lambda x: x['published_at'], reverse=True)
-
-    # Calcola statistiche
-    total_hours = sum(v['duration_seconds'] for v in videos_sorted) / 3600
+def run_ingest_pipeline(youtube, playlist_id, etag_cache=None, details_cache=None, checkpoint=None):
+    """
+    Step 2-4 in streaming: paginazione → dettagli → merge/filtro
 
-    if videos_sorted:
-        first_video_date = min(v['published_at'] for v in videos_sorted)
-        last_video_date = max(v['published_at'] for v in videos_sorted)
-    else:
-        first_video_date = None
-        last_video_date = None
+    Ogni pagina da 50 video passa subito allo stage dei dettagli (in parallelo),
+    mentre la paginazione prosegue; i video live escono già nel formato finale.
+    In memoria restano solo i record finali e i batch in volo.
+    Con details_cache i dettagli già noti arrivano dallo store locale.
+    Con checkpoint pagine e batch completati vengono salvati in .tmp/ man mano;
+    ripartendo da un checkpoint, i video con dettagli già salvati non vengono richiesti.
 
-    # Costruisci JSON finale
-    cache_data = {
-        'last_updated': datetime.utcnow().isoformat() + 'Z',
-        'total_videos': len(videos_sorted),
-        'total_hours': int(total_hours),
-        'videos': videos_sorted
-    }
+    Returns:
+        tuple: (live_videos: list ordinata per data decrescente,
+                failed_batches: list dei batch videos.list falliti anche dopo i retry)
+    """
+    logger.info(f"Step 2-4: Pipeline playlist → dettagli ({DETAILS_MAX_WORKERS} richieste "
+                f"in parallelo) → merge/filtro live")
+
+    stats = new_merge_stats()
+    failed_batches = []
+    resumed = deque()
+
+    def pending_pages():
+        # Video con dettagli nel checkpoint: escono subito, senza passare dall'API
+        for page_videos in iter_playlist_pages(youtube, playlist_id, etag_cache, checkpoint):
+            if checkpoint and checkpoint.details:
+                done = [v for v in page_videos if v['id'] in checkpoint.details]
+                if done:
+                    resumed.append((done, [checkpoint.details[v['id']] for v in done]))
+                page_videos = [v for v in page_videos if v['id'] not in checkpoint.details]
+            if page_videos:
+                yield page_videos
+
+    def detail_batches():
+        stream = details_cache.stream if details_cache else stream_video_details
+        for page_videos, details, failure in stream(youtube, pending_pages(), key=lambda v: v['id']):
+            while resumed:
+                yield resumed.popleft()
+            if failure:
+                # Niente merge: i suoi ID non sono "senza dettagli" (eliminati), li riporta log_failed_batches
+                failed_batches.append(failure)
+                continue
+            if checkpoint:
+                checkpoint.add_batch(details)
+            yield page_videos, details
+        while resumed:
+            yield resumed.popleft()
+
+    live_videos = sorted(
+        iter_merged_videos(detail_batches(), stats),
+        key=lambda x: x['published_at'],
+        reverse=True
+    )
+
+    log_failed_batches(failed_batches)
+    log_merge_stats(stats)
+
+    return live_videos, failed_batches
+
+def save_cache(store, changed=True):
+    """
+    Esporta lo store in data/videos_cache.json
+    (la copia nel frontend e gli altri artefatti li produce execution/build_artifacts.py)
+    Senza righe cambiate nello store (e con l'export già presente) non rilegge né riscrive nulla;
+    se il contenuto è identico a quello su disco write_cache non riscrive nulla
 
-    # Salva con formattazione leggibile
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(cache_data, f, indent=2, ensure_ascii=False)
+    Returns:
+        bool: True se l'export è stato riscritto
+    """
+    logger.info("Step 5: Export cache")
 
-    # Copia anche nella cartella public del frontend (servito direttamente da Vercel)
-    os.makedirs(os.path.dirname(FRONTEND_CACHE_FILE), exist_ok=True)
-    import shutil
-    shutil.copy2(OUTPUT_FILE, FRONTEND_CACHE_FILE)
+    if not changed and os.path.exists(OUTPUT_FILE):
+        logger.info("✅ Nessuna riga cambiata nello store: export invariato")
+        return False
 
-    logger.info(f"Cache salvata in: {OUTPUT_FILE}")
-    logger.info(f"Cache copiata in: {FRONTEND_CACHE_FILE}")
-    logger.info(f"Dimensione file: {os.path.getsize(OUTPUT_FILE) / 1024:.1f} KB")
+    written, _ = export_cache(store, OUTPUT_FILE)
+    if not written:
+        logger.info("✅ Nessuna modifica ai dati: file e last_updated invariati")
 
-    return total_hours, first_video_date, last_video_date
+    return written
 
 def main():
     """Funzione principale"""
@@ -302,48 +412,104 @@ def main():
     logger.info("Fetch All Videos - Sync Completo")
     logger.info("=" * 60)
 
+    store = None
+    run_id = None
+    checkpoint = None
+    governor = QuotaGovernor()
     try:
-        # Autenticazione
-        youtube = get_authenticated_service()
+        # Store SQLite (inizializzato dall'export JSON al primo avvio)
+        store = open_store(STORE_FILE, OUTPUT_FILE, CHANNEL_ID)
 
-        # Step 1: Ottieni uploads playlist ID (1 unità)
-        uploads_playlist_id = get_uploads_playlist_id(youtube, CHANNEL_ID)
+        # Autenticazione (ogni richiesta viene addebitata al governor)
+        youtube = get_authenticated_service(governor)
 
-        # Step 2: Recupera tutti i video dalla playlist (~31 unità)
-        playlist_videos = get_all_playlist_items(youtube, uploads_playlist_id)
+        # Step 1: Ottieni uploads playlist ID (1 unità, 0 dopo il primo run)
+        uploads_playlist_id = get_uploads_playlist_id(youtube, CHANNEL_ID, store)
 
-        # Step 3: Recupera dettagli video (~31 unità)
-        video_ids = [v['id'] for v in playlist_videos]
-        video_details = get_video_details(youtube, video_ids)
+        # Progresso di un run interrotto (pagine e batch già scaricati), se recente
+        checkpoint = SyncCheckpoint.open(uploads_playlist_id)
 
-        # Step 4: Merge e filtra solo video live
-        live_videos = merge_and_filter_videos(playlist_videos, video_details)
+        # Pre-flight: il resto del sync deve stare nel budget quota (run e giorno)
+        estimate = estimate_full_sync_units(store, checkpoint)
+        available = governor.remaining()
+        if estimate > available:
+            logger.error(f"Budget quota insufficiente: sync completo stimato ~{estimate} unità, disponibili {available}")
+            logger.error("Sync rimandato: alza YOUTUBE_QUOTA_RUN_BUDGET o attendi il reset giornaliero (mezzanotte Pacific Time)")
+            sys.exit(1)
+        logger.info(f"Stima quota sync completo: ~{estimate} unità (disponibili {available})")
+
+        # Step 2-4: Playlist (~31 unità, 304 se invariata) → dettagli (~31 unità)
+        # → merge e filtro live, in streaming
+        # Dettagli già noti (live conclusi, non-live) arrivano dallo store locale
+        run_id = store.begin_sync('full', CHANNEL_ID)
+        etag_cache = EtagCache(store)
+        details_cache = DetailsCache(store, governor)
+        live_videos, failed_batches = run_ingest_pipeline(
+            youtube, uploads_playlist_id, etag_cache, details_cache, checkpoint
+        )
+        etag_cache.save()
+        etag_cache.log_stats()
+        details_cache.save()
+        details_cache.log_stats()
 
         if not live_videos:
+            store.finish_sync(run_id, 'failed')
             logger.error("ATTENZIONE: Nessun video live trovato!")
             logger.error("Verifica che il canale abbia video con liveStreamingDetails")
             sys.exit(1)
 
-        # Step 5: Salva cache
-        total_hours, first_date, last_date = save_cache(live_videos)
+        if failed_batches:
+            # Video senza dettagli: non si può sapere se esistono ancora → niente eliminazioni,
+            # il checkpoint resta e il prossimo run richiede solo i batch falliti
+            counts = store.sync_videos(live_videos, CHANNEL_ID)
+            store.finish_sync(run_id, 'partial', counts)
+        else:
+            # Upsert nello store: solo le righe nuove/cambiate vengono scritte,
+            # i video del canale non più presenti vengono eliminati
+            counts = store.sync_videos(live_videos, CHANNEL_ID, full=True)
+            store.finish_sync(run_id, 'ok', counts)
+            checkpoint.discard()
+
+        # Step 5: Export cache
+        save_cache(store, changed=any(counts.values()))
+        write_live_schedule(store)
+        total_hours, first_date, last_date = compute_stats(live_videos)
 
         # Riepilogo finale
         logger.info("=" * 60)
-        logger.info("🎉 SYNC COMPLETATO CON SUCCESSO!")
+        if failed_batches:
+            failed_ids = sum(len(b['ids']) for b in failed_batches)
+            logger.warning(f"⚠️  SYNC PARZIALE: {failed_ids} video senza dettagli, nessun video eliminato dallo store")
+            logger.warning("Rilancia lo script: riprende dal checkpoint e richiede solo i batch falliti")
+        else:
+            logger.info("🎉 SYNC COMPLETATO CON SUCCESSO!")
         logger.info("=" * 60)
         logger.info(f"Totale video live: {len(live_videos)}")
         logger.info(f"Ore totali: ~{total_hours:.0f}h")
         logger.info(f"Prima lezione: {first_date[:10] if first_date else 'N/A'}")
         logger.info(f"Ultima lezione: {last_date[:10] if last_date else 'N/A'}")
-        logger.info(f"Quota API usata: ~63 unità su 10.000 giornaliere")
-        logger.info(f"Cache salvata in: {OUTPUT_FILE}")
+        logger.info(f"Quota API usata: {governor.run_units} unità (dettaglio per endpoint sotto)")
+        logger.info(f"Store: {STORE_FILE} → export: {OUTPUT_FILE}")
         logger.info("")
         logger.info("Prossimi passi:")
         logger.info("  1. Verifica il file data/videos_cache.json")
-        logger.info("  2. Esegui: python execution/generate_static_json.py")
+        logger.info("  2. Esegui: python execution/build_artifacts.py (copia frontend, JSON, indice, compressione)")
         logger.info("  3. Sviluppa il frontend")
         logger.info("")
 
+    except QuotaExceeded as e:
+        if run_id:
+            store.finish_sync(run_id, 'failed')
+        logger.error(f"\n❌ Budget quota esaurito: {e}")
+        logger.error("Archivio non modificato: riesegui con più budget o dopo il reset (mezzanotte Pacific Time)")
+        logger.error("Il prossimo run riprende dal checkpoint (pagine e batch già scaricati)")
+        sys.exit(1)
+    except HttpError as e:
+        if run_id:
+            store.finish_sync(run_id, 'failed')
+        logger.error(f"\n❌ Errore API anche dopo i retry: {e}")
+        logger.error("Archivio non modificato: rilancia lo script per riprendere dal checkpoint")
+        sys.exit(1)
     except KeyboardInterrupt:
         logger.warning("\n⚠️  Sync interrotto dall'utente")
         sys.exit(1)
@@ -351,6 +517,12 @@ def main():
         logger.error(f"\n❌ ERRORE IMPREVISTO: {e}", exc_info=True)
         logger.error("Consulta .tmp/fetch_errors.log per dettagli")
         sys.exit(1)
+    finally:
+        governor.log_breakdown()
+        if checkpoint:
+            checkpoint.close()
+        if store:
+            store.close()
 
 if __name__ == '__main__':
     main()
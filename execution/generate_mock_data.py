@@ -1,126 +1,270 @@
 #!/usr/bin/env python3
 """
 Script: Generate Mock Data
-Scopo: Genera dati mock realistici per sviluppo frontend senza attendere OAuth/API YouTube
-Output: data/videos_cache_mock.json
+Scopo: Genera dati mock realistici per sviluppo frontend e benchmark senza OAuth/API YouTube
+       Generatore deterministico (seed) e in streaming: i record escono già in ordine canonico,
+       un giorno alla volta, e vengono scritti su disco senza tenere l'archivio in memoria
+       (10k, 100k, 1M video con memoria costante)
+Output: data/videos_cache_mock.json (stesso formato di data/videos_cache.json)
+Direttiva di riferimento: directives/cache_strategy.md
+
+Distribuzione (ricavata da data/videos_cache.json, canale reale 2020-2026):
+- Lezioni dal lunedì al venerdì; il martedì di solito doppia (Pomeriggio 15-16, Sera 18-19)
+- Lezione singola: ~1/3 pomeriggio (15-16), ~2/3 sera (18-19)
+- Durata lezioni ~55 min (±9), code fino a 2 ore; Agosto, Aprile e Dicembre più scarichi
+- Titoli "Lezione del gg/mm/aaaa" (+ " Pomeriggio"/" Sera"), qualche "(SOLO AUDIO)",
+  emoji a Natale, ~3% di pillole tematiche brevi (5-16 min, anche nel weekend)
+
+Uso:
+    python execution/generate_mock_data.py [quanti] [seed]    (default: 50 42)
 """
 
+import os
+import sys
 import json
 import random
+import hashlib
 from datetime import datetime, timedelta
 
-# Titoli realistici per lezioni di teoria patente
-LESSON_TOPICS = [
-    "Segnaletica stradale - Segnali di pericolo",
-    "Segnaletica stradale - Segnali di precedenza",
-    "Segnaletica stradale - Segnali di divieto",
-    "Segnaletica stradale - Segnali di obbligo",
-    "Segnaletica stradale - Segnali di indicazione",
-    "Norme sulla precedenza agli incroci",
-    "Distanza di sicurezza e tempo di reazione",
-    "Limiti di velocità e sanzioni",
-    "Sorpasso e cambio di corsia",
-    "Fermata e sosta - Regole e divieti",
-    "Uso delle luci - Anabbaglianti, abbaglianti, fendinebbia",
-    "Uso delle luci - Frecce e luci di emergenza",
-    "Cinture di sicurezza e sistemi di ritenuta",
-    "Comportamento in caso di incidente",
-    "Alcol, droghe e guida - Normativa",
-    "Documenti di circolazione - Patente e libretto",
-    "Assicurazione RCA obbligatoria",
-    "Revisione periodica del veicolo",
-    "Categorie di patenti A, B, C, D",
-    "Norme di comportamento con pedoni e ciclisti",
-    "Attraversamento pedonale - Regole",
-    "Rotatorie - Come affrontarle",
-    "Autostrada - Norme di circolazione",
-    "Trasporto di persone e merci",
-    "Patente a punti - Decurtazione e recupero",
-    "Guida in condizioni difficili - Pioggia, nebbia, neve",
-    "Manutenzione del veicolo - Pneumatici e freni",
-    "Educazione stradale - Comportamento corretto",
-    "Circolazione nei centri abitati",
-    "Segnaletica orizzontale - Strisce e zebre",
+# Configurazione
+OUTPUT_FILE = 'data/videos_cache_mock.json'
+DEFAULT_COUNT = 50
+DEFAULT_SEED = 42
+END_DATE = datetime(2026, 2, 14)  # Fisso: stesso seed → stesso file, byte per byte
+MIN_DATE = datetime(2000, 1, 1)  # Oltre ~7.000 video, più lezioni in parallelo per giorno
+THUMBNAIL_URL = '/thumbnail-default.png'
+ID_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+
+# Encoder riusati per ogni record (json.dumps ne crea uno a chiamata)
+_encode_field = json.JSONEncoder(ensure_ascii=False).encode
+_encode_canonical = json.JSONEncoder(sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode
+
+# Probabilità di lezione per giorno della settimana (lunedì = 0)
+LESSON_PROBABILITY = [0.85, 1.0, 0.9, 0.88, 0.87, 0.0, 0.0]
+DOUBLE_LESSON_PROBABILITY = [0.0, 0.77, 0.02, 0.02, 0.02, 0.0, 0.0]  # Pomeriggio + Sera
+SHORT_PROBABILITY = [0.03, 0.03, 0.03, 0.03, 0.03, 0.015, 0.04]  # Pillole tematiche
+MONTH_FACTOR = {4: 0.75, 8: 0.7, 12: 0.75}  # Mesi con meno lezioni (festività, ferie)
+AFTERNOON_SHARE = 0.33  # Lezioni singole nel pomeriggio
+AUDIO_ONLY_PROBABILITY = 0.002
+CHRISTMAS_PROBABILITY = 0.3  # Emoji nel titolo delle lezioni dal 20 al 24 dicembre
+
+LESSON_DURATION_MEAN = 3300
+LESSON_DURATION_STDEV = 600
+LESSON_DURATION_TAIL = 0.005  # Lezioni lunghe (fino a 2 ore)
+SHORT_DURATION_RANGE = (280, 990)
+
+# Titoli delle pillole (rubriche reali del canale)
+SHORT_TOPICS = [
+    "Pillole di Teoria - La Patente C",
+    "Pillole di Teoria - Le Luci",
+    "Pillole di Teoria - La Distanza di Sicurezza",
+    "Pillole di Teoria - RCA (Responsabilità Civile Auto)",
+    "Pillole di Meccanica - ABS",
+    "Pillole di Meccanica - ESP",
+    "Pillole di Meccanica - Gli Pneumatici",
+    "Pillole di Meccanica - Il Turbocompressore",
+    "Pillole di Guida - Il Sorpasso",
+    "Pillole di Guida - Il Servosterzo",
+    "L' Ingegnere Insegna - Ibrido Toyota",
+    "L' Ingegnere Insegna - Le Sospensioni",
+    "L' Ingegnere Insegna - Impianto di Scarico",
+    "L' Avvocato Risponde - Premio e Massimale",
+    "L' Avvocato Risponde - Responsabilità Patenti",
+    "Psicologia al Volante - Ansia e Rabbia",
+    "Psicologia al Volante - Posizione di Guida",
 ]
 
-def generate_random_date(start_date, end_date):
-    """Genera una data casuale tra start_date e end_date"""
-    delta = end_date - start_date
-    random_days = random.randint(0, delta.days)
-    return start_date + timedelta(days=random_days)
+def format_duration(total_seconds):
+    """Come parse_duration di fetch_all_videos.py"""
+    hours = total_seconds // 3600
+    minutes = (total_seconds % 3600) // 60
+    if hours > 0:
+        return f"{hours}h {minutes}m"
+    if minutes > 0:
+        return f"{minutes}m"
+    return f"{total_seconds}s"
+
+def mock_video_id(rng):
+    """ID di 11 caratteri come YouTube (66 bit casuali → collisioni trascurabili anche a 1M)"""
+    bits = rng.getrandbits(66)
+    return ''.join(ID_ALPHABET[(bits >> shift) & 63] for shift in range(60, -1, -6))
 
-def generate_mock_videos(count=50):
-    """Genera N video mock realistici"""
+def lesson_duration(rng):
+    """Durata di una lezione live (secondi)"""
+    if rng.random() < LESSON_DURATION_TAIL:
+        return rng.randint(4200, 7200)
+    return max(1200, min(4500, int(rng.gauss(LESSON_DURATION_MEAN, LESSON_DURATION_STDEV))))
+
+def lesson_title(rng, day, slot=None):
+    """Titolo nel formato reale, es. "Lezione del 13/02/2026 Sera" """
+    title = f"Lezione del {day.strftime('%d/%m/%Y')}"
+    if slot:
+        title += f" {slot}"
+    if rng.random() < AUDIO_ONLY_PROBABILITY:
+        title += " (SOLO AUDIO)"
+    if day.month == 12 and 20 <= day.day <= 24 and rng.random() < CHRISTMAS_PROBABILITY:
+        title = f"🎅 {title} 🎅"
+    return title
+
+def mock_video(rng, day, hour_range, title, duration_seconds):
+    """Record nel formato della cache, con orario casuale nella fascia"""
+    published = day + timedelta(
+        hours=rng.randint(*hour_range), minutes=rng.randrange(60), seconds=rng.randrange(60)
+    )
+    video_id = mock_video_id(rng)
+    return {
+        'id': video_id,
+        'title': title,
+        'published_at': published.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'year': published.year,
+        'month': published.month,
+        'duration_seconds': duration_seconds,
+        'duration_formatted': format_duration(duration_seconds),
+        'thumbnail_url': THUMBNAIL_URL,
+        'watch_url': f"https://www.youtube.com/watch?v={video_id}"
+    }
+
+def day_schedule(rng, day):
+    """Video pubblicati in un giorno (lezioni live + eventuale pillola)"""
+    weekday = day.weekday()
+    factor = MONTH_FACTOR.get(day.month, 1.0)
     videos = []
 
-    # Range date: dal 18 maggio 2020 a oggi
-    start_date = datetime(2020, 5, 18)
-    end_date = datetime.now()
+    if rng.random() < LESSON_PROBABILITY[weekday] * factor:
+        if rng.random() < DOUBLE_LESSON_PROBABILITY[weekday]:
+            videos.append(mock_video(rng, day, (15, 16), lesson_title(rng, day, 'Pomeriggio'), lesson_duration(rng)))
+            videos.append(mock_video(rng, day, (18, 19), lesson_title(rng, day, 'Sera'), lesson_duration(rng)))
+        else:
+            hour_range = (15, 16) if rng.random() < AFTERNOON_SHARE else (18, 19)
+            videos.append(mock_video(rng, day, hour_range, lesson_title(rng, day), lesson_duration(rng)))
 
-    # Genera date distribuite uniformemente
-    dates = sorted([generate_random_date(start_date, end_date) for _ in range(count)], reverse=True)
+    if rng.random() < SHORT_PROBABILITY[weekday]:
+        videos.append(mock_video(rng, day, (12, 19), rng.choice(SHORT_TOPICS), rng.randint(*SHORT_DURATION_RANGE)))
 
-    for i, pub_date in enumerate(dates):
-        # ID video realistico (11 caratteri come YouTube)
-        video_id = f"mock{i:04d}{''.join(random.choices('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789', k=5))}"
+    return videos
 
-        # Titolo casuale
-        topic = random.choice(LESSON_TOPICS)
-        title = f"Lezione live - {topic}"
+def expected_videos_per_day():
+    """Media di video al giorno del canale reale (per scegliere la densità)"""
+    per_week = sum(
+        p * (1 + d) + s
+        for p, d, s in zip(LESSON_PROBABILITY, DOUBLE_LESSON_PROBABILITY, SHORT_PROBABILITY)
+    )
+    return per_week / 7 * 0.94  # Media dei MONTH_FACTOR sull'anno
 
-        # Durata casuale tra 30 min e 2.5 ore
-        duration_minutes = random.randint(30, 150)
-        duration_seconds = duration_minutes * 60
-        hours = duration_seconds // 3600
-        minutes = (duration_seconds % 3600) // 60
+def iter_mock_videos(count=DEFAULT_COUNT, seed=DEFAULT_SEED, end_date=END_DATE):
+    """
+    Genera count video in ordine canonico (published_at decrescente, poi id), in streaming
 
-        if hours > 0:
-            duration_formatted = f"{hours}h {minutes}m"
-        else:
-            duration_formatted = f"{minutes}m"
+    Cammina all'indietro un giorno alla volta da end_date. Se count non entra tra
+    MIN_DATE e end_date, ogni giorno ospita più "canali" indipendenti con la stessa
+    distribuzione (densità costante), così anche 1M di video restano in date plausibili.
 
-        # Thumbnail fittizio (usa un'immagine placeholder)
-        thumbnail_url = f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg"
+    Yields:
+        dict: video nel formato di videos_cache.json
+    """
+    rng = random.Random(seed)
+    days_available = (end_date - MIN_DATE).days + 1
+    density = max(1, -(-count // int(days_available * expected_videos_per_day())))
 
-        video = {
-            "id": video_id,
-            "title": title,
-            "published_at": pub_date.strftime("%Y-%m-%dT%H:%M:%SZ"),
-            "year": pub_date.year,
-            "month": pub_date.month,
-            "duration_seconds": duration_seconds,
-            "duration_formatted": duration_formatted,
-            "thumbnail_url": thumbnail_url,
-            "watch_url": f"https://www.youtube.com/watch?v={video_id}"
-        }
+    day = datetime(end_date.year, end_date.month, end_date.day)
+    remaining = count
+    while remaining > 0:
+        videos = []
+        for _ in range(density):
+            videos.extend(day_schedule(rng, day))
+        videos.sort(key=lambda v: (v['published_at'], v['id']), reverse=True)
 
-        videos.append(video)
+        for video in videos[:remaining]:
+            yield video
+        remaining -= min(remaining, len(videos))
+        day -= timedelta(days=1)
 
-    return videos
+def _indented_record(video):
+    """Record come lo scrive json.dump(indent=2) dentro "videos" (encoder C, molto più veloce di indent=2)"""
+    fields = ',\n'.join(f'      "{key}": {_encode_field(value)}' for key, value in video.items())
+    return f"    {{\n{fields}\n    }}"
 
-def main():
-    print("Generazione dati mock...")
+def write_mock_cache(videos, output_file=OUTPUT_FILE, last_updated=None):
+    """
+    Scrive videos_cache.json in streaming (memoria costante), stesso formato di write_cache:
+    i video passano su un file temporaneo mentre si calcolano totali e content_hash,
+    poi l'intestazione viene scritta davanti
 
-    # Genera 50 video mock
-    videos = generate_mock_videos(50)
+    Returns:
+        dict: intestazione della cache (senza la lista video)
+    """
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
 
-    # Crea struttura cache
-    cache_data = {
-        "last_updated": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
-        "total_videos": len(videos),
-        "videos": videos
+    body_file = f"{output_file}.body.tmp"
+    digest = hashlib.sha256(b'[')
+    total_videos = 0
+    total_seconds = 0
+    first_video = None
+
+    with open(body_file, 'w', encoding='utf-8') as body:
+        for video in videos:
+            if total_videos:
+                digest.update(b',')
+                body.write(',\n')
+            # Stessa serializzazione di compute_content_hash, un video alla volta
+            digest.update(_encode_canonical(video).encode('utf-8'))
+            body.write(_indented_record(video))
+            first_video = first_video or video
+            total_videos += 1
+            total_seconds += video['duration_seconds']
+    digest.update(b']')
+
+    header = {
+        'last_updated': last_updated or (first_video['published_at'] if first_video else END_DATE.isoformat() + 'Z'),
+        'archive_version': 1,
+        'total_videos': total_videos,
+        'total_hours': int(total_seconds / 3600),
+        'content_hash': 'sha256:' + digest.hexdigest()
     }
 
-    # Salva in data/videos_cache_mock.json
-    output_file = "data/videos_cache_mock.json"
+    temp_file = f"{output_file}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(header, indent=2, ensure_ascii=False)[:-2])
+        f.write(',\n  "videos": [')
+        if total_videos:
+            f.write('\n')
+            with open(body_file, 'r', encoding='utf-8') as body:
+                while True:
+                    chunk = body.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+            f.write('\n  ]\n}')
+        else:
+            f.write(']\n}')
+    os.replace(temp_file, output_file)
+    os.remove(body_file)
+
+    return header
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_SEED
+
+    print(f"Generazione {count:,} video mock (seed {seed})...")
+
+    stats = {'first': None, 'last': None}
+
+    def tracked(videos):
+        for video in videos:
+            stats['first'] = stats['first'] or video['published_at']
+            stats['last'] = video['published_at']
+            yield video
 
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(cache_data, f, indent=2, ensure_ascii=False)
+    header = write_mock_cache(tracked(iter_mock_videos(count, seed)), OUTPUT_FILE)
 
-    print(f"✅ {len(videos)} video mock generati")
-    print(f"📄 File salvato: {output_file}")
-    print(f"📊 Range date: {videos[-1]['published_at'][:10]} → {videos[0]['published_at'][:10]}")
-    print(f"⏱️  Durata totale: ~{sum(v['duration_seconds'] for v in videos) / 3600:.0f}h")
+    print(f"✅ {header['total_videos']:,} video mock generati")
+    print(f"📄 File salvato: {OUTPUT_FILE}")
+    if header['total_videos']:
+        print(f"📊 Range date: {stats['last'][:10]} → {stats['first'][:10]}")
+    print(f"⏱️  Durata totale: ~{header['total_hours']}h")
     print("\nQuesto file può essere usato per sviluppare il frontend senza API YouTube reale.")
 
 if __name__ == '__main__':
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Script: Generate Search Index
+Scopo: Genera un indice di ricerca compatto e deterministico per l'archivio video
+Input: data/videos_cache.json (+ data/videos_cache.journal.jsonl)
+Output: frontend/public/data/search_index.json (o data/search_index.json)
+Direttiva di riferimento: directives/cache_strategy.md
+
+Formato indice:
+- docs:     ID video nell'ordine della cache (posizione = numero documento)
+- terms:    vocabolario ordinato (token normalizzati + chiavi data)
+- postings: per ogni termine, numeri documento crescenti codificati come differenze (gap)
+
+Chiavi data (estratte dal titolo, es. "Lezione del 13/02/2026"):
+- d:2026-02-13   data completa
+- ym:2026-02     mese/anno
+Giorno, mese e anno restano anche token numerici ("13", "02", "2", "2026", "26"),
+così una data digitata a metà ("13/0", "13/02/20", "del 13") si cerca per prefisso.
+
+Una query diventa l'intersezione di poche posting list: per i token si uniscono
+le posting dei termini del vocabolario che iniziano con il prefisso (ricerca mentre si digita).
+Solo le date complete della query (anno a 4 cifre) diventano chiavi esatte.
+"""
+
+import os
+import re
+import sys
+import json
+import bisect
+import logging
+import unicodedata
+from collections import defaultdict
+from video_cache import read_cache
+
+# Configurazione
+INPUT_FILE = 'data/videos_cache.json'
+OUTPUT_FILE = 'data/search_index.json'
+FRONTEND_OUTPUT_FILE = 'frontend/public/data/search_index.json'
+LOG_FILE = '.tmp/fetch_errors.log'
+INDEX_FORMAT = 'aba-search'
+INDEX_VERSION = 2
+DEFAULT_LIMIT = 8  # Come SearchBar.tsx
+
+# Nomi mesi in italiano
+MONTH_NAMES_IT = {
+    1: 'Gennaio', 2: 'Febbraio', 3: 'Marzo', 4: 'Aprile',
+    5: 'Maggio', 6: 'Giugno', 7: 'Luglio', 8: 'Agosto',
+    9: 'Settembre', 10: 'Ottobre', 11: 'Novembre', 12: 'Dicembre'
+}
+
+# gg/mm/aaaa, gg/mm/aa, gg/mm (separatori / . -) oppure aaaa-mm-gg
+DATE_PATTERN = re.compile(
+    r'(?<!\d)(?:(\d{4})-(\d{1,2})-(\d{1,2})|(\d{1,2})[/.-](\d{1,2})(?:[/.-](\d{4}|\d{2}))?)(?!\d)'
+)
+# mm/aaaa (es. "02/2026")
+MONTH_YEAR_PATTERN = re.compile(r'(?<!\d)(\d{1,2})[/.-](\d{4})(?!\d)')
+NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+logger = logging.getLogger(__name__)
+
+def normalize(text):
+    """Minuscolo, senza accenti/emoji/punteggiatura"""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return NON_ALNUM.sub(' ', text.lower()).strip()
+
+def date_tokens(year, month, day=None):
+    """Parti numeriche di una data come token (con e senza zero iniziale, anno a 4 e 2 cifre)"""
+    tokens = {str(month), f"{month:02d}"}
+    if day is not None:
+        tokens.update({str(day), f"{day:02d}"})
+    if year is not None:
+        tokens.update({f"{year:04d}", f"{year % 100:02d}"})
+    return tokens
+
+def extract_dates(text, complete_only=False):
+    """
+    Estrae le date da un testo
+
+    Args:
+        complete_only: solo le date con anno a 4 cifre (query): quelle digitate a metà
+                       restano nel testo e si cercano per prefisso sui token numerici
+
+    Returns:
+        tuple: (keys: list di chiavi esatte, tokens: set di token numerici, rest: testo senza date)
+    """
+    keys = []
+    tokens = set()
+
+    def date_key(match):
+        iso_year, iso_month, iso_day, day, month, year = match.groups()
+        if iso_year:
+            year, month, day = iso_year, iso_month, iso_day
+        if complete_only and (not year or len(year) != 4):
+            return match.group(0)
+
+        day, month = int(day), int(month)
+        if not (1 <= day <= 31 and 1 <= month <= 12):
+            return match.group(0)
+
+        if year:
+            year = int(year) + 2000 if len(year) == 2 else int(year)
+            keys.append(f"d:{year:04d}-{month:02d}-{day:02d}")
+            keys.append(f"ym:{year:04d}-{month:02d}")
+        tokens.update(date_tokens(year or None, month, day))
+        return ' '
+
+    def month_year_key(match):
+        month, year = int(match.group(1)), int(match.group(2))
+        if not 1 <= month <= 12:
+            return match.group(0)
+        keys.append(f"ym:{year:04d}-{month:02d}")
+        tokens.update(date_tokens(year, month))
+        return ' '
+
+    rest = DATE_PATTERN.sub(date_key, text)
+    rest = MONTH_YEAR_PATTERN.sub(month_year_key, rest)
+    return keys, tokens, rest
+
+def document_terms(video):
+    """Termini indicizzati per un video: token del titolo, chiavi e numeri delle date, mese e anno"""
+    date_keys, date_numbers, rest = extract_dates(video['title'])
+    terms = set(normalize(rest).split())
+    terms.update(date_keys)
+    terms.update(date_numbers)
+    terms.add(normalize(MONTH_NAMES_IT[video['month']]))
+    terms.add(str(video['year']))
+    return terms
+
+def build_search_index(videos, content_hash=None):
+    """
+    Costruisce l'indice (deterministico: stesso input → stesso output)
+
+    Returns:
+        dict: indice serializzabile in JSON
+    """
+    postings = defaultdict(list)
+
+    for doc_num, video in enumerate(videos):
+        for term in document_terms(video):
+            postings[term].append(doc_num)
+
+    terms = sorted(postings)
+    encoded = []
+    for term in terms:
+        docs = postings[term]
+        encoded.append([docs[0]] + [b - a for a, b in zip(docs, docs[1:])])
+
+    return {
+        'format': INDEX_FORMAT,
+        'version': INDEX_VERSION,
+        'content_hash': content_hash,
+        'docs': [v['id'] for v in videos],
+        'terms': terms,
+        'postings': encoded
+    }
+
+class SearchIndex:
+    """API di query sull'indice (caricato da file o appena costruito)"""
+
+    def __init__(self, index):
+        if index.get('format') != INDEX_FORMAT or index.get('version') != INDEX_VERSION:
+            raise ValueError(f"Indice non supportato: {index.get('format')} v{index.get('version')}")
+
+        self.docs = index['docs']
+        self.terms = index['terms']
+        self._encoded = index['postings']
+        self._decoded = {}
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def _postings(self, term_num):
+        """Posting list decodificata (numeri documento crescenti), con memo"""
+        docs = self._decoded.get(term_num)
+        if docs is None:
+            docs = []
+            current = 0
+            for i, gap in enumerate(self._encoded[term_num]):
+                current = gap if i == 0 else current + gap
+                docs.append(current)
+            self._decoded[term_num] = docs
+        return docs
+
+    def _exact(self, term):
+        i = bisect.bisect_left(self.terms, term)
+        if i < len(self.terms) and self.terms[i] == term:
+            return set(self._postings(i))
+        return set()
+
+    def _prefix(self, prefix):
+        """Unione delle posting dei termini che iniziano con prefix (range nel vocabolario ordinato)"""
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + '\uffff')
+        docs = set()
+        for i in range(start, end):
+            # Le chiavi data ("d:…") si cercano solo in modo esatto
+            if ':' not in self.terms[i]:
+                docs.update(self._postings(i))
+        return docs
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        Cerca video per testo/data
+
+        Ogni token della query è un prefisso (es. "pom" → "pomeriggio", "13/0" → "13" e "0…");
+        solo le date complete ("13/02/2026", "2026-02-13", "02/2026") diventano chiavi esatte.
+        I risultati sono in ordine di cache (più recenti prima).
+
+        Returns:
+            list: ID video (al massimo limit, None = tutti)
+        """
+        date_keys, _, rest = extract_dates(query, complete_only=True)
+        tokens = normalize(rest).split()
+        if not date_keys and not tokens:
+            return []
+
+        # Chiavi data esatte prima: tipicamente le liste più corte
+        candidate_sets = [self._exact(key) for key in date_keys]
+        candidate_sets += [self._prefix(token) for token in tokens]
+        candidate_sets.sort(key=len)
+
+        result = candidate_sets[0]
+        for docs in candidate_sets[1:]:
+            if not result:
+                break
+            result = result & docs
+
+        doc_nums = sorted(result)
+        if limit is not None:
+            doc_nums = doc_nums[:limit]
+        return [self.docs[n] for n in doc_nums]
+
+def save_index(index, output_path):
+    """Salva l'indice minificato con chiavi ordinate (output deterministico)"""
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    temp_file = f"{output_path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'), sort_keys=True, ensure_ascii=False)
+    os.replace(temp_file, output_path)
+
+    logger.info(f"Indice salvato: {output_path}")
+    logger.info(f"Dimensione: {os.path.getsize(output_path) / 1024:.1f} KB")
+
+def main():
+    """Funzione principale"""
+    os.makedirs('.tmp', exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname)s: %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE, mode='a'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+    logger.info("=" * 60)
+    logger.info("Generate Search Index")
+    logger.info("=" * 60)
+
+    if not os.path.exists(INPUT_FILE):
+        logger.error(f"File non trovato: {INPUT_FILE}")
+        logger.error("Esegui prima: python execution/fetch_all_videos.py")
+        sys.exit(1)
+
+    try:
+        # Snapshot + journal dei cambiamenti incrementali
+        cache = read_cache(INPUT_FILE)
+
+        index = build_search_index(cache['videos'], cache.get('content_hash'))
+        logger.info(f"Indicizzati {len(index['docs'])} video, {len(index['terms'])} termini")
+
+        # Se frontend/public/data/ esiste, usa quello; altrimenti data/
+        if os.path.exists(os.path.dirname(FRONTEND_OUTPUT_FILE)):
+            output_path = FRONTEND_OUTPUT_FILE
+        else:
+            output_path = OUTPUT_FILE
+        save_index(index, output_path)
+
+        # Sanity check: la lezione più recente deve essere trovabile dalla sua data
+        if cache['videos']:
+            latest = cache['videos'][0]
+            date_keys, _, _ = extract_dates(latest['title'])
+            query = latest['title'] if date_keys else latest['title'].split()[0]
+            if latest['id'] not in SearchIndex(index).search(query, limit=None):
+                logger.warning(f"Sanity check fallito: '{query}' non trova {latest['id']}")
+
+        logger.info("✅ Indice di ricerca generato")
+
+    except KeyboardInterrupt:
+        logger.warning("\n⚠️  Generazione interrotta dall'utente")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"\n❌ ERRORE IMPREVISTO: {e}", exc_info=True)
+        logger.error("Consulta .tmp/fetch_errors.log per dettagli")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -2,22 +2,45 @@
 """
 Script: Generate Static JSON
 Scopo: Genera JSON ottimizzato per il frontend, raggruppato per anno/mese
-Input: data/videos_cache.json
+Input: data/videos_cache.json (+ data/videos_cache.journal.jsonl)
 Output: frontend/public/data/videos.json (o data/videos_frontend.json)
+        + archive/manifest.json e archive/{anno}.json (shard per lazy loading)
+        + videos_columnar.json (formato colonnare compatto, vedi archive_format.py)
+        + deltas/{versione}.json (cambiamenti da quella versione alla corrente)
 Direttiva di riferimento: directives/cache_strategy.md
+
+Generazione incrementale: videos.json e gli shard sono composti da frammenti JSON per mese,
+conservati in data/static_json_groups/ con l'impronta dei membri. Solo i mesi toccati
+dalle versioni nuove del changelog (o con membri diversi) vengono ricalcolati e riserializzati;
+degli altri si riusa il frammento, e si riscrivono solo gli shard degli anni cambiati
+(`--full` ignora i frammenti e rigenera tutto).
 """
 
 import os
+import re
 import sys
 import json
+import hashlib
 import logging
+import textwrap
 from datetime import datetime
 from collections import defaultdict
 from pathlib import Path
+from video_cache import compute_content_hash, is_sorted, read_cache, read_changelog, build_delta, sort_videos
+from archive_format import encode_columnar, decode_columnar
 
 # Configurazione
 INPUT_FILE = 'data/videos_cache.json'
 OUTPUT_FILE = 'data/videos_frontend.json'  # Cambia in 'frontend/public/data/videos.json' se frontend esiste
+ARCHIVE_DIR_NAME = 'archive'  # Sottocartella (accanto all'output) per manifest + shard annuali
+ARCHIVE_URL_PREFIX = '/data/archive'  # URL pubblico degli shard (frontend/public/data/archive)
+MANIFEST_VERSION = 1
+COLUMNAR_FILE_NAME = 'videos_columnar.json'  # Accanto all'output principale
+DELTAS_DIR_NAME = 'deltas'  # Sottocartella (accanto all'output) per i delta tra versioni
+DELTAS_URL_PREFIX = '/data/deltas'
+GROUPS_STATE_DIR = os.getenv('STATIC_JSON_STATE_DIR', 'data/static_json_groups')
+GROUPS_STATE_VERSION = 1  # Da incrementare se cambia il formato dei mesi: invalida tutti i frammenti
+PRETTY_MONTH_INDENT = ' ' * 8  # Profondità dei mesi in videos.json (radice → years → anno → months)
 LOG_FILE = '.tmp/fetch_errors.log'
 
 # Setup logging
@@ -51,15 +74,14 @@ MONTH_NAMES_IT = {
 }
 
 def load_cache():
-    """Carica videos_cache.json"""
+    """Carica videos_cache.json (snapshot + journal dei cambiamenti incrementali)"""
     if not os.path.exists(INPUT_FILE):
         logger.error(f"File non trovato: {INPUT_FILE}")
         logger.error("Esegui prima: python execution/fetch_all_videos.py")
         sys.exit(1)
 
     try:
-        with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-            cache = json.load(f)
+        cache = read_cache(INPUT_FILE)
 
         logger.info(f"Cache caricata: {cache['total_videos']} video")
         return cache
@@ -155,8 +177,379 @@ def build_frontend_structure(grouped_videos, cache_metadata):
 
     return frontend_data
 
-def save_json(data, output_path):
-    """Salva JSON formattato"""
+# --- Generazione incrementale per mese ---
+
+_MONTH_PLACEHOLDER = '@@mese:{}@@'
+_COMPACT_PLACEHOLDER = re.compile(r'"@@mese:(\d+-\d+)@@"')
+_PRETTY_PLACEHOLDER = re.compile(r'^ *"@@mese:(\d+-\d+)@@"', re.MULTILINE)
+
+def _fill_placeholders(text, pattern, fragment):
+    """Pezzi dello scheletro alternati ai frammenti dei mesi (scritti in sequenza, mai concatenati)"""
+    for i, piece in enumerate(pattern.split(text)):
+        yield fragment(piece) if i % 2 else piece
+
+def month_key(year, month):
+    return f"{year}-{month:02d}"
+
+def month_fingerprint(videos):
+    """Impronta dei membri di un mese (ID in ordine): cambia se un video entra, esce o si sposta"""
+    return hashlib.sha256('\n'.join(v['id'] for v in videos).encode('utf-8')).hexdigest()
+
+def iter_month_runs(videos):
+    """
+    Tratti contigui (year, month, videos) di una lista in ordine canonico:
+    un solo confronto per video, nessun riordino (l'ordine nel mese è già data decrescente)
+    """
+    start = 0
+    for i in range(1, len(videos) + 1):
+        if i == len(videos) or (videos[i]['year'], videos[i]['month']) != (videos[start]['year'], videos[start]['month']):
+            yield videos[start]['year'], videos[start]['month'], videos[start:i]
+            start = i
+
+def render_month(year, month, videos):
+    """
+    Mese serializzato una volta in entrambi i formati (minificato per gli shard, indentato per videos.json)
+
+    Returns:
+        tuple: (voce dell'indice, {'compact': testo, 'pretty': testo})
+    """
+    month_obj = {
+        'month': month,
+        'month_name': MONTH_NAMES_IT[month],
+        'total': len(videos),
+        'videos': videos
+    }
+    compact = json.dumps(month_obj, separators=(',', ':'), ensure_ascii=False)
+    entry = {
+        'year': year,
+        'month': month,
+        'fingerprint': month_fingerprint(videos),
+        'total': len(videos),
+        'seconds': sum(v['duration_seconds'] for v in videos),
+        # Nome dal contenuto: un frammento scritto non viene mai sovrascritto
+        'file': f"{month_key(year, month)}-{hashlib.sha256(compact.encode('utf-8')).hexdigest()[:16]}"
+    }
+    pretty = textwrap.indent(json.dumps(month_obj, indent=2, ensure_ascii=False), PRETTY_MONTH_INDENT)
+    return entry, {'compact': compact, 'pretty': pretty}
+
+class MonthGroups:
+    """
+    Frammenti JSON per mese dell'ultima generazione (data/static_json_groups/): un file per mese
+    e formato, più index.json con impronta dei membri, conteggi e versione dell'archivio
+    I frammenti sono letti come testo, solo quando servono; l'indice è scritto per ultimo
+    Valgono solo per la stessa destinazione: per un altro videos.json si riparte da zero
+    """
+
+    def __init__(self, output_path, state_dir=GROUPS_STATE_DIR):
+        self.state_dir = state_dir
+        self.output_path = output_path
+        self.archive_version = None
+        self.content_hash = None
+        self.months = {}
+        self.rendered = {}
+        try:
+            with open(os.path.join(state_dir, 'index.json'), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') == GROUPS_STATE_VERSION and state.get('output') == output_path:
+                self.archive_version = state['archive_version']
+                self.content_hash = state['content_hash']
+                self.months = state['months']
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+    def changed_ids(self, cache, changelog):
+        """
+        ID toccati dalle versioni successive a quella dei frammenti (dal changelog)
+
+        Returns:
+            set, oppure None se i frammenti non si possono riusare (assenti, cache tornata indietro,
+            changelog senza la catena completa di versioni)
+        """
+        if self.archive_version is None:
+            return None
+
+        current_version = cache.get('archive_version', 0)
+        if self.archive_version == current_version:
+            return set() if self.content_hash == cache.get('content_hash') else None
+
+        entries = [e for e in changelog if self.archive_version < e['version'] <= current_version]
+        if [e['version'] for e in entries] != list(range(self.archive_version + 1, current_version + 1)):
+            return None
+
+        return {video_id for e in entries for video_id in e['added'] + e['updated'] + e['removed']}
+
+    def update(self, cache, changelog, full=False):
+        """
+        Ricalcola solo i mesi cambiati: membri diversi (impronta) o un membro modificato nel changelog
+
+        Returns:
+            tuple: (months: dict chiave → voce dell'indice, in ordine decrescente,
+                    dirty_years: set di anni da riscrivere)
+        """
+        videos = cache['videos']
+        if not is_sorted(videos):
+            videos = sort_videos(videos)
+
+        changed = None if full else self.changed_ids(cache, changelog)
+        runs = defaultdict(list)
+        for year, month, run in iter_month_runs(videos):
+            runs[(year, month)].extend(run)  # Più tratti per mese solo con year/month incoerenti con la data
+
+        months = {}
+        dirty_years = set()
+        for year, month in sorted(runs, reverse=True):
+            key = month_key(year, month)
+            members = runs[(year, month)]
+            previous = self.months.get(key)
+            reusable = (
+                changed is not None and previous is not None
+                and previous['fingerprint'] == month_fingerprint(members)
+                and not any(v['id'] in changed for v in members)
+                and all(os.path.exists(self._fragment_path(previous, kind)) for kind in ('compact', 'pretty'))
+            )
+            if reusable:
+                months[key] = previous
+            else:
+                months[key], self.rendered[key] = render_month(year, month, members)
+                dirty_years.add(year)
+
+        # Anni che hanno perso un mese (o sono spariti)
+        dirty_years.update(entry['year'] for key, entry in self.months.items() if key not in months)
+
+        self.archive_version = cache.get('archive_version', 0)
+        self.content_hash = cache.get('content_hash')
+        self.months = months
+        return months, dirty_years
+
+    def _fragment_path(self, entry, kind):
+        return os.path.join(self.state_dir, f"{entry['file']}.{'min.json' if kind == 'compact' else 'json'}")
+
+    def fragment(self, key, kind):
+        """Testo del mese ('compact' o 'pretty'): appena calcolato oppure letto dal frammento salvato"""
+        if key in self.rendered:
+            return self.rendered[key][kind]
+        with open(self._fragment_path(self.months[key], kind), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def save(self):
+        """Scrive i frammenti nuovi, poi l'indice (atomico), poi elimina i frammenti non più referenziati"""
+        os.makedirs(self.state_dir, exist_ok=True)
+        for key, texts in self.rendered.items():
+            for kind, text in texts.items():
+                _write_text(text, self._fragment_path(self.months[key], kind), quiet=True)
+
+        _write_text(json.dumps({
+            'version': GROUPS_STATE_VERSION,
+            'output': self.output_path,
+            'archive_version': self.archive_version,
+            'content_hash': self.content_hash,
+            'months': self.months
+        }, separators=(',', ':'), ensure_ascii=False), os.path.join(self.state_dir, 'index.json'), quiet=True)
+
+        referenced = {self._fragment_path(entry, kind) for entry in self.months.values() for kind in ('compact', 'pretty')}
+        for file_name in os.listdir(self.state_dir):
+            path = os.path.join(self.state_dir, file_name)
+            if file_name != 'index.json' and path not in referenced:
+                os.remove(path)
+        self.rendered = {}
+
+def years_from_months(months):
+    """{anno: [voci dei mesi]} in ordine decrescente (i mesi arrivano già ordinati)"""
+    years = defaultdict(list)
+    for entry in months.values():
+        years[entry['year']].append(entry)
+    return years
+
+def summarize_groups(cache, months):
+    """Struttura di videos.json senza i video (conteggi per anno/mese): per validazione e log"""
+    years = years_from_months(months)
+    return {
+        'last_updated': cache['last_updated'],
+        'total_videos': cache['total_videos'],
+        'total_hours': int(sum(entry['seconds'] for entry in months.values()) / 3600),
+        'years': [
+            {
+                'year': year,
+                'total': sum(entry['total'] for entry in entries),
+                'months': [
+                    {'month': e['month'], 'month_name': MONTH_NAMES_IT[e['month']], 'total': e['total']}
+                    for e in entries
+                ]
+            }
+            for year, entries in years.items()
+        ]
+    }
+
+def render_frontend_json(summary, groups):
+    """
+    videos.json (indentato) composto dai frammenti: si serializza solo lo scheletro anni/mesi,
+    i mesi entrano come testo già pronto. Stesso output di json.dump(build_frontend_structure(...), indent=2)
+
+    Returns:
+        generatore di pezzi di testo (per _write_text)
+    """
+    skeleton = dict(summary, years=[
+        dict(year_obj, months=[_MONTH_PLACEHOLDER.format(month_key(year_obj['year'], m['month']))
+                               for m in year_obj['months']])
+        for year_obj in summary['years']
+    ])
+    text = json.dumps(skeleton, indent=2, ensure_ascii=False)
+    return _fill_placeholders(text, _PRETTY_PLACEHOLDER, lambda key: groups.fragment(key, 'pretty'))
+
+def render_year_shard(year, entries, groups):
+    """Shard {anno}.json (minificato) composto dai frammenti dei suoi mesi"""
+    skeleton = {
+        'year': year,
+        'total': sum(entry['total'] for entry in entries),
+        'months': [_MONTH_PLACEHOLDER.format(month_key(year, entry['month'])) for entry in entries]
+    }
+    text = json.dumps(skeleton, separators=(',', ':'), ensure_ascii=False)
+    return _fill_placeholders(text, _COMPACT_PLACEHOLDER, lambda key: groups.fragment(key, 'compact'))
+
+def build_manifest(summary, cache, months, url_prefix=ARCHIVE_URL_PREFIX, deltas=None):
+    """
+    Manifest leggero: conteggi/ore per anno e mese e URL dello shard (dalle voci dell'indice).
+    Al primo caricamento bastano manifest + anno corrente; con deltas ({versione: url})
+    un client fermo alla versione N scarica solo il delta invece dell'archivio intero.
+    """
+    manifest_years = []
+    for year, entries in years_from_months(months).items():
+        manifest_years.append({
+            'year': year,
+            'total': sum(entry['total'] for entry in entries),
+            'total_hours': round(sum(entry['seconds'] for entry in entries) / 3600, 1),
+            'shard': f"{url_prefix}/{year}.json",
+            'months': [
+                {
+                    'month': entry['month'],
+                    'month_name': MONTH_NAMES_IT[entry['month']],
+                    'total': entry['total'],
+                    'total_hours': round(entry['seconds'] / 3600, 1)
+                }
+                for entry in entries
+            ]
+        })
+
+    return {
+        'version': MANIFEST_VERSION,
+        'archive_version': cache.get('archive_version', 0),
+        'last_updated': summary['last_updated'],
+        'content_hash': cache.get('content_hash') or compute_content_hash(cache['videos']),
+        'total_videos': summary['total_videos'],
+        'total_hours': summary['total_hours'],
+        'years': manifest_years,
+        'deltas': deltas or {}
+    }
+
+def save_grouped(cache, changelog, output_path, archive_dir, deltas=None,
+                 state_dir=GROUPS_STATE_DIR, full=False):
+    """
+    Genera videos.json, gli shard per anno e il manifest riserializzando solo i mesi cambiati
+    Gli shard degli anni invariati (e già presenti) non vengono riscritti; quelli di anni
+    non più presenti vengono eliminati
+
+    Args:
+        full: ignora i frammenti salvati e rigenera tutto
+
+    Returns:
+        dict: struttura di videos.json senza i video (vedi summarize_groups)
+    """
+    groups = MonthGroups(output_path, state_dir)
+    months, dirty_years = groups.update(cache, changelog, full)
+    rendered = len(groups.rendered)
+    summary = summarize_groups(cache, months)
+    validate_output(summary)
+
+    _write_text(render_frontend_json(summary, groups), output_path)
+
+    os.makedirs(archive_dir, exist_ok=True)
+    years = years_from_months(months)
+    written = []
+    for year, entries in years.items():
+        shard_path = os.path.join(archive_dir, f"{year}.json")
+        if year in dirty_years or full or not os.path.exists(shard_path):
+            _write_text(render_year_shard(year, entries, groups), shard_path, quiet=True)
+            written.append(year)
+
+    for file_name in os.listdir(archive_dir):
+        if (file_name.endswith('.json') and file_name != 'manifest.json'
+                and file_name[:-len('.json')] not in {str(year) for year in years}):
+            os.remove(os.path.join(archive_dir, file_name))
+            logger.info(f"Shard obsoleto rimosso: {file_name}")
+
+    manifest = build_manifest(summary, cache, months, deltas=deltas)
+    if not save_json(manifest, os.path.join(archive_dir, 'manifest.json'), compact=True):
+        raise RuntimeError("Salvataggio manifest fallito")
+
+    groups.save()
+    logger.info(f"Mesi riserializzati: {rendered} di {len(months)}; "
+                f"shard riscritti: {', '.join(map(str, sorted(written, reverse=True))) or 'nessuno'}")
+    return summary
+
+def save_deltas(cache, changelog, deltas_dir, url_prefix=DELTAS_URL_PREFIX):
+    """
+    Salva un delta per ogni versione recente coperta dal changelog:
+    deltas/{N}.json contiene aggiunte, modifiche e rimozioni da N alla versione corrente
+    Elimina i delta non più validi (versioni uscite dal changelog)
+
+    Returns:
+        dict: {"N": url} per il manifest, oppure None in caso di errore
+    """
+    os.makedirs(deltas_dir, exist_ok=True)
+    current_version = cache.get('archive_version', 0)
+
+    deltas = {}
+    for entry in changelog:
+        from_version = entry['version'] - 1
+        if from_version < 1 or from_version >= current_version:
+            continue
+
+        delta = build_delta(changelog, from_version, cache)
+        if delta is None:
+            continue
+
+        file_name = f"{from_version}.json"
+        if not save_json(delta, os.path.join(deltas_dir, file_name), compact=True):
+            return None
+        deltas[str(from_version)] = f"{url_prefix}/{file_name}"
+
+    for file_name in os.listdir(deltas_dir):
+        if file_name.endswith('.json') and file_name[:-len('.json')] not in deltas:
+            os.remove(os.path.join(deltas_dir, file_name))
+
+    return deltas
+
+def save_columnar(cache, output_path):
+    """
+    Salva l'archivio in formato colonnare minificato
+    Verifica che il round-trip ricostruisca esattamente i record originali
+    """
+    archive = encode_columnar(cache)
+
+    if decode_columnar(archive)['videos'] != cache['videos']:
+        logger.error("Round-trip formato colonnare non coerente, file non salvato")
+        return False
+
+    return save_json(archive, output_path, compact=True)
+
+def _write_text(text, output_path, quiet=False):
+    """Scrittura atomica di JSON già serializzato (stringa o sequenza di pezzi)"""
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    temp_file = f"{output_path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        if isinstance(text, str):
+            f.write(text)
+        else:
+            f.writelines(text)
+    os.replace(temp_file, output_path)
+    if not quiet:
+        logger.info(f"JSON salvato: {output_path}")
+        logger.info(f"Dimensione: {os.path.getsize(output_path) / 1024:.1f} KB")
+
+def save_json(data, output_path, compact=False):
+    """Salva JSON formattato (o minificato se compact=True)"""
     try:
         # Crea directory se non esiste
         output_dir = os.path.dirname(output_path)
@@ -165,7 +558,10 @@ def save_json(data, output_path):
 
         # Salva JSON
         with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+            if compact:
+                json.dump(data, f, separators=(',', ':'), ensure_ascii=False)
+            else:
+                json.dump(data, f, indent=2, ensure_ascii=False)
 
         # Info dimensione
         file_size_kb = os.path.getsize(output_path) / 1024
@@ -197,7 +593,7 @@ def validate_output(data):
 
         # Controlla che tutti i mesi abbiano video
         for month_obj in year_obj['months']:
-            if not month_obj['videos']:
+            if not month_obj['total']:
                 issues.append(f"Mese {month_obj['month_name']} {year_obj['year']} non ha video")
 
     if issues:
@@ -219,18 +615,6 @@ def main():
         # Carica cache
         cache = load_cache()
 
-        # Raggruppa per anno/mese
-        logger.info("Raggruppamento per anno e mese...")
-        grouped = group_by_year_month(cache['videos'])
-
-        # Costruisci struttura frontend
-        logger.info("Costruzione struttura frontend...")
-        frontend_data = build_frontend_structure(grouped, cache)
-
-        # Validazione
-        logger.info("Validazione output...")
-        validate_output(frontend_data)
-
         # Determina output path
         # Se frontend/public/data/ esiste, usa quello; altrimenti data/
         frontend_path = 'frontend/public/data/videos.json'
@@ -241,11 +625,26 @@ def main():
             output_path = OUTPUT_FILE
             logger.info("Directory frontend non trovata, salvo in data/")
 
-        # Salva JSON
-        success = save_json(frontend_data, output_path)
+        # Delta tra versioni: un client alla versione N scarica solo i cambiamenti
+        logger.info("Generazione delta tra versioni...")
+        changelog = read_changelog(INPUT_FILE)
+        deltas_dir = os.path.join(os.path.dirname(output_path), DELTAS_DIR_NAME)
+        deltas = save_deltas(cache, changelog, deltas_dir)
+        if deltas is None:
+            logger.error("Salvataggio delta fallito")
+            sys.exit(1)
 
-        if not success:
-            logger.error("Salvataggio fallito")
+        # videos.json + archivio a shard (manifest + un file per anno): solo i mesi cambiati
+        logger.info("Generazione incrementale per anno e mese (videos.json, manifest, shard)...")
+        archive_dir = os.path.join(os.path.dirname(output_path), ARCHIVE_DIR_NAME)
+        frontend_data = save_grouped(cache, changelog, output_path, archive_dir, deltas=deltas,
+                                     full='--full' in sys.argv[1:])
+
+        # Formato colonnare compatto (campi derivabili rimossi)
+        logger.info("Generazione archivio colonnare...")
+        columnar_path = os.path.join(os.path.dirname(output_path), COLUMNAR_FILE_NAME)
+        if not save_columnar(cache, columnar_path):
+            logger.error("Salvataggio archivio colonnare fallito")
             sys.exit(1)
 
         # Riepilogo
@@ -253,6 +652,9 @@ def main():
         logger.info("🎉 JSON FRONTEND GENERATO CON SUCCESSO!")
         logger.info("=" * 60)
         logger.info(f"File: {output_path}")
+        logger.info(f"Archivio: {archive_dir}/manifest.json + {len(frontend_data['years'])} shard")
+        logger.info(f"Colonnare: {columnar_path}")
+        logger.info(f"Delta: {len(deltas)} (versione corrente {cache.get('archive_version', 0)})")
         logger.info(f"Totale video: {frontend_data['total_videos']}")
         logger.info(f"Ore totali: ~{frontend_data['total_hours']}h")
         logger.info(f"Anni coperti: {len(frontend_data['years'])}")
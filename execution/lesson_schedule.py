@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Modulo: Lesson Schedule (orari ricorrenti delle lezioni)
+Scopo: Imparare dallo store gli orari settimanali (UTC) in cui le lezioni finiscono o sono in onda:
+       - sync_daemon.py fa polling fitto nelle finestre di fine lezione
+       - live_schedule.py pubblica le finestre in onda per /api/live-status
+       Solo store e libreria standard: le build non importano client API, refresh o daemon
+Usato da: execution/sync_daemon.py, execution/live_schedule.py
+Direttiva di riferimento: directives/cache_strategy.md
+"""
+
+import os
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+# Configurazione
+SLOT_MINUTES = 15  # Risoluzione dell'istogramma delle fine lezione
+SCHEDULE_LOOKBACK_DAYS = int(os.getenv('YOUTUBE_DAEMON_LOOKBACK_DAYS', '90'))
+HOT_SLOT_MIN_SHARE = float(os.getenv('YOUTUBE_DAEMON_HOT_SLOT_SHARE', '0.3'))  # Settimane con una lezione finita in quello slot
+WINDOW_BEFORE_MINUTES = 15  # Il polling fitto parte poco prima della fine attesa…
+WINDOW_AFTER_MINUTES = 60  # …e continua dopo (lezioni che sforano, elaborazione YouTube)
+
+WEEK_MINUTES = 7 * 24 * 60
+
+logger = logging.getLogger(__name__)
+
+def _parse(timestamp):
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+def _week_minute(moment):
+    """Minuti dall'inizio della settimana (lunedì 00:00 UTC)"""
+    return moment.weekday() * 24 * 60 + moment.hour * 60 + moment.minute
+
+def _format_week_minute(minute):
+    days = ['lun', 'mar', 'mer', 'gio', 'ven', 'sab', 'dom']
+    minute %= WEEK_MINUTES
+    return f"{days[minute // 1440]} {minute % 1440 // 60:02d}:{minute % 60:02d}"
+
+class PollingSchedule:
+    """
+    Finestre settimanali (UTC) in cui una lezione finisce di solito
+
+    Ogni fine lezione (published_at + durata) degli ultimi SCHEDULE_LOOKBACK_DAYS giorni cade
+    in uno slot di SLOT_MINUTES della settimana; uno slot è "caldo" se, contando anche i due
+    vicini (lezioni che finiscono qualche minuto prima o dopo), ha una lezione in almeno
+    HOT_SLOT_MIN_SHARE delle settimane. Gli slot caldi consecutivi diventano una finestra,
+    allargata di WINDOW_BEFORE_MINUTES prima e WINDOW_AFTER_MINUTES dopo.
+    Con on_air=True contano tutti gli slot in cui la lezione è in onda (dall'inizio alla fine):
+    le finestre diventano gli orari ricorrenti delle dirette (live_schedule.py).
+    """
+
+    def __init__(self, windows, lessons=0, weeks=0):
+        self.windows = windows  # [(inizio, fine)] in minuti della settimana, fine anche oltre WEEK_MINUTES
+        self.lessons = lessons
+        self.weeks = weeks
+
+    @classmethod
+    def learn(cls, store, now=None, lookback_days=SCHEDULE_LOOKBACK_DAYS, min_share=HOT_SLOT_MIN_SHARE,
+              on_air=False):
+        now = now or datetime.now(timezone.utc)
+        since = (now - timedelta(days=lookback_days)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        slots_per_week = WEEK_MINUTES // SLOT_MINUTES
+
+        counts = Counter()
+        earliest = None
+        lessons = 0
+        for published_at, duration_seconds in store.iter_airtimes(since):
+            start = _parse(published_at)
+            earliest = earliest or start
+            lessons += 1
+            end = start + timedelta(seconds=duration_seconds)
+            if on_air:
+                first = _week_minute(start) // SLOT_MINUTES
+                last = (_week_minute(start) + duration_seconds // 60) // SLOT_MINUTES
+                for slot in range(first, last + 1):
+                    counts[slot % slots_per_week] += 1
+            else:
+                counts[_week_minute(end) // SLOT_MINUTES] += 1
+
+        if not lessons:
+            return cls([], 0, 0)
+
+        # Canale giovane: le settimane si contano dal primo video nella finestra di osservazione
+        weeks = max(1.0, (now - earliest).days / 7)
+        hot = [
+            slot for slot in range(slots_per_week)
+            if sum(counts[(slot + d) % slots_per_week] for d in (-1, 0, 1)) / weeks >= min_share
+        ]
+
+        windows = []
+        for slot in hot:
+            start = slot * SLOT_MINUTES - WINDOW_BEFORE_MINUTES
+            end = (slot + 1) * SLOT_MINUTES + WINDOW_AFTER_MINUTES
+            if windows and start <= windows[-1][1]:
+                windows[-1] = (windows[-1][0], end)
+            else:
+                windows.append((start, end))
+        return cls(windows, lessons, weeks)
+
+    def window_at(self, now):
+        """(inizio, fine) datetime della finestra che contiene now, None fuori dalle finestre"""
+        week_start = (now - timedelta(minutes=_week_minute(now))).replace(second=0, microsecond=0)
+        for offset in (-WEEK_MINUTES, 0, WEEK_MINUTES):  # Finestre a cavallo della domenica notte
+            for start, end in self.windows:
+                window_start = week_start + timedelta(minutes=start + offset)
+                window_end = week_start + timedelta(minutes=end + offset)
+                if window_start <= now < window_end:
+                    return window_start, window_end
+        return None
+
+    def next_window_start(self, now):
+        """Inizio della prossima finestra dopo now (None senza finestre)"""
+        if not self.windows:
+            return None
+        week_start = (now - timedelta(minutes=_week_minute(now))).replace(second=0, microsecond=0)
+        starts = [
+            week_start + timedelta(minutes=start + offset)
+            for offset in (0, WEEK_MINUTES) for start, _ in self.windows
+        ]
+        return min(start for start in starts if start > now)
+
+    def log_summary(self):
+        if not self.windows:
+            logger.info("Nessun orario ricorrente appreso")
+            return
+        logger.info(f"Orari appresi da {self.lessons} lezioni in {self.weeks:.1f} settimane: "
+                    f"{len(self.windows)} finestre di polling fitto (UTC)")
+        for start, end in self.windows:
+            logger.info(f"  - {_format_week_minute(start)} → {_format_week_minute(end)}")
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Script: Live Schedule (dirette programmate e in corso)
+Scopo: Artefatto statico minuscolo con le dirette non ancora concluse e le finestre in cui ha senso
+       chiedere all'API se c'è una live in corso: /api/live-status legge questo file e fuori dalle
+       finestre risponde "nessuna live" senza chiamare liveBroadcasts.list
+       Gli orari (scheduledStartTime, actualStartTime, actualEndTime) arrivano dai liveStreamingDetails
+       già salvati nello store dai sync; i live senza actualEndTime vengono riletti a ogni sync
+       Alle dirette note si aggiungono gli orari settimanali delle lezioni (lesson_schedule.py),
+       per le lezioni avviate con "vai in diretta" senza programmazione: la route li espande da sé
+       Il contenuto dipende solo dallo store (niente ora del run): stesso store → stesso file
+Input: data/archive.db
+Output: frontend/public/data/live_schedule.json (riscritto solo se il contenuto cambia)
+Usato da: execution/fetch_all_videos.py, execution/refresh_cache.py, execution/sync_daemon.py,
+          execution/push_receiver.py, execution/build_artifacts.py
+Direttiva di riferimento: directives/cache_strategy.md
+
+Uso:
+    python execution/live_schedule.py   # rigenera dallo store (niente rete)
+"""
+
+import os
+import sys
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from archive_store import STORE_FILE, ArchiveStore
+from lesson_schedule import WEEK_MINUTES, PollingSchedule
+
+# Configurazione
+SCHEDULE_FILE = os.getenv('LIVE_SCHEDULE_FILE', 'frontend/public/data/live_schedule.json')
+SCHEDULE_FORMAT = 'aba-live-schedule'
+SCHEDULE_VERSION = 3
+CHECK_BEFORE_MINUTES = int(os.getenv('LIVE_CHECK_BEFORE_MINUTES', '15'))  # Chi va in onda in anticipo
+LIVE_MAX_HOURS = int(os.getenv('LIVE_MAX_HOURS', '4'))  # Durata massima attesa di una diretta
+STALE_HOURS = 24  # Programmate mai partite / live mai chiusi: ignorati un giorno dopo l'attività più recente
+LOG_FILE = '.tmp/fetch_errors.log'
+
+logger = logging.getLogger(__name__)
+
+def _parse(timestamp):
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+def _format(moment):
+    return moment.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def merge_windows(windows):
+    """Unisce le finestre (start, end) sovrapposte o adiacenti, in ordine di inizio"""
+    merged = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def _format_day_minute(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+def lesson_windows(store, as_of):
+    """
+    Orari settimanali (UTC) in cui una lezione è di solito in onda, appresi fino ad as_of
+
+    Le finestre sono spezzate a mezzanotte: ogni voce sta in un solo giorno
+    (weekday 0 = lunedì, end "24:00" = fino a mezzanotte)
+    """
+    schedule = PollingSchedule.learn(store, as_of, on_air=True)
+    days = []
+    for start, end in schedule.windows:
+        start, end = start % WEEK_MINUTES, start % WEEK_MINUTES + min(end - start, WEEK_MINUTES)
+        while start < end:
+            day_end = min(end, (start // 1440 + 1) * 1440)
+            offset = start // WEEK_MINUTES * WEEK_MINUTES  # Oltre domenica notte: lunedì
+            days.append((start - offset, day_end - offset))
+            start = day_end
+
+    return [
+        {'weekday': weekday, 'start': _format_day_minute(start), 'end': _format_day_minute(end)}
+        for weekday in range(7)
+        for start, end in merge_windows(
+            (start - weekday * 1440, end - weekday * 1440) for start, end in days if start // 1440 == weekday
+        )
+    ]
+
+def build_live_schedule(store, now=None):
+    """
+    Dirette non concluse, finestre di controllo e orari settimanali delle lezioni
+
+    - programmata: finestra da scheduledStartTime - CHECK_BEFORE_MINUTES a + LIVE_MAX_HOURS
+    - in corso (actualStartTime senza actualEndTime): da actualStartTime a + LIVE_MAX_HOURS
+    - lesson_windows: orari ricorrenti delle lezioni (anche senza diretta programmata)
+    Tutto è relativo all'attività più recente nello store (last_activity_at: ultimo video o
+    diretta), non all'ora del run: le dirette ferme da più di STALE_HOURS prima restano fuori.
+    È anche il riferimento di freschezza per la route: senza attività recente lo schedule non
+    dice più nulla e la route torna all'API. now serve solo per updated_at
+
+    Returns:
+        dict: {format, version, updated_at, last_activity_at, broadcasts, check_windows, lesson_windows}
+    """
+    now = now or datetime.now(timezone.utc)
+    before = timedelta(minutes=CHECK_BEFORE_MINUTES)
+    duration = timedelta(hours=LIVE_MAX_HOURS)
+
+    pending = []
+    for broadcast in store.iter_pending_broadcasts():
+        if broadcast['actual_start']:
+            status = 'live'
+            start = _parse(broadcast['actual_start'])
+            window = (start, start + duration)
+        elif broadcast['scheduled_start']:
+            status = 'upcoming'
+            start = _parse(broadcast['scheduled_start'])
+            window = (start - before, start + duration)
+        else:
+            continue  # Live senza orari: niente da programmare
+        pending.append((broadcast, status, start, window))
+
+    latest = store.latest_published_at()
+    activity = [_parse(latest)] if latest else []
+    activity.extend(start for _, _, start, _ in pending)
+    if not activity:
+        return {
+            'format': SCHEDULE_FORMAT,
+            'version': SCHEDULE_VERSION,
+            'updated_at': _format(now),
+            'last_activity_at': None,
+            'broadcasts': [],
+            'check_windows': [],
+            'lesson_windows': []
+        }
+    as_of = max(activity)
+    stale_before = as_of - timedelta(hours=STALE_HOURS)
+
+    broadcasts = []
+    windows = []
+    for broadcast, status, start, window in pending:
+        if start < stale_before:
+            continue
+        broadcasts.append({
+            'id': broadcast['id'],
+            'title': broadcast['title'],
+            'status': status,
+            'scheduled_start': broadcast['scheduled_start'],
+            'actual_start': broadcast['actual_start'],
+            'watch_url': f"https://www.youtube.com/watch?v={broadcast['id']}"
+        })
+        windows.append(window)
+
+    broadcasts.sort(key=lambda b: (b['actual_start'] or b['scheduled_start'], b['id']))
+    return {
+        'format': SCHEDULE_FORMAT,
+        'version': SCHEDULE_VERSION,
+        'updated_at': _format(now),
+        'last_activity_at': _format(as_of),
+        'broadcasts': broadcasts,
+        'check_windows': [
+            {'start': _format(start), 'end': _format(end)} for start, end in merge_windows(windows)
+        ],
+        'lesson_windows': lesson_windows(store, as_of)
+    }
+
+def _content(schedule):
+    return {key: value for key, value in schedule.items() if key != 'updated_at'}
+
+def write_live_schedule(store, output_file=SCHEDULE_FILE, now=None):
+    """
+    Scrive l'artefatto (atomico, minificato) solo se dirette o finestre sono cambiate:
+    updated_at da solo non genera diff, quindi un sync senza novità non riscrive il file
+
+    Returns:
+        bool: True se il file è stato riscritto
+    """
+    schedule = build_live_schedule(store, now)
+    try:
+        with open(output_file, 'r', encoding='utf-8') as f:
+            if _content(json.load(f)) == _content(schedule):
+                return False
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    temp_file = f"{output_file}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(schedule, f, separators=(',', ':'), ensure_ascii=False)
+    os.replace(temp_file, output_file)
+
+    live = sum(1 for b in schedule['broadcasts'] if b['status'] == 'live')
+    logger.info(f"Live schedule aggiornato: {live} in corso, {len(schedule['broadcasts']) - live} programmate, "
+                f"{len(schedule['check_windows'])} finestre di controllo, "
+                f"{len(schedule['lesson_windows'])} orari settimanali → {output_file}")
+    return True
+
+def main():
+    """Funzione principale"""
+    os.makedirs('.tmp', exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname)s: %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE, mode='a'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+    if not os.path.exists(STORE_FILE):
+        logger.error(f"Store non trovato: {STORE_FILE} (esegui prima fetch_all_videos.py)")
+        sys.exit(1)
+
+    store = ArchiveStore(STORE_FILE)
+    try:
+        if not write_live_schedule(store):
+            logger.info(f"✅ Live schedule invariato: {SCHEDULE_FILE}")
+    finally:
+        store.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Script: Push Receiver (notifiche PubSubHubbub / WebSub degli upload YouTube)
+Scopo: Invece di interrogare la playlist a intervalli, ricevere da YouTube una notifica Atom
+       a ogni upload (o modifica/eliminazione) del canale e aggiornare subito solo i video notificati:
+       - verifica delle sottoscrizioni (hub.challenge) e rinnovo prima della scadenza del lease
+       - firma HMAC (X-Hub-Signature) controllata se PUSH_SECRET è impostato
+       - debounce: le notifiche in raffica (upload + modifiche del titolo) diventano un solo refresh
+       - refresh mirato (refresh_cache.run_targeted_refresh): una chiamata videos.list per gruppo
+         di video notificati, stesso filtro live e stessi eventi del percorso dei video nuovi
+Input: notifiche POST dell'hub su PUSH_CALLBACK_PATH; data/archive.db; token.json (o YOUTUBE_API_BASE_URL)
+Output: data/archive.db, data/videos_cache.json, frontend/public/data/live_schedule.json;
+        DAEMON_ON_CHANGE dopo ogni cambiamento;
+        payload ricevuti registrati in PUSH_RECORD_FILE (riproducibili con fake_websub_hub.py)
+Direttiva di riferimento: directives/cache_strategy.md
+
+Uso:
+    PUSH_CALLBACK_URL=https://example.org/websub python execution/push_receiver.py
+    python execution/push_receiver.py --unsubscribe
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import signal
+import logging
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from googleapiclient.errors import HttpError
+from youtube_quota import QuotaExceeded, QuotaGovernor, quota_day
+from refresh_cache import CHANNEL_ID, load_store, get_authenticated_service, run_targeted_refresh
+from sync_daemon import keep_warm, run_on_change
+from live_schedule import write_live_schedule
+
+# Configurazione
+PUSH_HOST = os.getenv('PUSH_HOST', '0.0.0.0')
+PUSH_PORT = int(os.getenv('PUSH_PORT', '8780'))
+PUSH_CALLBACK_PATH = '/websub'
+PUSH_CALLBACK_URL = os.getenv('PUSH_CALLBACK_URL', '')  # URL pubblico di PUSH_CALLBACK_PATH; vuoto = nessuna sottoscrizione
+PUSH_HUB_URL = os.getenv('PUSH_HUB_URL', 'https://pubsubhubbub.appspot.com/subscribe')
+PUSH_SECRET = os.getenv('PUSH_SECRET', '')  # hub.secret: senza, le notifiche non sono autenticate
+PUSH_LEASE_SECONDS = int(os.getenv('PUSH_LEASE_SECONDS', str(5 * 24 * 3600)))  # L'hub di Google concede ~5 giorni
+PUSH_DEBOUNCE_SECONDS = float(os.getenv('PUSH_DEBOUNCE_SECONDS', '30'))  # Silenzio dopo l'ultima notifica
+PUSH_DEBOUNCE_MAX_SECONDS = float(os.getenv('PUSH_DEBOUNCE_MAX_SECONDS', '120'))  # Attesa massima dalla prima
+PUSH_RECORD_FILE = os.getenv('PUSH_RECORD_FILE', '.tmp/websub_notifications.jsonl')  # '' = non registrare
+MAX_PAYLOAD_BYTES = 1_000_000
+RENEW_AT_LEASE_FRACTION = 0.8
+
+TOPIC_URL = f"https://www.youtube.com/xml/feeds/videos.xml?channel_id={CHANNEL_ID}"
+ATOM_NS = {
+    'atom': 'http://www.w3.org/2005/Atom',
+    'yt': 'http://www.youtube.com/xml/schemas/2015',
+    'at': 'http://purl.org/atompub/tombstones/1.0',
+}
+
+logger = logging.getLogger(__name__)
+
+def parse_notification(payload, channel_id=CHANNEL_ID):
+    """
+    Video di una notifica Atom dell'hub YouTube
+
+    - <entry> (upload o modifica): {'id', 'title', 'published_at'}
+    - <at:deleted-entry ref="yt:video:ID"> (eliminazione): {'id', 'deleted': True}
+    Le entry di altri canali vengono ignorate.
+
+    Raises:
+        ET.ParseError: payload non XML
+    """
+    root = ET.fromstring(payload)
+    videos = []
+
+    for entry in root.findall('atom:entry', ATOM_NS):
+        video_id = entry.findtext('yt:videoId', namespaces=ATOM_NS)
+        published = entry.findtext('atom:published', namespaces=ATOM_NS)
+        if not video_id or not published or entry.findtext('yt:channelId', namespaces=ATOM_NS) != channel_id:
+            continue
+        videos.append({
+            'id': video_id,
+            'title': entry.findtext('atom:title', default='', namespaces=ATOM_NS),
+            # "2026-10-17T16:02:11+00:00" → formato dell'API
+            'published_at': published.replace('+00:00', 'Z')
+        })
+
+    for tombstone in root.findall('at:deleted-entry', ATOM_NS):
+        ref = tombstone.get('ref', '')
+        author_uri = tombstone.findtext('at:by/atom:uri', default='', namespaces=ATOM_NS)
+        if ref.startswith('yt:video:') and author_uri.endswith(channel_id):
+            videos.append({'id': ref[len('yt:video:'):], 'deleted': True})
+
+    return videos
+
+def valid_signature(payload, header, secret=PUSH_SECRET):
+    """True se X-Hub-Signature ("sha1=…") è l'HMAC del payload con secret (sempre True senza secret)"""
+    if not secret:
+        return True
+    algorithm, _, signature = (header or '').partition('=')
+    if algorithm not in ('sha1', 'sha256', 'sha512'):
+        return False
+    expected = hmac.new(secret.encode('utf-8'), payload, algorithm).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+class NotificationQueue:
+    """
+    Video notificati in attesa del refresh, con debounce
+
+    Le notifiche arrivano spesso a raffica (upload, poi titolo e descrizione corretti):
+    si attende PUSH_DEBOUNCE_SECONDS di silenzio, al massimo PUSH_DEBOUNCE_MAX_SECONDS dalla
+    prima, poi tutti gli ID accumulati escono insieme. Per ogni ID vale l'ultima notifica.
+    """
+
+    def __init__(self, quiet=PUSH_DEBOUNCE_SECONDS, max_wait=PUSH_DEBOUNCE_MAX_SECONDS):
+        self.quiet = quiet
+        self.max_wait = max_wait
+        self.condition = threading.Condition()
+        self.pending = {}
+        self.first_at = None
+        self.last_at = None
+        self.closed = False
+
+    def add(self, videos):
+        with self.condition:
+            now = time.monotonic()
+            for video in videos:
+                self.pending[video['id']] = video
+            self.first_at = self.first_at or now
+            self.last_at = now
+            self.condition.notify()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+    def take(self):
+        """
+        Attende e ritorna il prossimo gruppo di video (lista); alla chiusura ritorna
+        quanto ancora in attesa, poi None
+        """
+        with self.condition:
+            while True:
+                if self.pending:
+                    now = time.monotonic()
+                    due = min(self.last_at + self.quiet, self.first_at + self.max_wait)
+                    if now >= due or self.closed:
+                        videos = list(self.pending.values())
+                        self.pending.clear()
+                        self.first_at = self.last_at = None
+                        return videos
+                    self.condition.wait(due - now)
+                elif self.closed:
+                    return None
+                else:
+                    self.condition.wait()
+
+class Subscription:
+    """Sottoscrizione al topic del canale: richiesta all'hub, verifica e rinnovo del lease"""
+
+    def __init__(self, callback_url=PUSH_CALLBACK_URL, hub_url=PUSH_HUB_URL, topic=TOPIC_URL,
+                 secret=PUSH_SECRET, lease_seconds=PUSH_LEASE_SECONDS):
+        self.callback_url = callback_url
+        self.hub_url = hub_url
+        self.topic = topic
+        self.secret = secret
+        self.lease_seconds = lease_seconds
+        self.mode = 'subscribe'  # Intento corrente: l'hub può confermare solo questo
+        self.expires_at = None
+        self.verified = threading.Event()
+
+    def request(self, mode='subscribe'):
+        """Chiede all'hub di (dis)iscriversi; la conferma arriva poi come GET di verifica"""
+        import requests
+
+        self.mode = mode
+        self.verified.clear()
+        data = {
+            'hub.callback': self.callback_url,
+            'hub.topic': self.topic,
+            'hub.mode': mode,
+            'hub.verify': 'async',
+            'hub.lease_seconds': str(self.lease_seconds),
+        }
+        if self.secret:
+            data['hub.secret'] = self.secret
+        response = requests.post(self.hub_url, data=data, timeout=30)
+        if response.status_code not in (202, 204):
+            raise RuntimeError(f"Hub {self.hub_url}: {response.status_code} {response.text[:200]}")
+        logger.info(f"Richiesta di {mode} inviata all'hub per {self.topic}")
+
+    def verify(self, params):
+        """
+        GET di verifica dell'hub: ritorna la challenge da restituire, None se va rifiutata
+        (topic diverso o modalità che non abbiamo chiesto)
+        """
+        mode = params.get('hub.mode')
+        if params.get('hub.topic') != self.topic or mode != self.mode or not params.get('hub.challenge'):
+            logger.warning(f"Verifica rifiutata: mode={mode} topic={params.get('hub.topic')}")
+            return None
+
+        lease = int(params.get('hub.lease_seconds') or 0)
+        self.expires_at = time.time() + lease if lease else None
+        self.verified.set()
+        logger.info(f"Sottoscrizione confermata ({mode}"
+                    f"{f', lease {lease / 3600:.0f}h' if lease else ''})")
+        return params['hub.challenge']
+
+    def renew_delay(self):
+        """Secondi al prossimo rinnovo (RENEW_AT_LEASE_FRACTION del lease; 1h se non ancora confermata)"""
+        if not self.expires_at:
+            return 3600
+        return max(60, (self.expires_at - time.time()) * RENEW_AT_LEASE_FRACTION)
+
+def record_notification(payload, path=PUSH_RECORD_FILE):
+    """Accoda il payload a PUSH_RECORD_FILE (JSON Lines, riproducibile con fake_websub_hub.py)"""
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({
+            'received_at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'body': payload.decode('utf-8', errors='replace')
+        }, ensure_ascii=False) + '\n')
+
+def make_handler(queue, subscription):
+    """Classe handler legata a coda e sottoscrizione"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, text=''):
+            payload = text.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/plain; charset=UTF-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            if parsed.path != PUSH_CALLBACK_PATH:
+                return self._send(404)
+            params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+            challenge = subscription.verify(params)
+            if challenge:
+                self._send(200, challenge)
+            else:
+                self._send(404)
+
+        def do_POST(self):
+            if urlparse(self.path).path != PUSH_CALLBACK_PATH:
+                return self._send(404)
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > MAX_PAYLOAD_BYTES:
+                return self._send(413)
+            payload = self.rfile.read(length)
+
+            # L'hub vuole sempre un 2xx: un payload non valido viene solo scartato
+            self._send(204)
+            if not valid_signature(payload, self.headers.get('X-Hub-Signature'), subscription.secret):
+                logger.warning("Notifica con firma non valida: scartata")
+                return
+            record_notification(payload)
+            try:
+                videos = parse_notification(payload)
+            except ET.ParseError as e:
+                logger.warning(f"Notifica non leggibile: {e}")
+                return
+            if videos:
+                logger.info(f"Notifica: {', '.join(v['id'] + (' (eliminato)' if v.get('deleted') else '') for v in videos)}")
+                queue.add(videos)
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+    return Handler
+
+def refresh_worker(queue):
+    """
+    Thread che possiede store e servizio API (sqlite3 e httplib2 non vanno condivisi tra thread):
+    per ogni gruppo di video dalla coda esegue un refresh mirato
+    """
+    store = load_store()
+    if not store:
+        logger.error("Impossibile procedere senza archivio esistente")
+        logger.error("Esegui prima: python execution/fetch_all_videos.py")
+        os.kill(os.getpid(), signal.SIGTERM)
+        return
+
+    governor = QuotaGovernor()
+    day = quota_day()
+    try:
+        youtube = get_authenticated_service(governor)
+        while True:
+            videos = queue.take()
+            if videos is None:
+                break
+
+            if quota_day() != day:
+                governor.log_breakdown()
+                governor.start_run()
+                day = quota_day()
+
+            logger.info(f"Refresh mirato di {len(videos)} video notificati")
+            try:
+                keep_warm(youtube)
+                status, counts = run_targeted_refresh(youtube, store, governor, videos)
+                write_live_schedule(store)
+                if any(counts.values()):
+                    run_on_change()
+            except QuotaExceeded as e:
+                logger.warning(f"Refresh mirato bloccato dal budget quota: {e} (ci penserà il prossimo refresh)")
+            except HttpError as e:
+                logger.error(f"Errore API anche dopo i retry: {e} (ci penserà il prossimo refresh)")
+            except Exception as e:
+                logger.error(f"Errore durante il refresh mirato: {e}", exc_info=True)
+    finally:
+        governor.log_breakdown()
+        store.close()
+
+def renew_loop(subscription, stop_event):
+    """Sottoscrive all'avvio e rinnova prima della scadenza del lease"""
+    while not stop_event.is_set():
+        try:
+            subscription.request('subscribe')
+        except Exception as e:
+            logger.error(f"Sottoscrizione non riuscita: {e} (riprovo tra 10 minuti)")
+            stop_event.wait(600)
+            continue
+        stop_event.wait(60)  # Lascia all'hub il tempo della verifica
+        stop_event.wait(subscription.renew_delay())
+
+def main():
+    """Funzione principale"""
+    logger.info("=" * 60)
+    logger.info("Push Receiver - Notifiche upload YouTube")
+    logger.info("=" * 60)
+
+    queue = NotificationQueue()
+    subscription = Subscription()
+    server = ThreadingHTTPServer((PUSH_HOST, PUSH_PORT), make_handler(queue, subscription))
+    server.daemon_threads = True
+
+    if '--unsubscribe' in sys.argv[1:]:
+        # Con il receiver fermo: questo processo riceve la verifica della disiscrizione
+        if not PUSH_CALLBACK_URL:
+            logger.error("PUSH_CALLBACK_URL non impostato")
+            sys.exit(1)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        subscription.request('unsubscribe')
+        confirmed = subscription.verified.wait(120)
+        server.shutdown()
+        if not confirmed:
+            logger.error("L'hub non ha verificato la disiscrizione entro 2 minuti")
+            sys.exit(1)
+        return
+
+    if not PUSH_SECRET:
+        logger.warning("PUSH_SECRET non impostato: le notifiche non sono autenticate")
+
+    stop_event = threading.Event()
+
+    def stop(signum, frame):
+        logger.info(f"Segnale {signal.Signals(signum).name}: chiusura dopo il refresh in corso")
+        stop_event.set()
+        queue.close()
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    worker = threading.Thread(target=refresh_worker, args=(queue,), name='refresh')
+    worker.start()
+    if PUSH_CALLBACK_URL:
+        threading.Thread(target=renew_loop, args=(subscription, stop_event), daemon=True).start()
+    else:
+        logger.warning("PUSH_CALLBACK_URL non impostato: nessuna sottoscrizione all'hub (solo ricezione)")
+
+    logger.info(f"In ascolto su http://{PUSH_HOST}:{PUSH_PORT}{PUSH_CALLBACK_PATH} "
+                f"(debounce {PUSH_DEBOUNCE_SECONDS:.0f}s, max {PUSH_DEBOUNCE_MAX_SECONDS:.0f}s)")
+    server.serve_forever()
+    worker.join()
+    logger.info("Receiver fermato")
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,29 @@
 #!/usr/bin/env python3
 """
 Script: Refresh Cache (Sync Incrementale)
-Scopo: Aggiornare data/videos_cache.json con nuovi video senza riscaricare tutto
+Scopo: Aggiungere i nuovi video allo store SQLite (data/archive.db) senza riscaricare tutto,
+       poi esportarlo in data/videos_cache.json (e aggiornare frontend/public/data/live_schedule.json)
 Direttiva di riferimento: directives/cache_strategy.md
-Costo API: ~10 unità (fetch solo ultime 2 pagine = 100 video)
+Costo API: ~3 unità nel caso tipico (1 pagina di playlist), cresce solo se ci sono molti video nuovi
+           (misurate e limitate da execution/youtube_quota.py)
 """
 
 import os
 import sys
-import json
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
-import isodate
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from youtube_api import (
+    API_BASE_URL, EtagCache, DetailsCache, build_local_service, build_service, estimate_full_sync_units,
+    execute_request, fetch_video_details, log_failed_batches
+)
+from youtube_quota import QuotaExceeded, QuotaGovernor
+from sync_checkpoint import SyncCheckpoint
+from fetch_all_videos import run_ingest_pipeline
+from archive_store import STORE_FILE, open_store, export_cache
+from video_cache import apply_cache_changes
+from live_schedule import write_live_schedule
 
 # Configurazione
 CHANNEL_ID = os.getenv('YOUTUBE_CHANNEL_ID', 'UC18Pm8LKXwtK2uUSoif5RVw')
@@ -25,8 +33,10 @@ CACHE_FILE = 'data/videos_cache.json'
 LOG_FILE = '.tmp/fetch_errors.log'
 
 # Configurazione sync incrementale
-MAX_PAGES_TO_FETCH = 2  # Fetch solo ultime 2 pagine (100 video)
 ITEMS_PER_PAGE = 50
+REFRESH_MIN_INTERVAL_MINUTES = int(os.getenv('YOUTUBE_REFRESH_MIN_INTERVAL_MINUTES', '15'))  # 0 = nessun limite
+KNOWN_RUN_LENGTH = 3  # ID consecutivi già noti che segnano il confine con lo store
+MAX_INCREMENTAL_PAGES = 10  # Oltre questa profondità senza confine → sync completo
 
 # Setup logging
 os.makedirs('.tmp', exist_ok=True)
@@ -43,70 +53,111 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-def load_existing_cache():
-    """Carica cache esistente"""
-    if not os.path.exists(CACHE_FILE):
-        logger.warning(f"Cache non trovata: {CACHE_FILE}")
-        logger.warning("Esegui prima: python execution/fetch_all_videos.py")
+def load_store():
+    """Apre lo store (inizializzato dall'export JSON al primo avvio); None se è vuoto"""
+    store = open_store(STORE_FILE, CACHE_FILE, CHANNEL_ID)
+    total_videos = store.count_videos()
+
+    if not total_videos:
+        logger.warning(f"Store vuoto e cache non trovata: {CACHE_FILE}")
+        store.close()
         return None
 
-    try:
-        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-            cache = json.load(f)
+    logger.info(f"Store caricato: {total_videos} video ({STORE_FILE})")
+    last_sync = store.last_sync()
+    if last_sync:
+        logger.info(f"Ultimo sync: {last_sync['finished_at']} ({last_sync['mode']})")
+    return store
 
-        logger.info(f"Cache caricata: {cache['total_videos']} video")
-        logger.info(f"Ultimo aggiornamento: {cache['last_updated']}")
-        return cache
-    except Exception as e:
-        logger.error(f"Errore lettura cache: {e}")
-        return None
+def recently_synced(store, min_interval=REFRESH_MIN_INTERVAL_MINUTES):
+    """
+    Pre-check senza rete né autenticazione: True se un sync riuscito (refresh o completo)
+    è terminato da meno di min_interval minuti (cron sovrapposti, run ripetuti)
+    I sync 'push' non contano: rileggono solo gli ID notificati, non la playlist
+    """
+    last_sync = store.last_sync(modes=('refresh', 'full'))
+    if min_interval <= 0 or not last_sync or not last_sync['finished_at']:
+        return False
+
+    cutoff = (datetime.utcnow() - timedelta(minutes=min_interval)).isoformat() + 'Z'
+    return last_sync['finished_at'] >= cutoff
+
+def get_authenticated_service(governor=None):
+    """
+    Carica credenziali e crea servizio YouTube API (o verso YOUTUBE_API_BASE_URL, senza OAuth)
+    Con governor ogni richiesta viene addebitata al budget quota prima di partire
+    """
+    if API_BASE_URL:
+        logger.info(f"API YouTube locale: {API_BASE_URL} (nessuna autenticazione)")
+        return build_local_service(API_BASE_URL, governor)
 
-def get_authenticated_service():
-    """Carica credenziali e crea servizio YouTube API"""
     if not os.path.exists(TOKEN_FILE):
         logger.error(f"Token file '{TOKEN_FILE}' non trovato!")
         logger.error("Esegui prima: python execution/youtube_oauth_setup.py")
         sys.exit(1)
 
     try:
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-        return build('youtube', 'v3', credentials=creds)
+        from token_broker import get_credentials
+
+        # Access token condiviso (token.json): rinnovato solo se in scadenza, una volta per tutti i worker
+        creds = get_credentials(TOKEN_FILE, SCOPES)
+        return build_service(credentials=creds, governor=governor)
     except Exception as e:
         logger.error(f"Errore durante autenticazione: {e}")
         logger.error("Prova a rieseguire: python execution/youtube_oauth_setup.py")
         sys.exit(1)
 
-def get_uploads_playlist_id(youtube, channel_id):
-    """Ottieni uploads playlist ID"""
+def get_uploads_playlist_id(youtube, channel_id, store=None):
+    """Ottieni uploads playlist ID (non cambia mai: dopo il primo run arriva dallo store, 0 unità)"""
+    meta_key = f"uploads_playlist_id:{channel_id}"
+    cached = store.get_meta(meta_key) if store else None
+    if cached:
+        return cached
+
     try:
         request = youtube.channels().list(
             part='contentDetails',
             id=channel_id
         )
-        response = request.execute()
+        response = execute_request(request)
 
         if not response.get('items'):
             logger.error(f"Canale {channel_id} non trovato!")
             sys.exit(1)
 
         uploads_playlist_id = response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+        if store:
+            store.set_meta(meta_key, uploads_playlist_id)
+            store.commit()
         return uploads_playlist_id
 
     except HttpError as e:
         logger.error(f"Errore API: {e}")
         sys.exit(1)
 
-def get_recent_playlist_items(youtube, playlist_id, max_pages=2):
+def get_new_playlist_items(youtube, playlist_id, store, etag_cache=None,
+                           max_pages=MAX_INCREMENTAL_PAGES):
     """
-    Recupera solo le ultime N pagine di video dalla playlist
-    (invece di tutti i video come in fetch_all_videos.py)
+    Scorre la playlist dalla pagina più recente finché non trova una sequenza
+    di KNOWN_RUN_LENGTH ID consecutivi già noti (il confine con lo store)
+    Gli ID noti (video in archivio + non-live già classificati) si cercano nello store
+    una pagina alla volta: il costo non dipende dalla dimensione dell'archivio
+    Nel caso tipico basta 1 pagina; con molti video nuovi si scende più in profondità
+    Con etag_cache le pagine invariate rispondono 304 e vengono riusate dallo store
+
+    Returns:
+        tuple: (recent_videos: list, boundary_found: bool)
+            boundary_found è False se dopo max_pages il confine non è stato trovato
+            (serve un sync completo)
+
+    Raises:
+        HttpError: pagina non recuperabile anche dopo i retry (il chiamante registra il sync come fallito)
     """
-    logger.info(f"Recupero ultime {max_pages} pagine ({max_pages * ITEMS_PER_PAGE} video max)")
-
     all_videos = []
     next_page_token = None
+    known_run = 0
 
-    for page_num in range(max_pages):
+    for page_num in range(1, max_pages + 1):
         try:
             request = youtube.playlistItems().list(
                 part='snippet',
@@ -114,57 +165,60 @@ def get_recent_playlist_items(youtube, playlist_id, max_pages=2):
                 maxResults=ITEMS_PER_PAGE,
                 pageToken=next_page_token
             )
-            response = request.execute()
-
-            items = response.get('items', [])
-            logger.info(f"Pagina {page_num + 1}/{max_pages}: {len(items)} video")
-
-            for item in items:
-                video_data = {
-                    'id': item['snippet']['resourceId']['videoId'],
-                    'title': item['snippet']['title'],
-                    'published_at': item['snippet']['publishedAt'],
-                    'thumbnail_url': '/thumbnail-default.png'
-                }
-                all_videos.append(video_data)
-
-            next_page_token = response.get('nextPageToken')
-            if not next_page_token:
-                logger.info("Fine playlist raggiunta")
-                break
-
+            if etag_cache:
+                response = etag_cache.execute(request)
+            else:
+                response = execute_request(request)
         except HttpError as e:
-            logger.error(f"Errore durante recupero playlist items: {e}")
-            break
+            # Niente confine "trovato" con pagine mancanti: il run risulta fallito
+            logger.error(f"Errore durante recupero playlist items (pagina {page_num}): {e}")
+            raise
+
+        items = response.get('items', [])
+        logger.info(f"Pagina {page_num}: {len(items)} video")
+        known_ids = store.known_ids(item['snippet']['resourceId']['videoId'] for item in items)
+
+        for item in items:
+            video_data = {
+                'id': item['snippet']['resourceId']['videoId'],
+                'title': item['snippet']['title'],
+                'published_at': item['snippet']['publishedAt'],
+                'thumbnail_url': '/thumbnail-default.png'
+            }
+            all_videos.append(video_data)
 
-    logger.info(f"Recuperati {len(all_videos)} video recenti")
-    return all_videos
+            known_run = known_run + 1 if video_data['id'] in known_ids else 0
+            if known_run >= KNOWN_RUN_LENGTH:
+                logger.info(f"Confine con lo store trovato a pagina {page_num}")
+                logger.info(f"Recuperati {len(all_videos)} video recenti")
+                return all_videos, True
 
-def get_video_details(youtube, video_ids):
-    """Recupera dettagli video (durata, liveStreamingDetails)"""
-    logger.info(f"Recupero dettagli per {len(video_ids)} video")
+        next_page_token = response.get('nextPageToken')
+        if not next_page_token:
+            logger.info("Fine playlist raggiunta")
+            logger.info(f"Recuperati {len(all_videos)} video recenti")
+            return all_videos, True
 
-    all_details = []
-    batch_size = 50
+    logger.warning(f"Confine con lo store non trovato in {max_pages} pagine")
+    return all_videos, False
 
-    for i in range(0, len(video_ids), batch_size):
-        batch = video_ids[i:i + batch_size]
+def get_video_details(youtube, video_ids, details_cache=None):
+    """Recupera dettagli video (durata, liveStreamingDetails), consultando prima details_cache"""
+    logger.info(f"Recupero dettagli per {len(video_ids)} video")
 
-        try:
-            request = youtube.videos().list(
-                part='contentDetails,liveStreamingDetails',
-                id=','.join(batch)
-            )
-            response = request.execute()
-            all_details.extend(response.get('items', []))
-        except HttpError as e:
-            logger.error(f"Errore durante recupero video details: {e}")
-            continue
+    if details_cache:
+        all_details, failed_batches = details_cache.fetch(youtube, video_ids)
+    else:
+        all_details, failed_batches = fetch_video_details(youtube, video_ids)
+    log_failed_batches(failed_batches)
 
-    return all_details
+    failed_ids = {video_id for b in failed_batches for video_id in b['ids']}
+    return all_details, failed_ids
 
 def parse_duration(duration_iso):
     """Converte durata ISO 8601 in secondi e formato leggibile"""
+    import isodate
+
     try:
         duration = isodate.parse_duration(duration_iso)
         total_seconds = int(duration.total_seconds())
@@ -183,183 +237,364 @@ def parse_duration(duration_iso):
     except Exception as e:
         return 0, "Durata non disponibile"
 
-def filter_new_videos(recent_videos, existing_cache):
+def split_recent_videos(recent_videos, store):
     """
-    Confronta video recenti con cache esistente
-    Ritorna solo video nuovi (non presenti in cache)
+    Divide i video recenti in nuovi e già in archivio
+    (i non-live già classificati vengono scartati senza chiamate)
+
+    Returns:
+        tuple: (new_videos: list, archived: dict ID → record in archivio)
+    """
+    ids = [v['id'] for v in recent_videos]
+    archived = store.get_videos(ids)
+    known_ids = store.known_ids(ids)
+    new_videos = [v for v in recent_videos if v['id'] not in known_ids]
+
+    logger.info(f"Trovati {len(new_videos)} nuovi video e {len(archived)} già in archivio "
+                f"da {len(recent_videos)} recenti")
+    return new_videos, archived
+
+def build_video_record(video, details):
+    """Record nel formato della cache da item playlist + dettagli videos.list"""
+    # Parse durata
+    duration_iso = details.get('contentDetails', {}).get('duration', 'P0D')
+    duration_seconds, duration_formatted = parse_duration(duration_iso)
+
+    # Parse data
+    published_at = video['published_at']
+    published_datetime = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
+
+    return {
+        'id': video['id'],
+        'title': video['title'],
+        'published_at': published_at,
+        'year': published_datetime.year,
+        'month': published_datetime.month,
+        'duration_seconds': duration_seconds,
+        'duration_formatted': duration_formatted,
+        'thumbnail_url': '/thumbnail-default.png',
+        'watch_url': f"https://www.youtube.com/watch?v={video['id']}"
+    }
+
+def build_change_events(videos, video_details, archived, failed_ids=()):
     """
-    existing_ids = {v['id'] for v in existing_cache['videos']}
-    new_videos = [v for v in recent_videos if v['id'] not in existing_ids]
+    Eventi per ID da applicare a store e cache (formato di video_cache.merge_changes)
 
-    logger.info(f"Trovati {len(new_videos)} nuovi video da {len(recent_videos)} recenti")
-    return new_videos
+    - insert per ogni video live nuovo
+    - upsert per ogni video live già in archivio (titolo corretto, durata di un live
+      appena concluso…; se il record è identico non cambia nulla)
+    - delete per un video in archivio che non ha più dettagli (eliminato o privato)
 
-def merge_with_cache(new_videos_data, existing_cache):
+    Gli ID dei batch falliti non producono eventi: un errore di rete non cancella nulla.
     """
-    Merge nuovi video con cache esistente
-    Ordina per data decrescente
+    details_dict = {item['id']: item for item in video_details}
+    events = []
+
+    for video in videos:
+        video_id = video['id']
+        if video_id in failed_ids:
+            continue
+
+        details = details_dict.get(video_id)
+        if not details:
+            if video_id in archived:
+                logger.warning(f"Video {video_id} in archivio senza dettagli (eliminato o privato): rimosso")
+                events.append({
+                    'op': 'delete',
+                    'id': video_id,
+                    'published_at': archived[video_id]['published_at']
+                })
+            else:
+                logger.warning(f"Dettagli non trovati per {video_id}")
+            continue
+
+        # Filtra solo video live
+        if 'liveStreamingDetails' not in details:
+            logger.info(f"Video {video_id} non è un live, skippato")
+            continue
+
+        op = 'upsert' if video_id in archived else 'insert'
+        events.append({'op': op, 'video': build_video_record(video, details)})
+
+    return events
+
+def sync_candidates(youtube, store, details_cache, candidates, archived):
     """
-    all_videos = existing_cache['videos'] + new_videos_data
-
-    # Rimuovi duplicati (per sicurezza)
-    seen_ids = set()
-    unique_videos = []
-    for v in all_videos:
-        if v['id'] not in seen_ids:
-            seen_ids.add(v['id'])
-            unique_videos.append(v)
-
-    # Ordina per data decrescente
-    sorted_videos = sorted(unique_videos, key=lambda x: x['published_at'], reverse=True)
-
-    return sorted_videos
-
-def save_cache(videos):
-    """Salva cache aggiornata"""
-    # Crea backup prima di sovrascrivere
-    if os.path.exists(CACHE_FILE):
-        backup_file = f"{CACHE_FILE}.backup"
-        try:
-            with open(CACHE_FILE, 'r') as src:
-                with open(backup_file, 'w') as dst:
-                    dst.write(src.read())
-            logger.info(f"Backup creato: {backup_file}")
-        except Exception as e:
-            logger.warning(f"Impossibile creare backup: {e}")
-
-    # Salva nuova cache
-    cache_data = {
-        'last_updated': datetime.utcnow().isoformat() + 'Z',
-        'total_videos': len(videos),
-        'videos': videos
-    }
+    Percorso dei video nuovi: dettagli (videos.list, dallo store se freschi) → filtro live
+    → eventi insert/update/delete per ID → store (upsert delle sole righe cambiate)
 
-    try:
-        # Scrivi in file temporaneo prima (atomicità)
-        temp_file = f"{CACHE_FILE}.tmp"
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, indent=2, ensure_ascii=False)
+    Returns:
+        tuple: (events: list, counts: dict inserted/updated/deleted)
+    """
+    video_ids = [v['id'] for v in candidates]
+    video_details, failed_ids = get_video_details(youtube, video_ids, details_cache)
+    details_cache.save()
+    details_cache.log_stats()
 
-        # Solo se scrittura OK, sostituisci file originale
-        os.replace(temp_file, CACHE_FILE)
-        logger.info(f"Cache aggiornata: {CACHE_FILE}")
+    events = build_change_events(candidates, video_details, archived, failed_ids)
+    counts = store.apply_events(events, CHANNEL_ID)
+    return events, counts
+
+def save_cache(store, events=None, changed=True):
+    """
+    Aggiorna data/videos_cache.json
+    Con events applica solo quei cambiamenti alla cache esistente (merge ordinato, accodati
+    al journal senza riscrivere lo snapshot); senza events, o se la cache manca, esporta
+    tutto lo store (backup + scrittura atomica, il journal viene assorbito)
+    Senza righe cambiate nello store (e con la cache già presente) non rilegge né riscrive nulla
+
+    Returns:
+        bool: True se il file è stato riscritto
+    """
+    if not changed and os.path.exists(CACHE_FILE):
+        return False
+
+    try:
+        result = apply_cache_changes(events, CACHE_FILE) if events is not None else None
+        if result is None:
+            written, _ = export_cache(store, CACHE_FILE, backup=True)
+        else:
+            written, _ = result
     except Exception as e:
-        logger.error(f"Errore durante salvataggio cache: {e}")
+        logger.error(f"Errore durante export cache: {e}")
         raise
 
-def main():
-    """Funzione principale"""
-    logger.info("=" * 60)
-    logger.info("Refresh Cache - Sync Incrementale")
-    logger.info("=" * 60)
+    if written:
+        logger.info(f"Cache aggiornata: {CACHE_FILE}")
+    return written
 
-    try:
-        # Carica cache esistente
-        existing_cache = load_existing_cache()
-        if not existing_cache:
-            logger.error("Impossibile procedere senza cache esistente")
-            logger.error("Esegui prima: python execution/fetch_all_videos.py")
-            sys.exit(1)
+def run_refresh(youtube, store, governor, uploads_playlist_id):
+    """
+    Un sync incrementale completo (playlist → dettagli → store → cache), con escalation
+    a sync completo se il confine con lo store non si trova
+    Usato da main() e, a ogni polling, da execution/sync_daemon.py (stesso servizio autenticato)
 
-        # Autenticazione
-        youtube = get_authenticated_service()
+    Returns:
+        tuple: (status: 'ok' | 'partial' | 'deferred' | 'failed', counts: dict inserted/updated/deleted)
+
+    Raises:
+        QuotaExceeded, HttpError (o altri errori, es. di rete): il sync viene registrato come fallito,
+        l'archivio non cambia
+    """
+    no_changes = {'inserted': 0, 'updated': 0, 'deleted': 0}
+    run_id = store.begin_sync('refresh', CHANNEL_ID)
+    checkpoint = None
+    try:
+        details_cache = DetailsCache(store, governor)
 
-        # Ottieni uploads playlist ID
-        uploads_playlist_id = get_uploads_playlist_id(youtube, CHANNEL_ID)
+        # Fetch solo video recenti, fino al confine con lo store
+        etag_cache = EtagCache(store)
+        recent_videos, boundary_found = get_new_playlist_items(
+            youtube, uploads_playlist_id, store, etag_cache
+        )
 
-        # Fetch solo video recenti (ultime 2 pagine)
-        recent_videos = get_recent_playlist_items(youtube, uploads_playlist_id, MAX_PAGES_TO_FETCH)
+        if not boundary_found:
+            # Troppi video nuovi: l'incrementale rischierebbe di perderne → sync completo,
+            # se sta nel budget quota; altrimenti si rimanda (lo store resta com'è)
+            checkpoint = SyncCheckpoint.open(uploads_playlist_id)
+            estimate = estimate_full_sync_units(store, checkpoint)
+            available = governor.remaining()
+            if estimate > available:
+                etag_cache.save()
+                store.finish_sync(run_id, 'deferred')
+                governor.defer('escalation a sync completo')
+                logger.warning(f"Escalation a sync completo rimandata: stimate ~{estimate} unità, "
+                               f"disponibili {available}")
+                logger.warning("Archivio non modificato: il prossimo run (o fetch_all_videos.py) la riproverà")
+                return 'deferred', no_changes
+
+            logger.warning(f"Escalation a sync completo (stima ~{estimate} unità)")
+            live_videos, failed_batches = run_ingest_pipeline(
+                youtube, uploads_playlist_id, etag_cache, details_cache, checkpoint
+            )
+            etag_cache.save()
+            etag_cache.log_stats()
+            details_cache.save()
+            details_cache.log_stats()
+
+            if not live_videos:
+                store.finish_sync(run_id, 'failed')
+                logger.error("Sync completo senza video live: archivio non modificato")
+                return 'failed', no_changes
+
+            if failed_batches:
+                # Senza eliminazioni: il prossimo run riprende dal checkpoint
+                counts = store.sync_videos(live_videos, CHANNEL_ID)
+                status = 'partial'
+                logger.warning("Sync completo parziale (batch falliti): nessun video eliminato, "
+                               "il prossimo run riprende dal checkpoint")
+            else:
+                counts = store.sync_videos(live_videos, CHANNEL_ID, full=True)
+                status = 'ok'
+                checkpoint.discard()
+            store.finish_sync(run_id, status, counts)
+            save_cache(store, changed=any(counts.values()))
+            logger.info(f"Totale video in archivio: {store.count_videos()}")
+            return status, counts
+
+        etag_cache.save()
+        etag_cache.log_stats()
 
         if not recent_videos:
+            store.finish_sync(run_id, 'ok')
             logger.info("Nessun video recente trovato")
             logger.info("Cache non modificata")
-            return
+            return 'ok', no_changes
 
-        # Filtra solo video nuovi (non in cache)
-        new_videos = filter_new_videos(recent_videos, existing_cache)
+        # Video nuovi + video recenti già in archivio (per intercettare correzioni)
+        new_videos, archived = split_recent_videos(recent_videos, store)
+        candidates = new_videos + [v for v in recent_videos if v['id'] in archived]
 
-        if not new_videos:
+        if not candidates:
+            store.finish_sync(run_id, 'ok')
             logger.info("✅ Nessun nuovo video. Cache già aggiornata!")
-            logger.info(f"Totale video in cache: {existing_cache['total_videos']}")
-            return
+            logger.info(f"Totale video in archivio: {store.count_videos()}")
+            return 'ok', no_changes
 
-        # Fetch dettagli solo per video nuovi
-        video_ids = [v['id'] for v in new_videos]
-        video_details = get_video_details(youtube, video_ids)
+        # Fetch dettagli: per i video già in archivio arrivano dallo store
+        # (tranne i live non ancora conclusi); i non-live già classificati non costano chiamate
+        events, counts = sync_candidates(youtube, store, details_cache, candidates, archived)
+        store.finish_sync(run_id, 'ok', counts)
 
-        # Crea dict per lookup
-        details_dict = {item['id']: item for item in video_details}
+        if not any(counts.values()):
+            logger.info("✅ Nessun video nuovo o modificato. Cache già aggiornata!")
+            logger.info(f"Totale video in archivio: {store.count_videos()}")
+            return 'ok', counts
 
-        # Processa nuovi video
-        new_videos_data = []
-        for video in new_videos:
-            video_id = video['id']
-            details = details_dict.get(video_id)
+        # Applica gli stessi eventi alla cache (no-op se il contenuto non è cambiato)
+        if not save_cache(store, events):
+            logger.info("✅ Contenuto invariato, cache non riscritta")
+            return 'ok', counts
 
-            if not details:
-                logger.warning(f"Dettagli non trovati per {video_id}")
-                continue
+        # Riepilogo
+        logger.info("=" * 60)
+        logger.info("🎉 REFRESH COMPLETATO CON SUCCESSO!")
+        logger.info("=" * 60)
+        logger.info(f"Nuovi video aggiunti: {counts['inserted']}")
+        logger.info(f"Video aggiornati: {counts['updated']}")
+        logger.info(f"Video rimossi: {counts['deleted']}")
+        logger.info(f"Totale video in archivio: {store.count_videos()}")
+        logger.info(f"Quota API usata: {governor.run_units} unità (dettaglio per endpoint sotto)")
+        return 'ok', counts
+
+    except Exception:
+        # Qualsiasi errore (quota, API, rete, dati): il run non resta 'running' in sync_runs
+        store.finish_sync(run_id, 'failed')
+        raise
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+def run_targeted_refresh(youtube, store, governor, videos):
+    """
+    Refresh mirato di video già noti per ID (es. notifiche push di execution/push_receiver.py),
+    senza scorrere la playlist: stesso percorso dettagli → filtro live → store → cache dei video nuovi
+    I dettagli vengono sempre riscaricati (la notifica dice che il video è cambiato):
+    fino a 50 ID costano una sola chiamata videos.list
 
-            # Filtra solo video live
-            if 'liveStreamingDetails' not in details:
-                logger.info(f"Video {video_id} non è un live, skippato")
+    Args:
+        videos: [{'id', 'title', 'published_at'}] dal payload della notifica
+                ({'id', 'deleted': True} per un video eliminato)
+
+    Returns:
+        tuple: (status, counts) come run_refresh
+
+    Raises:
+        QuotaExceeded, HttpError (o altri errori): il sync viene registrato come fallito,
+        l'archivio non cambia
+    """
+    run_id = store.begin_sync('push', CHANNEL_ID)
+    try:
+        new_videos, archived = split_recent_videos(videos, store)
+        # Un video eliminato mai entrato in archivio non richiede chiamate; per quelli in archivio
+        # titolo e data vengono dallo store (la tombstone ha solo l'ID) e videos.list conferma
+        # l'eliminazione: senza dettagli → delete, ancora presente → upsert invariato
+        candidates = [v for v in new_videos if not v.get('deleted')]
+        for video in videos:
+            if video['id'] not in archived:
                 continue
+            if video.get('deleted'):
+                record = archived[video['id']]
+                video = {'id': record['id'], 'title': record['title'], 'published_at': record['published_at']}
+            candidates.append(video)
+        if not candidates:
+            store.finish_sync(run_id, 'ok')
+            logger.info("Nessun video live da aggiornare tra quelli notificati")
+            return 'ok', {'inserted': 0, 'updated': 0, 'deleted': 0}
+
+        details_cache = DetailsCache(store, governor)
+        details_cache.mark_stale(v['id'] for v in candidates)
+        events, counts = sync_candidates(youtube, store, details_cache, candidates, archived)
+        store.finish_sync(run_id, 'ok', counts)
+    except Exception:
+        # Qualsiasi errore (anche di rete o di dati): il run non resta 'running' in sync_runs
+        store.finish_sync(run_id, 'failed')
+        raise
 
-            # Parse durata
-            duration_iso = details.get('contentDetails', {}).get('duration', 'P0D')
-            duration_seconds, duration_formatted = parse_duration(duration_iso)
-
-            # Parse data
-            published_at = video['published_at']
-            published_datetime = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
-
-            # Costruisci oggetto
-            video_obj = {
-                'id': video_id,
-                'title': video['title'],
-                'published_at': published_at,
-                'year': published_datetime.year,
-                'month': published_datetime.month,
-                'duration_seconds': duration_seconds,
-                'duration_formatted': duration_formatted,
-                'thumbnail_url': '/thumbnail-default.png',
-                'watch_url': f"https://www.youtube.com/watch?v={video_id}"
-            }
+    if any(counts.values()):
+        save_cache(store, events)
+    return 'ok', counts
 
-            new_videos_data.append(video_obj)
+def main():
+    """Funzione principale"""
+    logger.info("=" * 60)
+    logger.info("Refresh Cache - Sync Incrementale")
+    logger.info("=" * 60)
 
-        if not new_videos_data:
-            logger.info("Nessun nuovo video live trovato")
-            logger.info("Cache non modificata")
-            return
+    store = None
+    governor = QuotaGovernor()
+    try:
+        # Apri lo store (al primo avvio viene inizializzato dalla cache JSON)
+        store = load_store()
+        if not store:
+            logger.error("Impossibile procedere senza archivio esistente")
+            logger.error("Esegui prima: python execution/fetch_all_videos.py")
+            sys.exit(1)
 
-        # Merge con cache esistente
-        merged_videos = merge_with_cache(new_videos_data, existing_cache)
+        # Pre-check: nessuna chiamata API se l'archivio è stato appena sincronizzato
+        if '--force' not in sys.argv[1:] and recently_synced(store):
+            logger.info(f"✅ Sync riuscito negli ultimi {REFRESH_MIN_INTERVAL_MINUTES} minuti: niente da fare "
+                        f"(--force per forzare)")
+            return
 
-        # Salva cache aggiornata
-        save_cache(merged_videos)
+        # Autenticazione (ogni richiesta viene addebitata al governor)
+        youtube = get_authenticated_service(governor)
 
-        # Riepilogo
-        logger.info("=" * 60)
-        logger.info("🎉 REFRESH COMPLETATO CON SUCCESSO!")
-        logger.info("=" * 60)
-        logger.info(f"Nuovi video aggiunti: {len(new_videos_data)}")
-        logger.info(f"Totale video in cache: {len(merged_videos)}")
-        logger.info(f"Quota API usata: ~{3 + (len(new_videos_data) // 50 + 1)} unità su 10.000")
-        logger.info("")
-        logger.info("Prossimi passi (opzionali):")
-        logger.info("  - Rigenera JSON frontend: python execution/generate_static_json.py")
-        logger.info("  - Rebuild frontend: cd frontend && npm run build")
-        logger.info("")
+        # Ottieni uploads playlist ID (dallo store dopo il primo run)
+        uploads_playlist_id = get_uploads_playlist_id(youtube, CHANNEL_ID, store)
 
+        status, counts = run_refresh(youtube, store, governor, uploads_playlist_id)
+        if status == 'failed':
+            sys.exit(1)
+        write_live_schedule(store)
+
+        if any(counts.values()):
+            logger.info("")
+            logger.info("Prossimi passi (opzionali):")
+            logger.info("  - Rigenera artefatti frontend: python execution/build_artifacts.py")
+            logger.info("  - Rebuild frontend: cd frontend && npm run build")
+            logger.info("")
+
+    except QuotaExceeded as e:
+        logger.error(f"\n❌ Budget quota esaurito: {e}")
+        logger.error("L'archivio esistente NON è stato modificato")
+        sys.exit(1)
+    except HttpError as e:
+        logger.error(f"\n❌ Errore API anche dopo i retry: {e}")
+        logger.error("L'archivio esistente NON è stato modificato (un sync completo riprenderà dal checkpoint)")
+        sys.exit(1)
     except KeyboardInterrupt:
         logger.warning("\n⚠️  Refresh interrotto dall'utente")
         sys.exit(1)
     except Exception as e:
         logger.error(f"\n❌ ERRORE IMPREVISTO: {e}", exc_info=True)
-        logger.error("La cache esistente NON è stata modificata")
+        logger.error("L'archivio esistente NON è stato modificato")
         logger.error("Consulta .tmp/fetch_errors.log per dettagli")
         sys.exit(1)
+    finally:
+        governor.log_breakdown()
+        if store:
+            store.close()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Modulo: Sync Checkpoint (ripresa dei sync completi)
+Scopo: Salvare in .tmp/ il progresso di un sync completo (pagine di playlist già scaricate
+       con il loro nextPageToken, batch di dettagli completati), così che un nuovo run dopo
+       un crash, un errore API o il budget quota esaurito riprenda da dove si era fermato
+       invece di riscaricare tutto (e rispendere ~63 unità)
+Usato da: execution/fetch_all_videos.py (run_ingest_pipeline, anche per l'escalation di refresh_cache.py)
+Direttiva di riferimento: directives/fetch_youtube_videos.md
+
+Formato: JSON Lines in sola aggiunta (una riga per pagina o batch, scritta e flushata subito):
+    {"format": ..., "version": 1, "playlist_id": ..., "created_at": ...}    intestazione
+    {"page": 1, "videos": [...], "next_page_token": "..."}                  pagina di playlist
+    {"batch": [...]}                                                         item videos.list di un batch
+Una riga finale troncata (crash a metà scrittura) viene ignorata.
+Il checkpoint viene eliminato quando il sync si conclude senza batch falliti.
+"""
+
+import os
+import json
+import logging
+from datetime import datetime, timedelta
+
+# Configurazione
+CHECKPOINT_FILE = '.tmp/sync_checkpoint.jsonl'
+CHECKPOINT_FORMAT = 'aba-sync-checkpoint'
+CHECKPOINT_VERSION = 1
+CHECKPOINT_MAX_AGE_HOURS = int(os.getenv('YOUTUBE_CHECKPOINT_MAX_AGE_HOURS', '24'))  # Oltre, i token di pagina non sono affidabili
+
+logger = logging.getLogger(__name__)
+
+def _read_lines(path):
+    """Righe JSON del checkpoint (si ferma alla prima riga illeggibile)"""
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+    return records
+
+class SyncCheckpoint:
+    """
+    Progresso di un sync completo della playlist uploads
+
+    Attributi (dopo il caricamento):
+        pages: pagine già scaricate (liste di video), nell'ordine della playlist
+        next_page_token: token da cui riprendere la paginazione (None se non iniziata o conclusa)
+        playlist_complete: True se l'ultima pagina è già stata scaricata
+        details: ID video → item videos.list dei batch completati
+    """
+
+    def __init__(self, playlist_id, path=CHECKPOINT_FILE):
+        self.playlist_id = playlist_id
+        self.path = path
+        self.pages = []
+        self.next_page_token = None
+        self.playlist_complete = False
+        self.details = {}
+        self.resumed = False
+        self.file = None
+
+    @classmethod
+    def open(cls, playlist_id, path=CHECKPOINT_FILE):
+        """
+        Riprende il checkpoint esistente per questa playlist, se recente;
+        altrimenti ne inizia uno nuovo (scartando quello vecchio)
+        """
+        checkpoint = cls(playlist_id, path)
+        if os.path.exists(path):
+            checkpoint._load()
+        if not checkpoint.resumed:
+            checkpoint._start()
+        else:
+            checkpoint.file = open(path, 'a', encoding='utf-8')
+        return checkpoint
+
+    def _load(self):
+        try:
+            records = _read_lines(self.path)
+        except OSError as e:
+            logger.warning(f"Checkpoint illeggibile ({self.path}): {e}. Riparto da zero")
+            return
+
+        header = records[0] if records else {}
+        if header.get('format') != CHECKPOINT_FORMAT or header.get('version') != CHECKPOINT_VERSION:
+            logger.warning(f"Checkpoint in formato sconosciuto: {self.path} ignorato")
+            return
+        if header.get('playlist_id') != self.playlist_id:
+            logger.info(f"Checkpoint di un'altra playlist ({header.get('playlist_id')}): ignorato")
+            return
+        cutoff = (datetime.utcnow() - timedelta(hours=CHECKPOINT_MAX_AGE_HOURS)).isoformat() + 'Z'
+        if header.get('created_at', '') < cutoff:
+            logger.info(f"Checkpoint più vecchio di {CHECKPOINT_MAX_AGE_HOURS}h: ignorato")
+            return
+
+        for record in records[1:]:
+            if 'page' in record:
+                self.pages.append(record['videos'])
+                self.next_page_token = record['next_page_token']
+                self.playlist_complete = not record['next_page_token']
+            elif 'batch' in record:
+                for item in record['batch']:
+                    self.details[item['id']] = item
+
+        self.resumed = True
+        logger.info(
+            f"Ripresa da checkpoint ({header['created_at']}): {len(self.pages)} pagine"
+            f"{' (playlist completa)' if self.playlist_complete else ''}, "
+            f"dettagli di {len(self.details)} video"
+        )
+
+    def _start(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.file = open(self.path, 'w', encoding='utf-8')
+        self._append({
+            'format': CHECKPOINT_FORMAT,
+            'version': CHECKPOINT_VERSION,
+            'playlist_id': self.playlist_id,
+            'created_at': datetime.utcnow().isoformat() + 'Z'
+        })
+
+    def _append(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.file.flush()
+
+    def add_page(self, videos, next_page_token):
+        """Registra una pagina di playlist appena scaricata"""
+        self.pages.append(videos)
+        self.next_page_token = next_page_token
+        self.playlist_complete = not next_page_token
+        self._append({'page': len(self.pages), 'videos': videos, 'next_page_token': next_page_token})
+
+    def add_batch(self, details):
+        """Registra gli item videos.list di un batch completato"""
+        if not details:
+            return
+        for item in details:
+            self.details[item['id']] = item
+        self._append({'batch': details})
+
+    def close(self):
+        """Chiude il file, lasciandolo su disco per il prossimo run"""
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def discard(self):
+        """Sync concluso: elimina il checkpoint"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Script: Sync Daemon (polling adattivo sugli orari delle lezioni)
+Scopo: Processo sempre attivo attorno a refresh_cache.py: impara dallo store a che ora finiscono
+       di solito le lezioni (published_at + durata, per giorno della settimana), interroga l'API
+       fitto subito dopo le fine attese e quasi mai nel resto della giornata, così una lezione
+       è online pochi minuti dopo la fine invece che al cron delle 02:00 UTC
+       Servizio autenticato, connessioni HTTP e store restano aperti tra un polling e l'altro
+Input: data/archive.db (orari appresi + sync), token.json (o YOUTUBE_API_BASE_URL)
+Output: data/archive.db, data/videos_cache.json, frontend/public/data/live_schedule.json; dopo ogni cambiamento esegue DAEMON_ON_CHANGE
+Direttiva di riferimento: directives/cache_strategy.md
+
+Quota: il daemon ha un budget giornaliero proprio (run budget del governor, azzerato a ogni
+giorno di quota Pacific) che per default resta sotto il costo di un sync completo a freddo.
+
+Uso:
+    python execution/sync_daemon.py              # polling fino a SIGTERM / Ctrl+C
+    python execution/sync_daemon.py --schedule   # mostra finestre apprese e prossimo polling (niente rete)
+"""
+
+import os
+import sys
+import math
+import signal
+import logging
+import threading
+import subprocess
+from datetime import datetime, timedelta, timezone
+import httplib2
+from google.auth.exceptions import TransportError
+from googleapiclient.errors import HttpError
+from youtube_api import DETAILS_BATCH_SIZE
+from youtube_quota import QuotaExceeded, QuotaGovernor, quota_day
+from live_schedule import write_live_schedule
+from lesson_schedule import PollingSchedule
+from refresh_cache import (
+    CHANNEL_ID, load_store, get_authenticated_service, get_uploads_playlist_id, run_refresh
+)
+
+# Configurazione polling
+DENSE_INTERVAL_MINUTES = int(os.getenv('YOUTUBE_DAEMON_DENSE_INTERVAL_MINUTES', '5'))
+IDLE_INTERVAL_HOURS = int(os.getenv('YOUTUBE_DAEMON_IDLE_INTERVAL_HOURS', '6'))  # Rete di sicurezza fuori dalle finestre
+DAILY_BUDGET = int(os.getenv('YOUTUBE_DAEMON_DAILY_BUDGET', '0'))  # 0 = sotto il costo di un sync completo a freddo
+POLL_UNITS = 2  # Costo tipico di un polling (playlist + dettagli dei live in corso)
+# Rete giù o DNS assente anche dopo i retry di execute_request (o al rinnovo del token): si riprova dopo
+NETWORK_ERRORS = (TimeoutError, ConnectionError, httplib2.ServerNotFoundError, TransportError)
+ON_CHANGE_COMMAND = os.getenv(
+    'DAEMON_ON_CHANGE',
+    f"{sys.executable} execution/build_artifacts.py"
+)
+
+logger = logging.getLogger(__name__)
+
+def _parse(timestamp):
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+def lesson_landed(store, window_start):
+    """True se nello store c'è già una lezione conclusa (durata nota) finita dopo window_start"""
+    since = (window_start - timedelta(hours=12)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return any(
+        duration_seconds and _parse(published_at) + timedelta(seconds=duration_seconds) >= window_start
+        for published_at, duration_seconds in store.iter_airtimes(since)
+    )
+
+def next_poll_delay(schedule, now, landed=False):
+    """
+    Secondi fino al prossimo polling
+
+    - dentro una finestra, finché la lezione attesa non è nello store: DENSE_INTERVAL_MINUTES
+    - altrimenti fino all'inizio della prossima finestra, al massimo IDLE_INTERVAL_HOURS
+    """
+    window = schedule.window_at(now)
+    if window and not landed:
+        return DENSE_INTERVAL_MINUTES * 60
+
+    idle = IDLE_INTERVAL_HOURS * 3600
+    after = window[1] if window else now
+    next_start = schedule.next_window_start(after)
+    if next_start is None:
+        return idle
+    return max(DENSE_INTERVAL_MINUTES * 60, min(idle, (next_start - now).total_seconds()))
+
+def daemon_budget(store):
+    """Budget giornaliero del daemon: DAILY_BUDGET, oppure un'unità sotto un sync completo a freddo"""
+    if DAILY_BUDGET > 0:
+        return DAILY_BUDGET
+    pages = max(1, math.ceil(max(store.count_videos(), store.count_details()) / DETAILS_BATCH_SIZE))
+    return max(POLL_UNITS, 2 * pages - 1)  # pagine di playlist + batch di dettagli
+
+def keep_warm(youtube):
+    """Rinnova l'access token prima del polling se sta per scadere (il servizio resta lo stesso)"""
+    credentials = getattr(youtube._http, 'credentials', None)
+    refresh_margin = getattr(credentials, 'refresh_margin', None)
+    if refresh_margin is None:
+        return  # API locale, senza OAuth
+
+    from token_broker import expires_within
+    if expires_within(credentials, refresh_margin):
+        from google.auth.transport.requests import Request
+
+        credentials.refresh(Request())
+
+def run_on_change(command=ON_CHANGE_COMMAND):
+    """Comando dopo un sync con cambiamenti (default: rigenera JSON statici e indice di ricerca)"""
+    if not command:
+        return
+    logger.info(f"Archivio cambiato: eseguo {command}")
+    result = subprocess.run(command, shell=True)
+    if result.returncode != 0:
+        logger.error(f"Comando post-sync fallito (codice {result.returncode})")
+
+def seconds_to_next_quota_day(now):
+    """Secondi fino alla mezzanotte Pacific (nuovo giorno di quota)"""
+    today = quota_day(now)
+    probe = now.replace(minute=0, second=0, microsecond=0)
+    while quota_day(probe) == today:
+        probe += timedelta(hours=1)
+    return max(60, (probe - now).total_seconds())
+
+def serve(stop_event):
+    """Loop del daemon fino a stop_event"""
+    store = load_store()
+    if not store:
+        logger.error("Impossibile procedere senza archivio esistente")
+        logger.error("Esegui prima: python execution/fetch_all_videos.py")
+        sys.exit(1)
+
+    governor = QuotaGovernor(run_budget=daemon_budget(store))
+    day = quota_day()
+    try:
+        # Un solo servizio per tutta la vita del daemon: token e connessioni restano caldi
+        youtube = get_authenticated_service(governor)
+        uploads_playlist_id = get_uploads_playlist_id(youtube, CHANNEL_ID, store)
+        logger.info(f"Budget quota del daemon: {governor.run_budget} unità al giorno")
+
+        while not stop_event.is_set():
+            now = datetime.now(timezone.utc)
+            if quota_day(now) != day:
+                governor.log_breakdown()
+                governor.start_run()
+                governor.run_budget = daemon_budget(store)
+                day = quota_day(now)
+
+            if not governor.can_afford(POLL_UNITS):
+                delay = seconds_to_next_quota_day(now)
+                logger.warning(f"Budget quota del daemon esaurito ({governor.run_units}/{governor.run_budget}): "
+                               f"pausa fino al nuovo giorno di quota ({delay / 3600:.1f}h)")
+                stop_event.wait(delay)
+                continue
+
+            try:
+                keep_warm(youtube)
+                status, counts = run_refresh(youtube, store, governor, uploads_playlist_id)
+                write_live_schedule(store)
+                if any(counts.values()):
+                    run_on_change()
+            except QuotaExceeded as e:
+                logger.warning(f"Polling interrotto dal budget quota: {e}")
+            except HttpError as e:
+                logger.error(f"Errore API anche dopo i retry: {e} (riprovo al prossimo polling)")
+            except NETWORK_ERRORS as e:
+                logger.error(f"Errore di rete anche dopo i retry: {type(e).__name__}: {e} "
+                             f"(riprovo al prossimo polling)")
+
+            now = datetime.now(timezone.utc)
+            schedule = PollingSchedule.learn(store, now)
+            window = schedule.window_at(now)
+            landed = bool(window) and lesson_landed(store, window[0])
+            delay = next_poll_delay(schedule, now, landed)
+            logger.info(
+                f"Prossimo polling tra {delay / 60:.0f} min "
+                f"({'finestra attiva' if window and not landed else 'fuori finestra'}; "
+                f"quota del daemon {governor.run_units}/{governor.run_budget})"
+            )
+            stop_event.wait(delay)
+    finally:
+        governor.log_breakdown()
+        store.close()
+
+def show_schedule():
+    """Finestre apprese e prossimo polling, senza rete"""
+    store = load_store()
+    if not store:
+        sys.exit(1)
+    try:
+        now = datetime.now(timezone.utc)
+        schedule = PollingSchedule.learn(store, now)
+        schedule.log_summary()
+        if not schedule.windows:
+            logger.info(f"Polling ogni {IDLE_INTERVAL_HOURS}h (rete di sicurezza)")
+        window = schedule.window_at(now)
+        landed = bool(window) and lesson_landed(store, window[0])
+        delay = next_poll_delay(schedule, now, landed)
+        logger.info(f"Budget quota del daemon: {daemon_budget(store)} unità al giorno")
+        logger.info(f"Adesso ({now:%a %H:%M} UTC): "
+                    f"{'finestra attiva' if window else 'fuori finestra'}, prossimo polling tra {delay / 60:.0f} min")
+    finally:
+        store.close()
+
+def main():
+    """Funzione principale"""
+    logger.info("=" * 60)
+    logger.info("Sync Daemon - Polling adattivo")
+    logger.info("=" * 60)
+
+    if '--schedule' in sys.argv[1:]:
+        show_schedule()
+        return
+
+    stop_event = threading.Event()
+
+    def stop(signum, frame):
+        logger.info(f"Segnale {signal.Signals(signum).name}: chiusura dopo il polling in corso")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    try:
+        serve(stop_event)
+    except Exception as e:
+        logger.error(f"\n❌ ERRORE IMPREVISTO: {e}", exc_info=True)
+        logger.error("Consulta .tmp/fetch_errors.log per dettagli")
+        sys.exit(1)
+    logger.info("Daemon fermato")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Modulo: Token Broker (token OAuth condiviso tra run, processi e worker)
+Scopo: Un solo access token valido per tutti: viene letto da token.json con la sua scadenza,
+       rinnovato in anticipo (REFRESH_MARGIN_SECONDS prima della scadenza) e riscritto su disco,
+       così il run successivo non paga un altro round-trip OAuth
+       I rinnovi sono serializzati da un lock (thread + file lock su token.json.lock):
+       chi arriva dopo rilegge il file e riusa il token appena ottenuto invece di rinnovarlo di nuovo
+Usato da: execution/fetch_all_videos.py, execution/refresh_cache.py, execution/youtube_oauth_setup.py
+Direttiva di riferimento: directives/setup_google_cloud.md
+"""
+
+import os
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from google.oauth2.credentials import Credentials
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo il lock tra thread
+    fcntl = None
+
+# Configurazione
+TOKEN_FILE = os.getenv('GOOGLE_TOKEN_FILE', 'token.json')
+SCOPES = ['https://www.googleapis.com/auth/youtube.readonly']
+REFRESH_MARGIN_SECONDS = int(os.getenv('GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS', '300'))
+
+logger = logging.getLogger(__name__)
+
+_thread_lock = threading.Lock()
+
+@contextmanager
+def token_lock(token_file=TOKEN_FILE):
+    """Lock esclusivo sul token: tra i thread del processo e tra processi (file lock)"""
+    with _thread_lock:
+        with open(f"{token_file}.lock", 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def expires_within(creds, seconds):
+    """True se il token manca o scade entro seconds secondi"""
+    if not creds.token:
+        return True
+    if not creds.expiry:
+        return False
+    return datetime.utcnow() + timedelta(seconds=seconds) >= creds.expiry
+
+def save_credentials(creds, token_file=TOKEN_FILE):
+    """Scrive il token (con scadenza) in modo atomico, leggibile solo dal proprietario"""
+    temp_file = f"{token_file}.tmp"
+    fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(creds.to_json())
+    os.replace(temp_file, token_file)
+
+class BrokeredCredentials(Credentials):
+    """
+    Credentials il cui refresh passa dal broker: lock, rilettura di token.json
+    (un altro processo o thread potrebbe averlo appena rinnovato), refresh solo se serve,
+    salvataggio del nuovo token. Un'istanza può essere condivisa da tutti i worker.
+    """
+
+    token_file = TOKEN_FILE
+    refresh_margin = REFRESH_MARGIN_SECONDS
+
+    def refresh(self, request):
+        # Token in uso quando il refresh è stato chiesto: in scadenza, oppure rifiutato (401)
+        stale_token = self.token
+        with token_lock(self.token_file):
+            if self.token != stale_token and not expires_within(self, self.refresh_margin):
+                return  # Rinnovato da un altro thread mentre si aspettava il lock
+
+            stored = load_credentials(self.token_file, self.scopes)
+            if (stored and stored.refresh_token == self.refresh_token and stored.token != stale_token
+                    and not expires_within(stored, self.refresh_margin)):
+                self.token = stored.token
+                self.expiry = stored.expiry
+                logger.info(f"Token OAuth rinnovato da un altro processo (scade {self.expiry.isoformat()}Z)")
+                return
+
+            super().refresh(request)
+            save_credentials(self, self.token_file)
+            logger.info(f"Token OAuth rinnovato e salvato in {self.token_file} (scade {self.expiry.isoformat()}Z)")
+
+def load_credentials(token_file=TOKEN_FILE, scopes=SCOPES):
+    """Credenziali da token.json (token, refresh token, scadenza); None se il file manca"""
+    try:
+        with open(token_file, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    creds = BrokeredCredentials.from_authorized_user_info(info, scopes)
+    creds.token_file = token_file
+    return creds
+
+def get_credentials(token_file=TOKEN_FILE, scopes=SCOPES, margin=REFRESH_MARGIN_SECONDS):
+    """
+    Credenziali pronte all'uso: l'access token salvato se valido per almeno margin secondi,
+    altrimenti rinnovato subito (una sola volta anche con più processi in parallelo)
+
+    Returns:
+        BrokeredCredentials oppure None se token_file non esiste
+
+    Raises:
+        google.auth.exceptions.RefreshError: refresh token revocato o scaduto
+    """
+    creds = load_credentials(token_file, scopes)
+    if creds is None:
+        return None
+
+    creds.refresh_margin = margin
+    if expires_within(creds, margin) and creds.refresh_token:
+        from google.auth.transport.requests import Request
+
+        creds.refresh(Request())
+    else:
+        logger.info(f"Token OAuth valido da {token_file} (scade {creds.expiry.isoformat() if creds.expiry else '?'}Z)")
+
+    return creds
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Script: Vendor Discovery Document
+Scopo: Rigenera execution/youtube_discovery.json, il documento di discovery della YouTube Data API
+       ridotto ai soli metodi usati dagli script (channels.list, playlistItems.list, videos.list)
+Input: documento incluso in google-api-python-client (nessuna rete) oppure, con --download,
+       quello pubblicato da Google
+Output: execution/youtube_discovery.json
+Direttiva di riferimento: directives/fetch_youtube_videos.md
+
+Il documento completo (~390 KB, ~80 schemi) costa ~9 ms di parsing a ogni avvio e,
+con versioni vecchie della libreria, una richiesta di rete. La versione ridotta (~15 KB)
+si costruisce in <1 ms con build_from_document. Gli schemi delle risposte servono solo
+per le docstring generate: restano come stub.
+
+Uso:
+    python execution/vendor_discovery.py [--download]
+"""
+
+import os
+import sys
+import json
+import logging
+
+# Configurazione
+OUTPUT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'youtube_discovery.json')
+DISCOVERY_URL = 'https://www.googleapis.com/discovery/v1/apis/youtube/v3/rest'
+USED_METHODS = {
+    'channels': ['list'],
+    'playlistItems': ['list'],
+    'videos': ['list'],
+}
+
+logger = logging.getLogger(__name__)
+
+def bundled_document():
+    """Documento di discovery incluso in google-api-python-client (static_discovery)"""
+    import googleapiclient.discovery_cache
+
+    path = os.path.join(os.path.dirname(googleapiclient.discovery_cache.__file__), 'documents', 'youtube.v3.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def downloaded_document():
+    """Documento di discovery pubblicato da Google"""
+    import requests
+
+    response = requests.get(DISCOVERY_URL, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+def trim_document(document, used_methods=USED_METHODS):
+    """
+    Tiene solo le risorse/metodi usati; gli schemi delle loro risposte diventano stub
+
+    Returns:
+        dict: documento ridotto, utilizzabile con build_from_document
+    """
+    trimmed = {key: value for key, value in document.items() if key not in ('resources', 'schemas')}
+    trimmed['resources'] = {}
+    schemas = {}
+
+    for resource, methods in sorted(used_methods.items()):
+        trimmed['resources'][resource] = {'methods': {}}
+        for name in methods:
+            method = document['resources'][resource]['methods'][name]
+            trimmed['resources'][resource]['methods'][name] = method
+            ref = method.get('response', {}).get('$ref')
+            if ref:
+                schemas[ref] = {
+                    'id': ref,
+                    'type': 'object',
+                    'description': document['schemas'][ref].get('description', '')
+                }
+
+    trimmed['schemas'] = schemas
+    return trimmed
+
+def main():
+    """Funzione principale"""
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+    source = 'download' if '--download' in sys.argv[1:] else 'libreria'
+    document = downloaded_document() if source == 'download' else bundled_document()
+    trimmed = trim_document(document)
+
+    temp_file = f"{OUTPUT_FILE}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(trimmed, f, indent=1, ensure_ascii=False, sort_keys=True)
+        f.write('\n')
+    os.replace(temp_file, OUTPUT_FILE)
+
+    methods = sum(len(m) for m in USED_METHODS.values())
+    logger.info(f"Documento di discovery ({source}, revisione {trimmed.get('revision')}): "
+                f"{methods} metodi → {OUTPUT_FILE} ({os.path.getsize(OUTPUT_FILE) / 1024:.1f} KB)")
+
+if __name__ == '__main__':
+    main()
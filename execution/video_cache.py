@@ -0,0 +1,605 @@
+#!/usr/bin/env python3
+"""
+Modulo: Video Cache (scrittura deterministica)
+Scopo: Salvare data/videos_cache.json in forma canonica, con hash del contenuto,
+       saltando scrittura/copia/timestamp se i dati non sono cambiati
+       Ogni scrittura effettiva incrementa archive_version e registra nel changelog
+       gli ID aggiunti/modificati/rimossi (base per i delta ai client)
+       I sync incrementali non riscrivono lo snapshot: accodano i cambiamenti a un journal
+       (videos_cache.journal.jsonl) che i lettori riapplicano e che viene compattato
+       periodicamente in un nuovo snapshot
+Usato da: execution/fetch_all_videos.py, execution/refresh_cache.py, execution/generate_static_json.py,
+          execution/build_artifacts.py
+Direttiva di riferimento: directives/cache_strategy.md
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+from itertools import compress, count
+from operator import itemgetter
+from datetime import datetime, timedelta
+
+# Configurazione
+CACHE_FILE = 'data/videos_cache.json'
+FRONTEND_CACHE_FILE = 'frontend/public/data/videos_cache.json'
+CHANGELOG_FILE_NAME = 'archive_changelog.json'  # Accanto alla cache (data/)
+MAX_CHANGELOG_VERSIONS = 30  # Versioni conservate → delta disponibili per client fino a 30 versioni indietro
+JOURNAL_SUFFIX = '.journal.jsonl'  # data/videos_cache.json → data/videos_cache.journal.jsonl
+
+# Compattazione del journal nello snapshot (basta una soglia superata)
+JOURNAL_MAX_ENTRIES = 20
+JOURNAL_MAX_BYTES = 256 * 1024
+JOURNAL_MAX_AGE_DAYS = 7
+
+logger = logging.getLogger(__name__)
+
+def video_sort_key(video):
+    """Chiave dell'ordine canonico (applicata in ordine decrescente)"""
+    return (video['published_at'], video['id'])
+
+def sort_videos(videos):
+    """Ordine canonico: data decrescente, poi ID (tie-break deterministico)"""
+    return sorted(videos, key=video_sort_key, reverse=True)
+
+def is_sorted(videos):
+    """True se la lista è già in ordine canonico (controllo O(n))"""
+    return all(video_sort_key(a) >= video_sort_key(b) for a, b in zip(videos, videos[1:]))
+
+def compute_content_hash(videos):
+    """
+    Hash SHA-256 della serializzazione canonica dei video
+    (chiavi ordinate, separatori compatti, UTF-8)
+    """
+    payload = json.dumps(videos, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return 'sha256:' + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def read_cache(path=CACHE_FILE):
+    """Cache su disco: snapshot + journal riapplicato (None se assente o illeggibile)"""
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except Exception as e:
+        logger.warning(f"Impossibile leggere {path}: {e}")
+        return None
+
+    return replay_journal(cache, read_journal(path))
+
+def cache_content_hash(cache):
+    """Hash del contenuto di una cache già caricata (None se cache è None)"""
+    if cache is None:
+        return None
+    # Cache scritte prima dell'introduzione dell'hash: calcolalo al volo
+    return cache.get('content_hash') or compute_content_hash(cache['videos'])
+
+def read_content_hash(path=CACHE_FILE):
+    """Hash del contenuto della cache su disco (None se assente o illeggibile)"""
+    return cache_content_hash(read_cache(path))
+
+def diff_videos(old_videos, new_videos):
+    """
+    Differenze per ID tra due liste di video
+
+    Returns:
+        tuple: (added_ids, updated_ids, removed_ids) nell'ordine di new_videos / ordinati
+    """
+    old_by_id = {v['id']: v for v in old_videos}
+    new_ids = set()
+    added = []
+    updated = []
+
+    for v in new_videos:
+        new_ids.add(v['id'])
+        old = old_by_id.get(v['id'])
+        if old is None:
+            added.append(v['id'])
+        elif old != v:
+            updated.append(v['id'])
+
+    removed = sorted(video_id for video_id in old_by_id if video_id not in new_ids)
+    return added, updated, removed
+
+def _insertion_point(videos_sorted, key):
+    """Ricerca binaria: prima posizione con chiave <= key in una lista decrescente"""
+    lo, hi = 0, len(videos_sorted)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if video_sort_key(videos_sorted[mid]) > key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+def _event_id(event):
+    return event['id'] if event['op'] == 'delete' else event['video']['id']
+
+def merge_changes(videos_sorted, events):
+    """
+    Applica eventi per ID a una lista già in ordine canonico, senza riordinarla
+
+    Ogni record toccato si trova con ricerca binaria sulla chiave (data, ID) dell'evento;
+    solo gli ID non trovati così (data cambiata, delete senza data) costano una passata
+    sugli ID. I k record nuovi o spostati vengono ordinati e inseriti nella posizione
+    trovata con ricerca binaria; la lista risultante si compone copiando a blocchi (slice)
+    i tratti invariati: O(k log n + n) con la sola copia dei puntatori come termine lineare.
+
+    Args:
+        videos_sorted: lista in ordine canonico (sort_videos)
+        events: iterabile di dict (per lo stesso ID vale l'ultimo evento):
+            {'op': 'insert', 'video': {...}}  video nuovo (se esiste già con la stessa data
+                                              diventa un update; nessuna passata sugli ID)
+            {'op': 'upsert', 'video': {...}}  inserisce o aggiorna
+            {'op': 'delete', 'id': ..., 'published_at': ... (opzionale, evita la passata)}
+
+    Returns:
+        tuple: (merged: list in ordine canonico,
+                changes: dict con added, updated, removed = ID effettivamente cambiati)
+    """
+    pending = {_event_id(event): event for event in events}
+
+    # Posizioni dei record esistenti toccati dagli eventi (indice → ID)
+    positions = {}
+    unresolved = set()
+    for video_id, event in pending.items():
+        published_at = event.get('published_at') if event['op'] == 'delete' else event['video']['published_at']
+        if published_at is not None:
+            i = _insertion_point(videos_sorted, (published_at, video_id))
+            if i < len(videos_sorted) and videos_sorted[i]['id'] == video_id:
+                positions[i] = video_id
+                continue
+        if event['op'] != 'insert':
+            unresolved.add(video_id)
+
+    if unresolved:
+        # Passata sugli ID (iterazione in C); map è lazy: discard evita le occorrenze duplicate
+        matches = compress(count(), map(unresolved.__contains__, map(itemgetter('id'), videos_sorted)))
+        for i in matches:
+            video_id = videos_sorted[i]['id']
+            unresolved.discard(video_id)
+            positions[i] = video_id
+            if not unresolved:
+                break
+
+    ops = []  # (posizione nella lista originale, 0 = inserisci prima / 1 = sostituisci, seq, record)
+    moved = []  # Record nuovi o con chiave di ordinamento cambiata
+    added, updated, removed = [], [], []
+
+    for i in sorted(positions):
+        video = videos_sorted[i]
+        event = pending.pop(positions[i])
+        new = None if event['op'] == 'delete' else event['video']
+        if new == video:
+            continue
+
+        if new is None:
+            removed.append(video['id'])
+            ops.append((i, 1, len(ops), None))
+        else:
+            updated.append(video['id'])
+            if video_sort_key(new) == video_sort_key(video):
+                ops.append((i, 1, len(ops), new))
+            else:
+                ops.append((i, 1, len(ops), None))
+                moved.append(new)
+
+    # Eventi rimasti: ID non presenti → nuovi (i delete di ID sconosciuti si ignorano)
+    for video_id, event in pending.items():
+        if event['op'] != 'delete':
+            added.append(video_id)
+            moved.append(event['video'])
+
+    for video in sorted(moved, key=video_sort_key, reverse=True):
+        ops.append((_insertion_point(videos_sorted, video_sort_key(video)), 0, len(ops), video))
+
+    merged = []
+    start = 0
+    for position, kind, _, record in sorted(ops, key=lambda op: op[:3]):
+        merged.extend(videos_sorted[start:position])
+        if record is not None:
+            merged.append(record)
+        start = position if kind == 0 else position + 1
+    merged.extend(videos_sorted[start:])
+
+    return merged, {'added': added, 'updated': updated, 'removed': removed}
+
+def changelog_path(cache_file=CACHE_FILE):
+    """Il changelog vive accanto alla cache"""
+    return os.path.join(os.path.dirname(cache_file), CHANGELOG_FILE_NAME)
+
+def read_changelog(cache_file=CACHE_FILE):
+    """Voci del changelog (lista ordinata per versione, vuota se assente)"""
+    path = changelog_path(cache_file)
+    if not os.path.exists(path):
+        return []
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('versions', [])
+    except Exception as e:
+        logger.warning(f"Changelog illeggibile, lo ignoro: {e}")
+        return []
+
+def append_changelog(cache_file, entry):
+    """Aggiunge una voce al changelog mantenendo solo le ultime MAX_CHANGELOG_VERSIONS"""
+    versions = read_changelog(cache_file) + [entry]
+    versions = versions[-MAX_CHANGELOG_VERSIONS:]
+
+    path = changelog_path(cache_file)
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump({'versions': versions}, f, indent=2, ensure_ascii=False)
+    os.replace(temp_file, path)
+
+def journal_path(cache_file=CACHE_FILE):
+    """Il journal vive accanto allo snapshot: videos_cache.json → videos_cache.journal.jsonl"""
+    return os.path.splitext(cache_file)[0] + JOURNAL_SUFFIX
+
+def read_journal(cache_file=CACHE_FILE):
+    """
+    Voci del journal in ordine di versione (lista vuota se assente)
+
+    Una riga finale incompleta (scrittura interrotta) viene ignorata:
+    la voce non è mai stata confermata.
+    """
+    path = journal_path(cache_file)
+    if not os.path.exists(path):
+        return []
+
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                logger.warning(f"Journal: ultima riga incompleta ignorata ({path})")
+                break
+            entries.append(json.loads(line))
+    return entries
+
+def append_journal(cache_file, entry):
+    """
+    Accoda una voce al journal (una riga JSON, fsync prima di ritornare)
+    Se l'ultima riga è rimasta incompleta per un crash, viene scartata prima di accodare
+    """
+    path = journal_path(cache_file)
+    line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+    with open(path, 'ab+') as f:
+        f.seek(0)
+        data = f.read()
+        valid_size = data.rfind(b'\n') + 1
+        if valid_size != len(data):
+            f.truncate(valid_size)
+
+        f.write(line.encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+
+def replay_journal(cache, entries):
+    """
+    Riapplica allo snapshot le voci del journal successive alla sua archive_version
+
+    Returns:
+        dict: cache aggiornata (stesso formato dello snapshot)
+    """
+    base_version = cache.get('archive_version', 0)
+    entries = [e for e in entries if e['version'] > base_version]
+    if not entries:
+        return cache
+
+    videos = cache['videos']
+    if not is_sorted(videos):
+        videos = sort_videos(videos)
+
+    applied = None
+    version = base_version
+    for entry in entries:
+        if entry['version'] != version + 1:
+            logger.warning(f"Journal: versione {entry['version']} fuori sequenza, replay interrotto")
+            break
+        videos, _ = merge_changes(videos, entry['events'])
+        applied = entry
+        version = entry['version']
+
+    if applied is None:
+        return cache
+
+    return _cache_data(videos, applied['version'], applied['content_hash'], applied['created_at'])
+
+def journal_needs_compaction(cache_file=CACHE_FILE):
+    """True se il journal supera una delle soglie (voci, dimensione, età della voce più vecchia)"""
+    path = journal_path(cache_file)
+    if not os.path.exists(path):
+        return False
+
+    entries = read_journal(cache_file)
+    if not entries:
+        return False
+
+    oldest = datetime.fromisoformat(entries[0]['created_at'].rstrip('Z'))
+    return (
+        len(entries) >= JOURNAL_MAX_ENTRIES
+        or os.path.getsize(path) >= JOURNAL_MAX_BYTES
+        or datetime.utcnow() - oldest >= timedelta(days=JOURNAL_MAX_AGE_DAYS)
+    )
+
+def compact_cache(cache_file=CACHE_FILE, cache=None):
+    """
+    Assorbe il journal in un nuovo snapshot (scrittura atomica) e lo rimuove
+
+    Args:
+        cache: cache già letta con read_cache (evita di rileggere snapshot e journal)
+
+    Returns:
+        bool: True se c'era un journal da compattare
+    """
+    if not os.path.exists(journal_path(cache_file)):
+        return False
+
+    cache = cache or read_cache(cache_file)
+    _write_snapshot(cache, cache_file)
+    logger.info(f"Journal compattato in {cache_file} (versione {cache.get('archive_version', 0)})")
+    return True
+
+def compute_stats(videos):
+    """
+    Statistiche della cache
+
+    Returns:
+        tuple: (total_hours: float, first_video_date: str|None, last_video_date: str|None)
+    """
+    total_hours = sum(v['duration_seconds'] for v in videos) / 3600
+
+    if videos:
+        first_video_date = min(v['published_at'] for v in videos)
+        last_video_date = max(v['published_at'] for v in videos)
+    else:
+        first_video_date = None
+        last_video_date = None
+
+    return total_hours, first_video_date, last_video_date
+
+def _cache_data(videos_sorted, archive_version, content_hash, last_updated):
+    """Struttura di videos_cache.json"""
+    total_hours, _, _ = compute_stats(videos_sorted)
+    return {
+        'last_updated': last_updated,
+        'archive_version': archive_version,
+        'total_videos': len(videos_sorted),
+        'total_hours': int(total_hours),
+        'content_hash': content_hash,
+        'videos': videos_sorted
+    }
+
+def _write_snapshot(cache_data, output_file):
+    """
+    Scrittura atomica dello snapshot (file temporaneo + rename)
+    Lo snapshot contiene già tutte le versioni del journal, che quindi viene rimosso;
+    un crash tra i due passi è innocuo (le voci ≤ archive_version vengono ignorate)
+    """
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    temp_file = f"{output_file}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(cache_data, f, indent=2, ensure_ascii=False)
+    os.replace(temp_file, output_file)
+
+    journal = journal_path(output_file)
+    if os.path.exists(journal):
+        os.remove(journal)
+
+def _write_cache_file(videos_sorted, content_hash, old_cache, changes, output_file,
+                      frontend_file=None, backup=False):
+    """Scrittura atomica di una nuova versione della cache + voce di changelog + copia frontend"""
+    # Crea backup prima di sovrascrivere
+    if backup and os.path.exists(output_file):
+        backup_file = f"{output_file}.backup"
+        try:
+            shutil.copyfile(output_file, backup_file)
+            logger.info(f"Backup creato: {backup_file}")
+        except Exception as e:
+            logger.warning(f"Impossibile creare backup: {e}")
+
+    # Versione monotona: +1 a ogni cambiamento reale del contenuto
+    archive_version = (old_cache.get('archive_version', 0) if old_cache else 0) + 1
+
+    cache_data = _cache_data(
+        videos_sorted, archive_version, content_hash,
+        last_updated=datetime.utcnow().isoformat() + 'Z'
+    )
+
+    _write_snapshot(cache_data, output_file)
+
+    logger.info(f"Cache salvata in: {output_file} (versione {archive_version})")
+    logger.info(f"Dimensione file: {os.path.getsize(output_file) / 1024:.1f} KB")
+
+    append_changelog(output_file, {
+        'version': archive_version,
+        'content_hash': content_hash,
+        'created_at': cache_data['last_updated'],
+        **changes
+    })
+    logger.info(
+        f"Changelog v{archive_version}: +{len(changes['added'])} "
+        f"~{len(changes['updated'])} -{len(changes['removed'])}"
+    )
+
+    # Copia anche nella cartella public del frontend (servito direttamente da Vercel)
+    if frontend_file:
+        os.makedirs(os.path.dirname(frontend_file), exist_ok=True)
+        shutil.copy2(output_file, frontend_file)
+        logger.info(f"Cache copiata in: {frontend_file}")
+
+    return cache_data
+
+def write_cache(videos, output_file=CACHE_FILE, frontend_file=None, backup=False):
+    """
+    Salva la cache in forma canonica (scrittura atomica)
+
+    Se l'hash dei video coincide con quello su disco non scrive nulla:
+    niente nuovo last_updated, niente copia nel frontend, nessun diff git.
+
+    Args:
+        frontend_file: se indicato, copia la cache anche qui (servita da Vercel)
+        backup: se True, crea {output_file}.backup prima di sovrascrivere
+
+    Returns:
+        tuple: (written: bool, videos_sorted: list)
+    """
+    written, cache_data = write_cache_data(videos, output_file, frontend_file, backup)
+    return written, cache_data['videos']
+
+def write_cache_data(videos, output_file=CACHE_FILE, frontend_file=None, backup=False):
+    """
+    Come write_cache, ma restituisce la cache completa (versione, hash, last_updated, video)
+    senza rileggerla: quella appena scritta, oppure quella su disco se invariata
+
+    Returns:
+        tuple: (written: bool, cache: dict)
+    """
+    videos_sorted = sort_videos(videos)
+    content_hash = compute_content_hash(videos_sorted)
+    old_cache = read_cache(output_file)
+
+    if content_hash == cache_content_hash(old_cache):
+        logger.info(f"Contenuto invariato ({content_hash[:19]}…): cache non riscritta")
+
+        # Il journal resta tale finché non supera le soglie: contenuto invariato non vuol dire
+        # riscrivere lo snapshot (build_artifacts passa di qui dopo ogni refresh)
+        missing_copy = frontend_file and read_content_hash(frontend_file) != content_hash
+        if missing_copy or journal_needs_compaction(output_file):
+            # Snapshot indietro rispetto al journal: compattalo prima di copiarlo
+            compact_cache(output_file, old_cache)
+
+        # La copia frontend manca (es. primo deploy): ripristinala senza toccare la cache
+        if missing_copy:
+            os.makedirs(os.path.dirname(frontend_file), exist_ok=True)
+            shutil.copy2(output_file, frontend_file)
+            logger.info(f"Cache copiata in: {frontend_file}")
+
+        return False, old_cache
+
+    old_videos = old_cache['videos'] if old_cache else []
+    added, updated, removed = diff_videos(old_videos, videos_sorted)
+    cache_data = _write_cache_file(
+        videos_sorted, content_hash, old_cache,
+        {'added': added, 'updated': updated, 'removed': removed},
+        output_file, frontend_file, backup
+    )
+
+    return True, cache_data
+
+def apply_cache_changes(events, output_file=CACHE_FILE):
+    """
+    Applica eventi insert/update/delete alla cache su disco con merge_changes
+
+    Lo snapshot non viene riscritto: la nuova versione diventa una riga del journal
+    con i soli eventi che hanno cambiato qualcosa (I/O proporzionale ai cambiamenti,
+    lo snapshot resta integro anche con un crash a metà scrittura). Superata una
+    soglia del journal, lo snapshot viene compattato.
+
+    Returns:
+        tuple: (written: bool, changes: dict con added, updated, removed)
+               oppure None se la cache non esiste (serve un export completo)
+    """
+    old_cache = read_cache(output_file)
+    if old_cache is None:
+        return None
+
+    # Cache scritte prima dell'ordine canonico: riordina una volta
+    old_videos = old_cache['videos']
+    if not is_sorted(old_videos):
+        old_videos = sort_videos(old_videos)
+
+    events = list(events)
+    merged, changes = merge_changes(old_videos, events)
+    if not any(changes.values()):
+        logger.info("Nessun evento ha modificato la cache: non riscritta")
+        return False, changes
+
+    # Nel journal solo gli eventi effettivi (per lo stesso ID vale l'ultimo)
+    last_events = {_event_id(event): event for event in events}
+    changed_ids = changes['added'] + changes['updated'] + changes['removed']
+
+    cache_data = _cache_data(
+        merged,
+        archive_version=old_cache.get('archive_version', 0) + 1,
+        content_hash=compute_content_hash(merged),
+        last_updated=datetime.utcnow().isoformat() + 'Z'
+    )
+    append_journal(output_file, {
+        'version': cache_data['archive_version'],
+        'created_at': cache_data['last_updated'],
+        'content_hash': cache_data['content_hash'],
+        'events': [last_events[video_id] for video_id in changed_ids]
+    })
+    logger.info(f"Journal: versione {cache_data['archive_version']} accodata a {journal_path(output_file)}")
+
+    append_changelog(output_file, {
+        'version': cache_data['archive_version'],
+        'content_hash': cache_data['content_hash'],
+        'created_at': cache_data['last_updated'],
+        **changes
+    })
+    logger.info(
+        f"Changelog v{cache_data['archive_version']}: +{len(changes['added'])} "
+        f"~{len(changes['updated'])} -{len(changes['removed'])}"
+    )
+
+    if journal_needs_compaction(output_file):
+        _write_snapshot(cache_data, output_file)
+        logger.info(f"Journal compattato in {output_file} (versione {cache_data['archive_version']})")
+
+    return True, changes
+
+def build_delta(changelog, from_version, current_cache):
+    """
+    Delta dalla versione from_version alla versione corrente
+
+    Compone le voci del changelog successive a from_version: per ogni ID toccato
+    conta se esisteva alla versione di partenza e se esiste ora.
+
+    Returns:
+        dict oppure None se il changelog non copre from_version
+    """
+    current_version = current_cache.get('archive_version', 0)
+    entries = [e for e in changelog if from_version < e['version'] <= current_version]
+
+    # Serve una catena completa from_version+1 … current_version
+    if [e['version'] for e in entries] != list(range(from_version + 1, current_version + 1)):
+        return None
+
+    existed_at_start = {}
+    for entry in entries:
+        for video_id in entry['added']:
+            existed_at_start.setdefault(video_id, False)
+        for video_id in entry['updated'] + entry['removed']:
+            existed_at_start.setdefault(video_id, True)
+
+    current_by_id = {v['id']: v for v in current_cache['videos']}
+    adds, updates, removes = [], [], []
+
+    for video_id in sorted(existed_at_start):
+        existed = existed_at_start[video_id]
+        video = current_by_id.get(video_id)
+        if video is not None:
+            (updates if existed else adds).append(video)
+        elif existed:
+            removes.append(video_id)
+
+    return {
+        'from_version': from_version,
+        'to_version': current_version,
+        'content_hash': cache_content_hash(current_cache),
+        'last_updated': current_cache['last_updated'],
+        'total_videos': current_cache['total_videos'],
+        'total_hours': current_cache.get('total_hours'),
+        'adds': sort_videos(adds),
+        'updates': sort_videos(updates),
+        'removes': removes
+    }
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Modulo: YouTube API (helper condivisi)
+Scopo: Funzioni di supporto per le richieste alla YouTube Data API usate dagli script di sync
+Usato da: execution/fetch_all_videos.py, execution/refresh_cache.py
+Persistenza (ETag, dettagli): execution/archive_store.py
+Quota e budget: execution/youtube_quota.py
+Direttiva di riferimento: directives/fetch_youtube_videos.md
+
+Lo stack del client (discovery, httplib2, google-auth) si importa solo quando serve:
+gli script che escono prima di chiamare l'API non ne pagano il costo di avvio.
+"""
+
+import os
+import math
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from googleapiclient.errors import HttpError
+from youtube_quota import PRIORITY_LOW, QuotaExceeded
+
+# Configurazione
+ETAG_CACHE_MAX_AGE_DAYS = 30  # Entry non più usate da 30 giorni vengono eliminate
+DETAILS_BATCH_SIZE = 50  # Massimo ID per chiamata videos.list
+DETAILS_MAX_WORKERS = int(os.getenv('YOUTUBE_DETAILS_WORKERS', '4'))
+DETAILS_PARTS = 'contentDetails,liveStreamingDetails'
+DETAILS_CACHE_MAX_AGE_DAYS = int(os.getenv('YOUTUBE_DETAILS_MAX_AGE_DAYS', '0'))  # 0 = mai scadute
+DETAILS_STALE_IDS = os.getenv('YOUTUBE_DETAILS_STALE_IDS', '')  # ID da riscaricare, separati da virgola
+API_BASE_URL = os.getenv('YOUTUBE_API_BASE_URL', '')  # Es. http://127.0.0.1:8765 (fake_youtube_api.py)
+DISCOVERY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'youtube_discovery.json')  # vendor_discovery.py
+RETRY_ATTEMPTS = int(os.getenv('YOUTUBE_API_RETRIES', '3'))  # Retry dopo il primo tentativo
+RETRY_BASE_DELAY = float(os.getenv('YOUTUBE_API_RETRY_DELAY', '2'))  # Secondi: ~2, 4, 8 con jitter
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RETRYABLE_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded', 'backendError'}  # 403 temporanei
+
+logger = logging.getLogger(__name__)
+
+def is_retryable(error):
+    """True per errori temporanei: 429, 5xx, 403 di rate limit, timeout e connessioni cadute"""
+    if isinstance(error, HttpError):
+        if error.resp.status in RETRYABLE_STATUSES:
+            return True
+        details = error.error_details if isinstance(error.error_details, list) else []
+        return error.resp.status == 403 and any(
+            isinstance(d, dict) and d.get('reason') in RETRYABLE_REASONS for d in details
+        )
+
+    import httplib2
+
+    return isinstance(error, (TimeoutError, ConnectionError, httplib2.ServerNotFoundError))
+
+def execute_request(request, http=None, retries=RETRY_ATTEMPTS):
+    """
+    Esegue una richiesta googleapiclient con retry e backoff esponenziale con jitter
+    (attesa tra metà e tutto RETRY_BASE_DELAY × 2^n) sugli errori temporanei
+
+    Ogni tentativo passa dal governor quota (se presente) e viene addebitato.
+    Errori non temporanei (404, 403 quotaExceeded…) e QuotaExceeded escono subito.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return request.execute(http=http) if http is not None else request.execute()
+        except Exception as e:
+            if attempt == retries or not is_retryable(e):
+                raise
+            delay = RETRY_BASE_DELAY * 2 ** attempt
+            delay = delay / 2 + random.uniform(0, delay / 2)
+            status = e.resp.status if isinstance(e, HttpError) else type(e).__name__
+            logger.warning(f"Errore temporaneo ({status}) su {getattr(request, 'methodId', 'richiesta API')}. "
+                           f"Retry {attempt + 1}/{retries} tra {delay:.1f} secondi...")
+            time.sleep(delay)
+
+class EtagCache:
+    """
+    ETag per richieste condizionali (If-None-Match), persistiti nello store SQLite
+
+    Ogni richiesta è identificata dal suo URI completo (endpoint + parametri).
+    Se la risposta è 304 Not Modified si riusa il body salvato,
+    senza riscaricare la pagina.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+
+    def execute(self, request):
+        """
+        Esegue una richiesta googleapiclient in modo condizionale
+
+        Returns:
+            dict: body della risposta (nuovo o riusato dallo store in caso di 304)
+        """
+        key = request.uri
+        entry = self.store.get_etag(key)
+
+        if entry:
+            request.headers['If-None-Match'] = entry['etag']
+
+        try:
+            response = execute_request(request)
+        except HttpError as e:
+            if e.resp.status == 304 and entry:
+                self.hits += 1
+                self.store.touch_etag(key)
+                return entry['body']
+            raise
+
+        self.misses += 1
+        etag = response.get('etag')
+        if etag:
+            self.store.put_etag(key, etag, response)
+
+        return response
+
+    def save(self):
+        """Conferma le modifiche nello store, eliminando le entry non usate da ETAG_CACHE_MAX_AGE_DAYS"""
+        cutoff = (datetime.utcnow() - timedelta(days=ETAG_CACHE_MAX_AGE_DAYS)).isoformat() + 'Z'
+
+        try:
+            self.store.prune_etags(cutoff)
+            self.store.commit()
+        except Exception as e:
+            logger.warning(f"Impossibile salvare ETag cache: {e}")
+
+    def log_stats(self):
+        """Logga hit/miss delle richieste condizionali"""
+        total = self.hits + self.misses
+        logger.info(f"ETag cache: {self.hits} hit (304), {self.misses} miss su {total} richieste")
+
+def build_service(credentials=None, base_url=None, governor=None):
+    """
+    Servizio YouTube API dal documento di discovery vendorizzato (DISCOVERY_FILE):
+    nessuna richiesta di rete e parsing dei soli metodi usati
+
+    Args:
+        credentials: credenziali OAuth (API reale)
+        base_url: server locale senza autenticazione (es. execution/fake_youtube_api.py)
+        governor: QuotaGovernor che addebita ogni richiesta prima che parta
+    """
+    from googleapiclient.discovery import build_from_document
+
+    with open(DISCOVERY_FILE, 'r', encoding='utf-8') as f:
+        document = f.read()
+
+    options = {'requestBuilder': governor.request_builder()} if governor else {}
+    if base_url:
+        options['developerKey'] = 'local'
+        options['client_options'] = {'api_endpoint': base_url.rstrip('/') + '/'}  # I path includono già youtube/v3/
+    else:
+        options['credentials'] = credentials
+
+    return build_from_document(document, **options)
+
+def build_local_service(base_url=API_BASE_URL, governor=None):
+    """
+    Servizio YouTube API verso un server locale (es. execution/fake_youtube_api.py)
+    Stesso documento di discovery dell'API reale, ma nessuna autenticazione OAuth
+    Con governor ogni richiesta viene addebitata come sull'API reale
+    """
+    return build_service(base_url=base_url, governor=governor)
+
+def estimate_full_sync_units(store, checkpoint=None):
+    """
+    Stima delle unità di un sync completo (escluso channels.list) dai contatori dello store:
+    1 unità per pagina di playlist + 1 per batch di dettagli non ancora nello store
+    Con un checkpoint ripreso si contano solo le pagine e i dettagli mancanti
+    """
+    known_details = store.count_details()
+    uploads = max(store.count_videos(), known_details)
+    pages = max(1, math.ceil(uploads / DETAILS_BATCH_SIZE))
+    if checkpoint:
+        pages = 0 if checkpoint.playlist_complete else max(1, pages - len(checkpoint.pages))
+        known_details = max(known_details, len(checkpoint.details))
+    unknown_batches = math.ceil(max(0, uploads - known_details) / DETAILS_BATCH_SIZE)
+    return pages + unknown_batches
+
+def _worker_http_factory(youtube):
+    """
+    Ritorna una funzione che crea un client HTTP autenticato per worker
+
+    httplib2.Http non è thread-safe: ogni worker deve avere il suo client.
+    Senza credenziali (API locale) ogni worker ha un httplib2.Http semplice.
+    Se il servizio usa un client finto (es. HttpMock nei test) ritorna None
+    e si usa il client del servizio in modo sequenziale.
+    """
+    import httplib2
+    from googleapiclient.http import build_http
+
+    # httplib2.Http semplice (ha un attributo credentials suo, per l'auth HTTP di base)
+    if isinstance(youtube._http, httplib2.Http):
+        return build_http
+
+    credentials = getattr(youtube._http, 'credentials', None)
+    if credentials is None:
+        return None
+
+    from google_auth_httplib2 import AuthorizedHttp
+
+    def factory():
+        return AuthorizedHttp(credentials, http=build_http())
+
+    return factory
+
+def stream_video_details(youtube, batches, key=None, max_workers=DETAILS_MAX_WORKERS):
+    """
+    Stage di streaming per videos.list: consuma batch da un iterabile
+    (anche un generatore di pagine) e produce i dettagli man mano
+
+    Ogni batch (max 50 elementi) viene inviato subito a un worker, mentre il
+    chiamante continua a consumare l'iterabile in ingresso (es. paginazione).
+    Al massimo 2 × max_workers batch restano in volo: la memoria resta limitata.
+    Ogni worker usa il proprio client HTTP. I risultati escono nell'ordine dei
+    batch in ingresso, indipendentemente dall'ordine di completamento.
+
+    Args:
+        batches: iterabile di liste (ID video, o dict se si passa key)
+        key: funzione opzionale che estrae l'ID video da ogni elemento
+
+    Yields:
+        tuple: (batch, details: list, failure: dict con batch, ids, status,
+                error oppure None)
+    """
+    http_factory = _worker_http_factory(youtube)
+    max_workers = max(1, max_workers)
+    max_in_flight = 2 * max_workers
+
+    local = threading.local()
+
+    def fetch_batch(batch_num, ids):
+        logger.info(f"Batch {batch_num}: Fetching {len(ids)} video")
+
+        request = youtube.videos().list(
+            part=DETAILS_PARTS,
+            id=','.join(ids)
+        )
+
+        if http_factory is None:
+            response = execute_request(request)
+        else:
+            if not hasattr(local, 'http'):
+                local.http = http_factory()
+            response = execute_request(request, http=local.http)
+
+        return response.get('items', [])
+
+    def submit(executor, batch_num, ids):
+        if http_factory is not None:
+            return executor.submit(fetch_batch, batch_num, ids)
+
+        # Client HTTP condiviso (non thread-safe): esecuzione inline
+        future = Future()
+        try:
+            future.set_result(fetch_batch(batch_num, ids))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def collect(batch_num, batch, ids, future):
+        try:
+            return batch, future.result(), None
+        except QuotaExceeded:
+            # Budget esaurito: non è un batch fallito, il run si ferma
+            raise
+        except Exception as e:
+            is_http_error = isinstance(e, HttpError)
+            logger.error(f"Errore durante recupero video details (batch {batch_num}): {e}")
+            return batch, [], {
+                'batch': batch_num,
+                'ids': ids,
+                'status': e.resp.status if is_http_error else None,
+                'error': e.reason if is_http_error else str(e)
+            }
+
+    def split(batches):
+        # Garantisce al massimo DETAILS_BATCH_SIZE elementi per chiamata
+        for batch in batches:
+            for i in range(0, len(batch), DETAILS_BATCH_SIZE):
+                yield batch[i:i + DETAILS_BATCH_SIZE]
+
+    pending = deque()
+    batch_num = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for batch in split(batches):
+            if not batch:
+                continue
+            batch_num += 1
+            ids = [key(item) for item in batch] if key else list(batch)
+            pending.append((batch_num, batch, ids, submit(executor, batch_num, ids)))
+
+            # Backpressure: restituisci il batch più vecchio prima di accodarne altri
+            while len(pending) >= max_in_flight:
+                yield collect(*pending.popleft())
+
+        while pending:
+            yield collect(*pending.popleft())
+
+def fetch_video_details(youtube, video_ids, max_workers=DETAILS_MAX_WORKERS):
+    """
+    Recupera i dettagli video (videos.list) a batch di 50 ID, in parallelo
+
+    Gli errori temporanei vengono ritentati (execute_request); un batch fallito
+    anche dopo i retry viene loggato e saltato, senza fermare gli altri.
+    L'ordine dell'output segue quello di video_ids.
+
+    Returns:
+        tuple: (details: list, failed_batches: list di dict con
+                batch, ids, status, error)
+    """
+    all_details = []
+    failed_batches = []
+
+    for _, details, failure in stream_video_details(youtube, [video_ids], max_workers=max_workers):
+        all_details.extend(details)
+        if failure:
+            failed_batches.append(failure)
+
+    return all_details, failed_batches
+
+def log_failed_batches(failed_batches):
+    """Logga un riepilogo strutturato dei batch videos.list falliti"""
+    if not failed_batches:
+        return
+
+    failed_ids = sum(len(b['ids']) for b in failed_batches)
+    logger.warning(f"Batch falliti: {len(failed_batches)} ({failed_ids} video senza dettagli)")
+    for b in failed_batches:
+        logger.warning(
+            f"  - batch {b['batch']}: status={b['status']}, "
+            f"{len(b['ids'])} ID (primo: {b['ids'][0]}), errore: {b['error']}"
+        )
+
+class DetailsCache:
+    """
+    Dettagli video (videos.list) persistiti nello store SQLite, chiave = ID video
+
+    Per ogni video lo store salva le parti scaricate, la data del fetch e la
+    classificazione live/non-live. Un live concluso non cambia più, quindi
+    solo gli ID sconosciuti o "stale" vengono richiesti all'API.
+    Lo store viene letto per batch di ID, senza caricarlo tutto in memoria.
+
+    Un'entry è stale se:
+    - è un live non ancora concluso (manca actualEndTime)
+    - è più vecchia di DETAILS_CACHE_MAX_AGE_DAYS (se > 0)
+    - l'ID è stato marcato esplicitamente (mark_stale / YOUTUBE_DETAILS_STALE_IDS)
+
+    Riscaricare un'entry stale solo per età è lavoro a bassa priorità: con governor,
+    se il budget non lo consente, si usa l'entry dello store e il refresh è rimandato.
+    """
+
+    def __init__(self, store, governor=None):
+        self.store = store
+        self.governor = governor
+        self.stale_ids = {i.strip() for i in DETAILS_STALE_IDS.split(',') if i.strip()}
+        self.hits = 0
+        self.misses = 0
+        self.deferred = 0
+
+    def mark_stale(self, video_ids):
+        """Forza il riscaricamento dei dettagli per questi ID"""
+        self.stale_ids.update(video_ids)
+
+    def is_fresh(self, video_id, entry):
+        """True se l'entry dello store è utilizzabile senza chiamare l'API"""
+        if not entry or video_id in self.stale_ids:
+            return False
+
+        if entry['is_live'] and 'actualEndTime' not in entry['parts'].get('liveStreamingDetails', {}):
+            return False
+
+        if self._is_expired(entry):
+            if self.governor and not self.governor.can_afford(1, PRIORITY_LOW):
+                self.deferred += 1
+                self.governor.defer('refresh di dettagli scaduti')
+                return True
+            return False
+
+        return True
+
+    def _is_expired(self, entry):
+        """True se l'entry è più vecchia di DETAILS_CACHE_MAX_AGE_DAYS (se > 0)"""
+        if DETAILS_CACHE_MAX_AGE_DAYS <= 0:
+            return False
+        cutoff = (datetime.utcnow() - timedelta(days=DETAILS_CACHE_MAX_AGE_DAYS)).isoformat() + 'Z'
+        return entry['fetched_at'] < cutoff
+
+    def fresh_details(self, video_ids):
+        """
+        Dettagli freschi nello store per questi ID, nello stesso formato di un item videos.list
+
+        Returns:
+            dict: ID → item (solo ID con dettagli freschi)
+        """
+        return {
+            video_id: {'id': video_id, **entry['parts']}
+            for video_id, entry in self.store.get_details(video_ids).items()
+            if self.is_fresh(video_id, entry)
+        }
+
+    def put(self, item):
+        """Salva un item videos.list nello store"""
+        parts = {part: item[part] for part in DETAILS_PARTS.split(',') if part in item}
+        self.store.put_details(item['id'], parts, 'liveStreamingDetails' in item)
+        self.stale_ids.discard(item['id'])
+
+    def stream(self, youtube, batches, key=None, max_workers=DETAILS_MAX_WORKERS):
+        """
+        Come stream_video_details, ma consulta prima lo store
+
+        Gli elementi con dettagli freschi nello store escono subito; gli altri
+        vengono accumulati in batch pieni da 50 e richiesti all'API.
+
+        Yields:
+            tuple: (batch, details: list, failure: dict oppure None)
+        """
+        get_id = key or (lambda item: item)
+        ready = deque()
+
+        def misses():
+            buffer = []
+            for batch in batches:
+                fresh = self.fresh_details([get_id(item) for item in batch])
+                hits = []
+                for item in batch:
+                    (hits if get_id(item) in fresh else buffer).append(item)
+
+                if hits:
+                    self.hits += len(hits)
+                    ready.append((hits, [fresh[get_id(item)] for item in hits], None))
+
+                while len(buffer) >= DETAILS_BATCH_SIZE:
+                    yield buffer[:DETAILS_BATCH_SIZE]
+                    buffer = buffer[DETAILS_BATCH_SIZE:]
+
+            if buffer:
+                yield buffer
+
+        for batch, details, failure in stream_video_details(youtube, misses(), key=key, max_workers=max_workers):
+            while ready:
+                yield ready.popleft()
+
+            self.misses += len(batch)
+            for item in details:
+                self.put(item)
+            yield batch, details, failure
+
+        while ready:
+            yield ready.popleft()
+
+    def fetch(self, youtube, video_ids, max_workers=DETAILS_MAX_WORKERS):
+        """
+        Come fetch_video_details, ma consulta prima lo store
+
+        Returns:
+            tuple: (details: list, failed_batches: list)
+        """
+        all_details = []
+        failed_batches = []
+
+        for _, details, failure in self.stream(youtube, [video_ids], max_workers=max_workers):
+            all_details.extend(details)
+            if failure:
+                failed_batches.append(failure)
+
+        return all_details, failed_batches
+
+    def save(self):
+        """Conferma nello store i dettagli scaricati"""
+        try:
+            self.store.commit()
+        except Exception as e:
+            logger.warning(f"Impossibile salvare details cache: {e}")
+
+    def log_stats(self):
+        """Logga quanti dettagli sono arrivati dallo store e quanti dall'API"""
+        logger.info(f"Details cache: {self.hits} video dallo store, {self.misses} richiesti all'API")
+        if self.deferred:
+            logger.info(f"Details cache: refresh di {self.deferred} dettagli scaduti rimandato (budget quota)")
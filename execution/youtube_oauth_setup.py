@@ -10,7 +10,7 @@ import sys
 from pathlib import Path
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
+from token_broker import expires_within, load_credentials, save_credentials
 
 # Configurazione
 SCOPES = ['https://www.googleapis.com/auth/youtube.readonly']
@@ -35,24 +35,26 @@ def get_authenticated_service():
     Flusso:
     1. Controlla se esiste token.json valido
     2. Se valido → usa quello
-    3. Se scaduto → prova refresh automatico
+    3. Se scaduto (o in scadenza) → prova refresh automatico tramite il token broker
+       (lock condiviso con gli script di sync: nessun refresh doppio)
     4. Se refresh fallisce o token non esiste → apri browser per OAuth flow
-    5. Salva nuovo token
+    5. Salva nuovo token (scrittura atomica, con scadenza)
     """
     creds = None
 
     # Controlla se esiste già un token salvato
     if os.path.exists(TOKEN_FILE):
         print(f"📄 Token esistente trovato: {TOKEN_FILE}")
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+        creds = load_credentials(TOKEN_FILE, SCOPES)
 
     # Se non ci sono credenziali valide disponibili
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
+    if not creds or expires_within(creds, creds.refresh_margin):
+        if creds and creds.refresh_token:
             print("🔄 Token scaduto. Tentativo di refresh automatico...")
             try:
                 creds.refresh(Request())
                 print("✅ Token refreshato con successo!")
+                return creds
             except Exception as e:
                 print(f"⚠️  Refresh automatico fallito: {e}")
                 print("Procedo con nuovo OAuth flow...")
@@ -75,9 +77,8 @@ def get_authenticated_service():
                 print(f"\n❌ ERRORE durante autenticazione: {e}")
                 sys.exit(1)
 
-        # Salva il token per usi futuri
-        with open(TOKEN_FILE, 'w') as token:
-            token.write(creds.to_json())
+        # Salva il token per usi futuri (il refresh riuscito l'ha già salvato il broker)
+        save_credentials(creds, TOKEN_FILE)
         print(f"💾 Token salvato in: {TOKEN_FILE}")
     else:
         print("✅ Token esistente è ancora valido!")
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Modulo: YouTube Quota (contabilità e budget delle unità API)
+Scopo: Addebitare a ogni chiamata alla YouTube Data API il suo costo reale in unità,
+       persistere l'uso giornaliero (il contatore di Google riparte a mezzanotte Pacific)
+       e far rispettare un budget per run e uno giornaliero:
+       - le richieste oltre il budget non partono (QuotaExceeded)
+       - il lavoro a bassa priorità (es. riscaricare dettagli solo "vecchi") viene rimandato
+         quando resta solo la riserva
+Usato da: execution/fetch_all_videos.py, execution/refresh_cache.py, execution/youtube_api.py, execution/sync_daemon.py
+Direttiva di riferimento: directives/fetch_youtube_videos.md
+
+Il governor si aggancia al client googleapiclient (requestBuilder): ogni execute(),
+anche nei worker paralleli di videos.list, passa da charge() prima di partire.
+"""
+
+import os
+import json
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo il lock tra thread
+    fcntl = None
+
+# Configurazione
+QUOTA_FILE = os.getenv('YOUTUBE_QUOTA_FILE', 'data/quota_usage.json')
+DAILY_LIMIT = 10_000  # Quota giornaliera del progetto Google Cloud
+DAILY_BUDGET = int(os.getenv('YOUTUBE_QUOTA_DAILY_BUDGET', '8000'))  # Margine per run manuali e altri tool
+RUN_BUDGET = int(os.getenv('YOUTUBE_QUOTA_RUN_BUDGET', '1000'))  # Un sync completo a freddo ne usa ~63
+LOW_PRIORITY_RESERVE = float(os.getenv('YOUTUBE_QUOTA_LOW_PRIORITY_RESERVE', '0.2'))  # Quota di budget solo per lavoro necessario
+QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')  # Il reset di Google è a mezzanotte Pacific
+HISTORY_DAYS = 14  # Giorni passati conservati nel file
+
+PRIORITY_HIGH = 'high'
+PRIORITY_LOW = 'low'
+
+# Costo in unità per metodo (https://developers.google.com/youtube/v3/determine_quota_cost)
+UNIT_COSTS = {
+    'youtube.channels.list': 1,
+    'youtube.playlistItems.list': 1,
+    'youtube.videos.list': 1,
+    'youtube.liveBroadcasts.list': 1,
+    'youtube.search.list': 100,
+}
+DEFAULT_UNIT_COST = 1  # Altri metodi .list; le scritture (50) non sono usate dagli script
+
+logger = logging.getLogger(__name__)
+
+class QuotaExceeded(Exception):
+    """La richiesta supererebbe il budget del run o del giorno: non viene inviata"""
+
+def quota_day(now=None):
+    """Giorno di quota (data a Los Angeles) per un istante UTC"""
+    now = now or datetime.now(timezone.utc)
+    return now.astimezone(QUOTA_TIMEZONE).date().isoformat()
+
+def unit_cost(method_id):
+    """Costo in unità di un metodo (es. 'youtube.videos.list')"""
+    return UNIT_COSTS.get(method_id, DEFAULT_UNIT_COST)
+
+def _short_name(method_id):
+    """'youtube.playlistItems.list' → 'playlistItems.list'"""
+    return method_id.split('.', 1)[-1] if method_id else 'sconosciuto'
+
+class QuotaGovernor:
+    """
+    Contatore delle unità usate (run corrente + giorno di quota) con budget
+
+    Lo stato giornaliero è in QUOTA_FILE (JSON, scrittura atomica a ogni addebito:
+    un crash non fa "dimenticare" unità già spese). Thread-safe e condiviso tra processi
+    (cron, daemon, push receiver): ogni addebito rilegge il file sotto file lock
+    (QUOTA_FILE.lock, come token_broker.py) e lo riscrive prima di rilasciarlo.
+    """
+
+    def __init__(self, path=QUOTA_FILE, run_budget=RUN_BUDGET, daily_budget=DAILY_BUDGET,
+                 low_priority_reserve=LOW_PRIORITY_RESERVE, clock=None):
+        self.path = path
+        self.run_budget = run_budget
+        self.daily_budget = min(daily_budget, DAILY_LIMIT)
+        self.low_priority_reserve = low_priority_reserve
+        self.clock = clock or (lambda: datetime.now(timezone.utc))
+        self.lock = threading.Lock()
+        self.run_units = 0
+        self.run_calls = Counter()
+        self.run_endpoint_units = Counter()
+        self.deferred = Counter()
+        self.state = self._load()
+
+    def _load(self):
+        """Stato persistito: {day, units, endpoints: {metodo: {calls, units}}, history: [...]}"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = None
+        except (OSError, ValueError) as e:
+            logger.warning(f"File quota illeggibile ({self.path}): {e}. Riparto da zero")
+            state = None
+
+        return state or {'day': quota_day(self.clock()), 'units': 0, 'endpoints': {}, 'history': []}
+
+    def _reload(self):
+        """Stato aggiornato dal disco (altri processi possono aver addebitato unità)"""
+        self.state = self._load()
+        self._roll_day()
+
+    @contextmanager
+    def _file_lock(self):
+        """Lock esclusivo sul file quota: tra i thread (self.lock) e tra processi (file lock)"""
+        output_dir = os.path.dirname(self.path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        with self.lock:
+            with open(f"{self.path}.lock", 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save(self):
+        output_dir = os.path.dirname(self.path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        temp_file = f"{self.path}.{os.getpid()}.tmp"  # Senza fcntl i processi non si pestano il file temporaneo
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2, ensure_ascii=False)
+        os.replace(temp_file, self.path)
+
+    def _roll_day(self):
+        """Nuovo giorno di quota (mezzanotte Pacific): archivia il totale e azzera"""
+        today = quota_day(self.clock())
+        if self.state['day'] == today:
+            return
+
+        if self.state['units']:
+            history = [{'day': self.state['day'], 'units': self.state['units']}] + self.state['history']
+            self.state['history'] = history[:HISTORY_DAYS]
+        self.state.update(day=today, units=0, endpoints={})
+
+    def start_run(self):
+        """Azzera i contatori del run (processi lunghi: un "run" per giorno di quota)"""
+        with self.lock:
+            self.run_units = 0
+            self.run_calls.clear()
+            self.run_endpoint_units.clear()
+            self.deferred.clear()
+
+    def daily_units(self):
+        """Unità usate nel giorno di quota corrente (tutti i run e tutti i processi)"""
+        with self.lock:
+            self._reload()
+            return self.state['units']
+
+    def remaining(self, priority=PRIORITY_HIGH):
+        """Unità ancora spendibili (il minimo tra budget del run e del giorno)"""
+        with self.lock:
+            self._reload()
+            return self._remaining(priority)
+
+    def _remaining(self, priority):
+        run_left = self.run_budget - self.run_units
+        day_left = self.daily_budget - self.state['units']
+        if priority == PRIORITY_LOW:
+            # Il lavoro rimandabile non tocca la riserva finale di ciascun budget
+            run_left -= int(self.run_budget * self.low_priority_reserve)
+            day_left -= int(self.daily_budget * self.low_priority_reserve)
+        return max(0, min(run_left, day_left))
+
+    def can_afford(self, units, priority=PRIORITY_HIGH):
+        """True se units unità stanno nel budget (per la priorità data)"""
+        return self.remaining(priority) >= units
+
+    def defer(self, what, count=1):
+        """Registra lavoro a bassa priorità rimandato al prossimo run"""
+        with self.lock:
+            self.deferred[what] += count
+
+    def charge(self, method_id, priority=PRIORITY_HIGH):
+        """
+        Addebita una chiamata prima che parta: sotto file lock rilegge l'uso del giorno,
+        controlla il budget, aggiunge il costo e riscrive il file
+
+        Raises:
+            QuotaExceeded: se il costo supera il budget rimasto
+        """
+        cost = unit_cost(method_id)
+        with self._file_lock():
+            self._reload()
+            if self._remaining(priority) < cost:
+                raise QuotaExceeded(
+                    f"{_short_name(method_id)} ({cost} unità) oltre il budget: "
+                    f"run {self.run_units}/{self.run_budget}, "
+                    f"giorno {self.state['units']}/{self.daily_budget} (priorità {priority})"
+                )
+
+            self.run_units += cost
+            self.run_calls[method_id] += 1
+            self.run_endpoint_units[method_id] += cost
+
+            self.state['units'] += cost
+            endpoint = self.state['endpoints'].setdefault(method_id, {'calls': 0, 'units': 0})
+            endpoint['calls'] += 1
+            endpoint['units'] += cost
+            self._save()
+
+    def request_builder(self):
+        """
+        Classe HttpRequest per build(requestBuilder=...): ogni execute() viene addebitato
+        (priorità: attributo priority della richiesta, default alta)
+        """
+        from googleapiclient.http import HttpRequest
+
+        governor = self
+
+        class GovernedHttpRequest(HttpRequest):
+            priority = PRIORITY_HIGH
+
+            def execute(self, http=None, num_retries=0):
+                governor.charge(self.methodId, self.priority)
+                return super().execute(http=http, num_retries=num_retries)
+
+        return GovernedHttpRequest
+
+    def log_breakdown(self):
+        """Logga le unità del run per endpoint e l'uso del giorno di quota"""
+        with self.lock:
+            self._reload()
+            logger.info(f"Quota API usata in questo run: {self.run_units} unità (budget {self.run_budget})")
+            for method_id, units in sorted(self.run_endpoint_units.items(), key=lambda item: -item[1]):
+                logger.info(f"  - {_short_name(method_id):<22} {self.run_calls[method_id]:>5} chiamate, {units:>5} unità")
+            for what, count in sorted(self.deferred.items()):
+                logger.info(f"  - rimandato per budget: {count} {what}")
+            logger.info(
+                f"Quota del giorno {self.state['day']} (Pacific): {self.state['units']}/{self.daily_budget} "
+                f"unità di budget ({DAILY_LIMIT} limite Google)"
+            )
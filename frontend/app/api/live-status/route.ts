@@ -1,4 +1,6 @@
 import { NextResponse } from 'next/server'
+import { readFile } from 'fs/promises'
+import { join } from 'path'
 
 const YOUTUBE_CLIENT_ID = process.env.YOUTUBE_CLIENT_ID
 const YOUTUBE_CLIENT_SECRET = process.env.YOUTUBE_CLIENT_SECRET
@@ -30,6 +32,31 @@ interface YouTubeLiveBroadcastsResponse {
   items?: YouTubeLiveBroadcast[]
 }
 
+interface LiveSchedule {
+  format: string
+  version: number
+  updated_at: string
+  last_activity_at: string | null
+  broadcasts: {
+    id: string
+    title: string | null
+    status: 'upcoming' | 'live'
+    scheduled_start: string | null
+    actual_start: string | null
+    watch_url: string
+  }[]
+  check_windows: {
+    start: string
+    end: string
+  }[]
+  // Weekly UTC windows (weekday 0 = Monday), each inside a single day: end "24:00" = midnight
+  lesson_windows: {
+    weekday: number
+    start: string
+    end: string
+  }[]
+}
+
 interface LiveStatusCache {
   data: {
     isLive: boolean
@@ -38,11 +65,78 @@ interface LiveStatusCache {
     thumbnail?: string
   }
   timestamp: number
+  ttl: number
 }
 
 // Server-side cache (in-memory)
 let cache: LiveStatusCache | null = null
 const CACHE_TTL = 60 * 1000 // 60 seconds
+// Without a fresh schedule every request would hit the API: check at a lower rate
+const FALLBACK_CACHE_TTL = 5 * 60 * 1000 // 5 minutes
+
+// Static schedule written by execution/live_schedule.py after every sync
+const SCHEDULE_PATH = join(process.cwd(), 'public', 'data', 'live_schedule.json')
+const SCHEDULE_TTL = 5 * 60 * 1000 // 5 minutes
+// Lessons run every week: no new video or broadcast for longer means sync or deploy stopped
+const SCHEDULE_MAX_AGE = 8 * 24 * 60 * 60 * 1000 // 8 days
+let schedule: { data: LiveSchedule | null; timestamp: number } | null = null
+
+async function loadSchedule(): Promise<LiveSchedule | null> {
+  if (schedule && Date.now() - schedule.timestamp < SCHEDULE_TTL) {
+    return schedule.data
+  }
+
+  let data: LiveSchedule | null = null
+  try {
+    const parsed = JSON.parse(await readFile(SCHEDULE_PATH, 'utf-8'))
+    if (
+      parsed.format === 'aba-live-schedule' &&
+      Array.isArray(parsed.check_windows) &&
+      Array.isArray(parsed.lesson_windows)
+    ) {
+      data = parsed
+    }
+  } catch (error) {
+    console.error('[LIVE STATUS] Error loading live schedule:', error)
+  }
+
+  schedule = { data, timestamp: Date.now() }
+  return data
+}
+
+// The file only changes when the archive does, so its age comes from its content:
+// the newest video or broadcast it knows about (last_activity_at)
+function scheduleIsFresh(liveSchedule: LiveSchedule, now: number): boolean {
+  return (
+    !!liveSchedule.last_activity_at &&
+    now - Date.parse(liveSchedule.last_activity_at) < SCHEDULE_MAX_AGE
+  )
+}
+
+function dayMinutes(time: string): number {
+  const [hours, minutes] = time.split(':').map(Number)
+  return hours * 60 + minutes
+}
+
+function insideCheckWindow(liveSchedule: LiveSchedule, now: number): boolean {
+  if (
+    liveSchedule.check_windows.some(
+      (window) => Date.parse(window.start) <= now && now < Date.parse(window.end)
+    )
+  ) {
+    return true
+  }
+
+  const moment = new Date(now)
+  const weekday = (moment.getUTCDay() + 6) % 7 // getUTCDay: 0 = Sunday
+  const minute = moment.getUTCHours() * 60 + moment.getUTCMinutes()
+  return liveSchedule.lesson_windows.some(
+    (window) =>
+      window.weekday === weekday &&
+      dayMinutes(window.start) <= minute &&
+      minute < dayMinutes(window.end)
+  )
+}
 
 async function refreshAccessToken(): Promise<string | null> {
   try {
@@ -72,11 +166,30 @@ async function refreshAccessToken(): Promise<string | null> {
 
 export async function GET() {
   // Check if cache is valid
-  if (cache && Date.now() - cache.timestamp < CACHE_TTL) {
+  if (cache && Date.now() - cache.timestamp < cache.ttl) {
     console.log('[LIVE STATUS] Returning cached result')
     return NextResponse.json(cache.data)
   }
 
+  // Outside every scheduled broadcast / recurring lesson window there is nothing to ask the API.
+  // Without a fresh schedule (missing, invalid or stale file) fall back to the API check.
+  const liveSchedule = await loadSchedule()
+  const now = Date.now()
+  const freshSchedule = liveSchedule !== null && scheduleIsFresh(liveSchedule, now)
+  if (freshSchedule && !insideCheckWindow(liveSchedule, now)) {
+    console.log('[LIVE STATUS] No scheduled broadcast window, skipping API check')
+    const result = { isLive: false }
+    cache = {
+      data: result,
+      timestamp: now,
+      ttl: CACHE_TTL,
+    }
+    return NextResponse.json(result)
+  }
+  if (!freshSchedule) {
+    console.log('[LIVE STATUS] Live schedule missing or stale, falling back to the API check')
+  }
+
   try {
     if (!YOUTUBE_CLIENT_ID || !YOUTUBE_CLIENT_SECRET || !YOUTUBE_REFRESH_TOKEN) {
       console.error('[LIVE STATUS] YouTube OAuth credentials not configured')
@@ -134,6 +247,7 @@ export async function GET() {
     cache = {
       data: result,
       timestamp: Date.now(),
+      ttl: freshSchedule ? CACHE_TTL : FALLBACK_CACHE_TTL,
     }
 
     return NextResponse.json(result)
@@ -0,0 +1,67 @@
+import { ApiResponse, Video } from '@/types/video'
+
+// Formato colonnare generato da execution/archive_format.py (videos_columnar.json)
+export interface ColumnarArchive {
+  format: 'aba-columnar'
+  version: number
+  last_updated: string
+  content_hash: string | null
+  total_videos: number
+  total_hours: number
+  columns: {
+    id: string[]
+    title: string[]
+    published_at: number[] // epoch in secondi (UTC)
+    duration_seconds: number[]
+    thumbnail_url?: string[]
+  }
+  overrides?: {
+    duration_formatted?: Record<string, string>
+  }
+}
+
+const DEFAULT_THUMBNAIL_URL = '/thumbnail-default.png'
+const WATCH_URL_PREFIX = 'https://www.youtube.com/watch?v='
+
+// Stesso formato di parse_duration negli script di sync
+export function formatDuration(totalSeconds: number): string {
+  const hours = Math.floor(totalSeconds / 3600)
+  const minutes = Math.floor((totalSeconds % 3600) / 60)
+
+  if (hours > 0) return `${hours}h ${minutes}m`
+  if (minutes > 0) return `${minutes}m`
+  return `${totalSeconds}s`
+}
+
+// Ricostruisce i record nel formato di videos_cache.json
+export function decodeColumnarArchive(archive: ColumnarArchive): ApiResponse {
+  if (archive.format !== 'aba-columnar' || archive.version !== 1) {
+    throw new Error(`Formato archivio non supportato: ${archive.format} v${archive.version}`)
+  }
+
+  const { id, title, published_at, duration_seconds, thumbnail_url } = archive.columns
+  const durationOverrides = archive.overrides?.duration_formatted ?? {}
+
+  const videos: Video[] = id.map((videoId, i) => {
+    const published = new Date(published_at[i] * 1000)
+    return {
+      id: videoId,
+      title: title[i],
+      published_at: published.toISOString().replace('.000Z', 'Z'),
+      year: published.getUTCFullYear(),
+      month: published.getUTCMonth() + 1,
+      duration_seconds: duration_seconds[i],
+      duration_formatted: durationOverrides[String(i)] ?? formatDuration(duration_seconds[i]),
+      thumbnail_url: thumbnail_url ? thumbnail_url[i] : DEFAULT_THUMBNAIL_URL,
+      watch_url: `${WATCH_URL_PREFIX}${videoId}`,
+    }
+  })
+
+  return {
+    last_updated: archive.last_updated,
+    total_videos: archive.total_videos,
+    total_hours: archive.total_hours,
+    content_hash: archive.content_hash ?? undefined,
+    videos,
+  }
+}
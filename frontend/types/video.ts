@@ -27,6 +27,47 @@ export interface ApiResponse {
   last_updated: string
   total_videos: number
   total_hours?: number
+  content_hash?: string
+  archive_version?: number
   years?: YearData[]
   videos?: Video[]
 }
+
+export interface ManifestMonth {
+  month: number
+  month_name: string
+  total: number
+  total_hours: number
+}
+
+export interface ManifestYear {
+  year: number
+  total: number
+  total_hours: number
+  shard: string
+  months: ManifestMonth[]
+}
+
+export interface ArchiveManifest {
+  version: number
+  archive_version: number
+  last_updated: string
+  content_hash: string
+  total_videos: number
+  total_hours: number
+  years: ManifestYear[]
+  // versione di partenza → URL del delta verso archive_version
+  deltas: Record<string, string>
+}
+
+export interface ArchiveDelta {
+  from_version: number
+  to_version: number
+  content_hash: string
+  last_updated: string
+  total_videos: number
+  total_hours: number
+  adds: Video[]
+  updates: Video[]
+  removes: string[]
+}